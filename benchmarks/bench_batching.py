@@ -0,0 +1,98 @@
+"""
+Benchmark micro-batching of completion calls against the local fake
+provider.
+
+Threads call ModelManager.get_completion for a fixed number of prompts at
+each concurrency level, with and without the fake provider in
+BATCH_PROVIDERS. The fake provider answers a batch after a single latency
+draw, like a provider batch endpoint, so batching saves round trips as well
+as per-call overhead. Each run reports completions/s, provider calls and
+latency percentiles.
+
+Usage:
+    poetry run python -m benchmarks.bench_batching --concurrency 8 32 64 --prompts 256 \
+        --latency-median 0.1 --window-ms 10 --max-size 16
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config.settings import settings
+from src.services.fake_provider import FakeChatModel
+from src.services.model_manager import ModelManager
+
+
+class CountingFakeModel(FakeChatModel):
+    """
+    Fake provider counting the round trips it serves.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.__dict__["round_trips"] = 0
+
+    def batch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        self.__dict__["round_trips"] += 1
+        return super().batch(
+            inputs, config, return_exceptions=return_exceptions, **kwargs
+        )
+
+    def invoke(self, *args, **kwargs):
+        self.__dict__["round_trips"] += 1
+        return super().invoke(*args, **kwargs)
+
+
+def run(concurrency: int, prompts: int, batched: bool, latency_median: float) -> dict:
+    settings.BATCH_PROVIDERS = ["fake"] if batched else []
+    manager = ModelManager()
+    model = manager.models["fake"] = CountingFakeModel(
+        latency_median=latency_median, latency_sigma=0.2, output_tokens=20, seed=1
+    )
+    latencies = []
+
+    def call(index: int):
+        start = time.perf_counter()
+        manager.get_completion("fake", f"Summarize chunk {index}")
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(prompts)))
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "per_second": prompts / elapsed,
+        "round_trips": model.round_trips,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--prompts", type=int, default=256)
+    parser.add_argument("--latency-median", type=float, default=0.1)
+    parser.add_argument("--window-ms", type=float, default=settings.BATCH_WINDOW_MS)
+    parser.add_argument("--max-size", type=int, default=settings.BATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    settings.BATCH_WINDOW_MS = args.window_ms
+    settings.BATCH_MAX_SIZE = args.max_size
+    print(
+        f"{'threads':>7} {'batched':>8} {'calls/s':>8} {'trips':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8}"
+    )
+    for concurrency in args.concurrency:
+        for batched in (False, True):
+            result = run(concurrency, args.prompts, batched, args.latency_median)
+            print(
+                f"{concurrency:>7} {str(batched):>8} {result['per_second']:>8.1f} "
+                f"{result['round_trips']:>6} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark the token-aware chunker against the previous character
+based word chunker.
+
+Usage:
+    poetry run python -m benchmarks.bench_chunker --megabytes 1 4
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from src.processors.chunker import TextChunker, get_token_counter
+
+SAMPLE = Path(__file__).resolve().parent.parent / "sample_data" / "hnsw.txt"
+
+
+def word_chunks(text: str, chunk_size: int = 4000) -> list:
+    """
+    The previous SummaryGenerator._chunk_text, kept as the baseline.
+    """
+    words = text.split()
+    chunks = []
+    current_chunk = []
+    current_length = 0
+
+    for word in words:
+        if len(word) + current_length > chunk_size:
+            chunks.append(" ".join(current_chunk))
+            current_chunk = [word]
+            current_length = len(word)
+        else:
+            current_chunk.append(word)
+            current_length += len(word) + 1
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+
+    return chunks
+
+
+def synthetic_text(megabytes: float) -> str:
+    """
+    Repeat the sample document up to the requested size.
+    """
+    sample = SAMPLE.read_text(encoding="utf-8")
+    size = int(megabytes * 1024 * 1024)
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 4])
+    parser.add_argument("--provider", default="anthropic")
+    args = parser.parse_args()
+
+    chunker = TextChunker(count_tokens=get_token_counter(args.provider))
+    print(f"{'MB':>6} {'chunker':>12} {'seconds':>9} {'MB/s':>8} {'chunks':>8}")
+    for megabytes in args.megabytes:
+        text = synthetic_text(megabytes)
+        for name, func in (("words", word_chunks), ("tokens", chunker.chunk)):
+            chunks, elapsed = timed(func, text)
+            print(
+                f"{megabytes:>6} {name:>12} {elapsed:>9.3f} "
+                f"{megabytes / elapsed:>8.1f} {len(chunks):>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
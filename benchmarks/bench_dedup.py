@@ -0,0 +1,81 @@
+"""
+Benchmark near-duplicate chunk detection: the time to sign, look up and
+index each chunk of a corpus where a share of the chunks are boilerplate
+repeated with small edits.
+
+Usage:
+    poetry run python -m benchmarks.bench_dedup --chunks 1000 5000 --duplicates 0.3
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from src.config.settings import settings
+from src.processors.chunker import TextChunker
+from src.services.dedup import LSHIndex, MinHasher
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "sample_data"
+
+
+def corpus(sample: str, count: int, duplicates: float, seed: int = 0) -> list:
+    """
+    Build count chunks from shuffled words of the sample, replacing the given
+    share of them with a boilerplate chunk with a few words edited. Return
+    the chunks and the number of boilerplate copies after the first.
+    """
+    generator = random.Random(seed)
+    chunks = TextChunker(max_tokens=settings.CHUNK_SIZE).chunk(sample)
+    boilerplate = chunks[0].split()
+    words = sample.split()
+    result = []
+    copies = 0
+    for _ in range(count):
+        if generator.random() < duplicates:
+            copies += 1
+            chunk = list(boilerplate)
+            for _ in range(3):
+                chunk[generator.randrange(len(chunk))] = generator.choice(words)
+        else:
+            chunk = generator.sample(words, len(boilerplate))
+        result.append(" ".join(chunk))
+    return result, max(copies - 1, 0)
+
+
+def bench(chunks: list):
+    hasher = MinHasher()
+    index = LSHIndex()
+    found = 0
+    start = time.perf_counter()
+    for key, chunk in enumerate(chunks):
+        signature = hasher.signature(chunk)
+        if index.query(signature) is not None:
+            found += 1
+        else:
+            index.add(key, signature, None)
+    elapsed = time.perf_counter() - start
+    return found, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--duplicates", type=float, default=0.3)
+    args = parser.parse_args()
+
+    sample = (SAMPLE_DIR / "hnsw.txt").read_text(encoding="utf-8")
+    print(
+        f"{'chunks':>7} {'duplicates':>11} {'found':>6} {'seconds':>8} {'us/chunk':>9}"
+    )
+    for count in args.chunks:
+        chunks, expected = corpus(sample, count, args.duplicates)
+        found, elapsed = bench(chunks)
+        print(
+            f"{count:>7} {expected:>11} {found:>6} {elapsed:>8.3f} "
+            f"{elapsed / count * 1e6:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark the streaming DOCX extractor against the python-docx object
+model it replaced, on the sample document and on synthetic documents.
+
+Peak memory is measured with tracemalloc in a separate run, since tracing
+slows extraction down.
+
+Usage:
+    poetry run python -m benchmarks.bench_docx --paragraphs 10000 100000
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from docx import Document
+
+from src.processors.document import iter_docx_text
+
+SAMPLE = (
+    Path(__file__).resolve().parent.parent / "sample_data" / "file-sample_100kB.docx"
+)
+SENTENCE = (
+    "Hierarchical navigable small world graphs index vectors for approximate search."
+)
+
+
+def python_docx_text(path: Path) -> int:
+    """
+    Text length via the python-docx object model the extractor used before.
+
+    Both extractors only count characters, so the peak memory is that of
+    parsing rather than of the joined text.
+    """
+    doc = Document(str(path))
+    return sum(len(par.text) for par in doc.paragraphs)
+
+
+def streaming_text(path: Path) -> int:
+    return sum(len(text) for text in iter_docx_text(path))
+
+
+def create_docx(path: Path, paragraphs: int):
+    """
+    Create a synthetic document with a small table every 100 paragraphs.
+    """
+    doc = Document()
+    for index in range(paragraphs):
+        doc.add_paragraph(f"{index} {SENTENCE} {SENTENCE}")
+        if index % 100 == 99:
+            table = doc.add_table(rows=2, cols=3)
+            for cell in table._cells:
+                cell.text = SENTENCE
+    doc.save(str(path))
+
+
+def measure(extract, path: Path, repeat: int) -> dict:
+    """
+    Best time out of several runs and peak traced memory of one run.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract(path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    extract(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_mb": peak / 1024 / 1024}
+
+
+def report(name: str, path: Path, repeat: int):
+    baseline = measure(python_docx_text, path, repeat)
+    streaming = measure(streaming_text, path, repeat)
+    size_mb = path.stat().st_size / 1024 / 1024
+    print(f"{name} ({size_mb:.1f} MB)")
+    print(
+        f"  python-docx: {baseline['seconds']:.3f}s, peak {baseline['peak_mb']:.1f} MB"
+    )
+    print(
+        f"  streaming:   {streaming['seconds']:.3f}s, peak {streaming['peak_mb']:.1f} MB"
+        f" ({baseline['seconds'] / streaming['seconds']:.1f}x faster)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if SAMPLE.exists():
+        report(SAMPLE.name, SAMPLE, args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for paragraphs in args.paragraphs:
+            path = Path(tmp_dir) / f"synthetic_{paragraphs}.docx"
+            create_docx(path, paragraphs)
+            report(f"{paragraphs} paragraphs", path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
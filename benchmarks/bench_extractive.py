@@ -0,0 +1,87 @@
+"""
+Benchmark the extractive sentence ranker: ranking throughput on synthetic
+text, and the input tokens the pre-filter removes from the chunks of the
+sample documents.
+
+Usage:
+    poetry run python -m benchmarks.bench_extractive --megabytes 1 4 --ratio 0.5
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from src.config.settings import settings
+from src.processors.chunker import TextChunker, get_token_counter
+from src.processors.document import DocumentProcessor
+from src.processors.extractive import rank_sentences, split_sentences
+from src.services.summary import SummaryGenerator
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "sample_data"
+
+
+def synthetic_text(sample: str, megabytes: float) -> str:
+    """
+    Repeat the sample text up to the requested size.
+    """
+    size = int(megabytes * 1024 * 1024)
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def bench_throughput(sample: str, megabytes_list: list):
+    print(f"{'MB':>6} {'sentences':>10} {'split s':>8} {'rank s':>8} {'MB/s':>8}")
+    for megabytes in megabytes_list:
+        text = synthetic_text(sample, megabytes)
+        start = time.perf_counter()
+        sentences = split_sentences(text)
+        split = time.perf_counter() - start
+        start = time.perf_counter()
+        rank_sentences(sentences)
+        rank = time.perf_counter() - start
+        print(
+            f"{megabytes:>6} {len(sentences):>10} {split:>8.3f} {rank:>8.3f} "
+            f"{megabytes / (split + rank):>8.1f}"
+        )
+
+
+def bench_reduction(provider: str, ratio: float):
+    """
+    Pre-filter every chunk of the sample documents as SummaryGenerator does.
+    """
+    settings.EXTRACTIVE_PREFILTER = True
+    settings.EXTRACTIVE_RATIO = ratio
+    count_tokens = get_token_counter(provider)
+    chunker = TextChunker(max_tokens=settings.CHUNK_SIZE, count_tokens=count_tokens)
+    processor = DocumentProcessor(cache_size=0)
+
+    print(f"{'document':>28} {'chunks':>7} {'tokens':>8} {'sent':>8} {'saved':>7}")
+    for path in sorted(SAMPLE_DIR.iterdir()):
+        if path.suffix not in DocumentProcessor.SUPPORTED_FORMATS:
+            continue
+        chunks = chunker.chunk(processor.extract_text(str(path)))
+        before = sum(count_tokens(chunk) for chunk in chunks)
+        after = sum(
+            count_tokens(SummaryGenerator._prefilter(chunk, provider))
+            for chunk in chunks
+        )
+        print(
+            f"{path.name:>28} {len(chunks):>7} {before:>8} {after:>8} "
+            f"{1 - after / before:>7.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 4])
+    parser.add_argument("--ratio", type=float, default=settings.EXTRACTIVE_RATIO)
+    parser.add_argument("--provider", default="anthropic")
+    args = parser.parse_args()
+
+    sample = (SAMPLE_DIR / "hnsw.txt").read_text(encoding="utf-8")
+    bench_throughput(sample, args.megabytes)
+    print()
+    bench_reduction(args.provider, args.ratio)
+
+
+if __name__ == "__main__":
+    main()
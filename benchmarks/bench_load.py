@@ -0,0 +1,214 @@
+"""
+Load-test /summarize and /compare-summaries against the local fake provider.
+
+The app is driven in-process through httpx's ASGI transport at fixed
+concurrency levels. Each run reports requests/s, latency percentiles and
+how long the event loop was blocked, measured as the wake-up lags of a
+ticker sleeping TICK seconds at a time that exceed BLOCK_THRESHOLD. Every request uses a different document
+so the summary cache and request coalescing do not hide provider calls.
+
+Usage:
+    poetry run python -m benchmarks.bench_load --concurrency 1 8 32 --requests 64 \
+        --latency-median 0.2 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from src.config.settings import settings
+
+SAMPLE = Path(__file__).resolve().parent.parent / "sample_data" / "hnsw.txt"
+TICK = 0.005
+BLOCK_THRESHOLD = 0.01
+
+
+def percentiles(samples: list) -> dict:
+    """
+    p50, p95 and p99 of samples, in milliseconds.
+    """
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else None
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+
+
+async def monitor_event_loop(stop: asyncio.Event) -> dict:
+    """
+    Measure how late a ticker wakes up until stop is set.
+    """
+    loop = asyncio.get_running_loop()
+    lags = []
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, loop.time() - start - TICK))
+    return {
+        "blocked_ms": sum(lag for lag in lags if lag > BLOCK_THRESHOLD) * 1000,
+        "max_lag_ms": max(lags, default=0.0) * 1000,
+        "p99_lag_ms": percentiles(lags)["p99"],
+    }
+
+
+def make_documents(directory: Path, count: int, words: int) -> list:
+    """
+    Write count distinct text documents of about the given number of words.
+    """
+    base = SAMPLE.read_text(encoding="utf-8").split() if SAMPLE.exists() else []
+    base = (base or ["lorem"]) * (words // max(1, len(base)) + 1)
+    paths = []
+    for index in range(count):
+        path = directory / f"document_{index}.txt"
+        path.write_text(
+            f"Document {index}.\n\n" + " ".join(base[:words]), encoding="utf-8"
+        )
+        paths.append(str(path))
+    return paths
+
+
+def request_body(endpoint: str, path: str) -> dict:
+    if endpoint == "summarize":
+        return {"file_path": path, "summary_type": "brief", "providers": ["fake"]}
+    summaries = [
+        {
+            "provider": "fake",
+            "summary": f"Summary {index} of the document",
+            "summary_type": "brief",
+        }
+        for index in range(2)
+    ]
+    return {"file_path": path, "summaries": summaries, "provider": "fake"}
+
+
+async def run_level(client, endpoint: str, concurrency: int, paths: list) -> dict:
+    """
+    Send one request per document with the given number of concurrent clients.
+    """
+    queue = list(reversed(paths))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            path = queue.pop()
+            start = time.perf_counter()
+            response = await client.post(
+                f"/{endpoint}", json=request_body(endpoint, path)
+            )
+            latencies.append(time.perf_counter() - start)
+            body = response.json() if response.status_code == 200 else {}
+            if response.status_code != 200 or any(
+                summary.get("error") for summary in body.get("summaries", [])
+            ):
+                errors += 1
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_event_loop(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(paths),
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": len(paths) / elapsed,
+        "latency_ms": percentiles(latencies),
+        "event_loop": await monitor,
+    }
+
+
+async def run(args) -> list:
+    from src.app import api
+
+    if not args.cache:
+        api.summary_generator.cache = None
+
+    transport = httpx.ASGITransport(app=api.app)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            for endpoint in args.endpoints:
+                # Warm up: the first request builds the fake chat model
+                warmup = make_documents(Path(directory), 1, 100)[0]
+                await client.post(f"/{endpoint}", json=request_body(endpoint, warmup))
+                for concurrency in args.concurrency:
+                    level_dir = Path(directory) / f"{endpoint}_{concurrency}"
+                    level_dir.mkdir()
+                    paths = make_documents(level_dir, args.requests, args.words)
+                    result = await run_level(client, endpoint, concurrency, paths)
+                    print(
+                        f"{endpoint:<18} c={concurrency:<4} "
+                        f"{result['requests_per_second']:8.1f} req/s  "
+                        f"p50={result['latency_ms']['p50']:8.1f}ms  "
+                        f"p99={result['latency_ms']['p99']:8.1f}ms  "
+                        f"blocked={result['event_loop']['blocked_ms']:8.1f}ms  "
+                        f"errors={result['errors']}"
+                    )
+                    results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="requests per level")
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        choices=["summarize", "compare-summaries"],
+        default=["summarize", "compare-summaries"],
+    )
+    parser.add_argument("--words", type=int, default=3000, help="words per document")
+    parser.add_argument(
+        "--latency-median", type=float, default=settings.FAKE_LATENCY_MEDIAN
+    )
+    parser.add_argument(
+        "--latency-sigma", type=float, default=settings.FAKE_LATENCY_SIGMA
+    )
+    parser.add_argument("--error-rate", type=float, default=settings.FAKE_ERROR_RATE)
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=settings.FAKE_RATE_LIMIT_RATE
+    )
+    parser.add_argument(
+        "--output-tokens", type=int, default=settings.FAKE_OUTPUT_TOKENS
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="keep the summary cache on"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    settings.FAKE_PROVIDER_ENABLED = True
+    settings.FAKE_LATENCY_MEDIAN = args.latency_median
+    settings.FAKE_LATENCY_SIGMA = args.latency_sigma
+    settings.FAKE_ERROR_RATE = args.error_rate
+    settings.FAKE_RATE_LIMIT_RATE = args.rate_limit_rate
+    settings.FAKE_OUTPUT_TOKENS = args.output_tokens
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": asyncio.run(run(args)),
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark sequential against process-pool PDF text extraction.
+
+Usage:
+    poetry run python -m benchmarks.bench_pdf_extraction --pages 500 --workers 4
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from src.processors.document import DocumentProcessor
+
+LINE = "Hierarchical navigable small world graphs index vectors for approximate search."
+
+
+def create_pdf(path: Path, pages: int, lines_per_page: int = 45):
+    """
+    Create a synthetic PDF with a full page of text on every page.
+    """
+    c = canvas.Canvas(str(path), pagesize=A4)
+    for page in range(pages):
+        y = 800
+        for line in range(lines_per_page):
+            c.drawString(40, y, f"{page}.{line} {LINE}")
+            y -= 17
+        c.showPage()
+    c.save()
+
+
+def time_extraction(processor: DocumentProcessor, path: Path, repeat: int) -> float:
+    """
+    Return the best extraction time out of several runs.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        processor.extract_text(str(path))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "synthetic.pdf"
+        create_pdf(path, args.pages)
+
+        sequential = DocumentProcessor(cache_size=0, pdf_workers=1)
+        parallel = DocumentProcessor(
+            cache_size=0, pdf_workers=args.workers, pdf_parallel_threshold=1
+        )
+        # Start the worker processes before timing
+        parallel._get_pdf_pool().submit(int).result()
+
+        sequential_time = time_extraction(sequential, path, args.repeat)
+        parallel_time = time_extraction(parallel, path, args.repeat)
+
+    print(f"pages:      {args.pages}")
+    print(f"sequential: {sequential_time:.2f}s")
+    print(f"parallel:   {parallel_time:.2f}s ({args.workers} workers)")
+    print(f"speedup:    {sequential_time / parallel_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
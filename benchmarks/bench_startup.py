@@ -0,0 +1,73 @@
+"""
+Measure the cold start of the API: the time a fresh interpreter needs to
+import src.app.api, and the time to build a provider's chat model on first
+use.
+
+Usage:
+    poetry run python -m benchmarks.bench_startup --runs 5 --output startup.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import src.app.api as api
+imported = time.perf_counter() - start
+start = time.perf_counter()
+try:
+    api.model_manager.get_model({provider!r})
+    first_model = time.perf_counter() - start
+except ValueError:
+    first_model = None
+print(json.dumps({{"import": imported, "first_model": first_model}}))
+"""
+
+
+def measure(provider: str) -> dict:
+    """
+    Run the startup probe in a fresh interpreter.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(provider=provider)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", default="anthropic")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = [measure(args.provider) for _ in range(args.runs)]
+    imports = [run["import"] for run in runs]
+    first_models = [
+        run["first_model"] for run in runs if run["first_model"] is not None
+    ]
+    results = {
+        "runs": args.runs,
+        "import_median_seconds": statistics.median(imports),
+        "import_max_seconds": max(imports),
+        "provider": args.provider,
+        "first_model_median_seconds": (
+            statistics.median(first_models) if first_models else None
+        ),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,516 @@
+import asyncio
+import json
 import logging
 import shutil
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.formparsers import MultiPartParser
 
 from src.config.settings import settings
 from src.models.schemas import (
+    JobRequest,
+    JobStatus,
+    PathCompareReq,
     PathSummaryReq,
+    ProviderName,
     SummaryCompareReq,
     SummaryCompareResp,
-    SummaryRequest
+    SummaryRequest,
+    SummaryResponse,
+    SummaryType,
 )
 from src.processors.document import DocumentProcessor
-from src.services import ModelManager, SummaryGenerator
+from src.processors.shared import SharedText
+from src.services import ManifestStore, ModelManager, SummaryCache, SummaryGenerator
+from src.services.jobs import JobStore, JobWorkerPool
+from src.services.metrics import HTTP_REQUEST_SECONDS, REGISTRY
+from src.services.tracing import StackSampler, in_context, span, start_trace
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Uploaded files stay in memory up to UPLOAD_SPOOL_SIZE and spill to a
+# temporary file above it (the attribute was renamed in Starlette 0.46)
+for attribute in ("spool_max_size", "max_file_size"):
+    if hasattr(MultiPartParser, attribute):
+        setattr(MultiPartParser, attribute, settings.UPLOAD_SPOOL_SIZE)
+
+
+# Background job workers, started with the app
+job_pool: Optional[JobWorkerPool] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the background job workers for the lifetime of the app.
+    """
+    global job_pool
+    store = JobStore(settings.JOB_DB_PATH, lease_seconds=settings.JOB_LEASE_SECONDS)
+    job_pool = JobWorkerPool(
+        store,
+        doc_processor,
+        summary_generator,
+        workers=settings.JOB_WORKERS,
+        poll_interval=settings.JOB_POLL_INTERVAL,
+    )
+    job_pool.start()
+    yield
+    job_pool.stop(timeout=5)
+    job_pool = None
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Document Summary API",
     description="API for generating and comparing document summaries using different LLMs",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    """
+    Observe the handling time of every request by route.
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    return response
+
+
+def wants_trace(request: Request) -> bool:
+    """
+    Whether the client asked for the timing tree of its request.
+    """
+    return request.headers.get("x-debug-trace", "").lower() in (
+        "1",
+        "true",
+    ) or request.query_params.get("trace", "").lower() in ("1", "true")
+
+
+# Samples the stacks of every request being profiled
+stack_sampler = StackSampler(settings.PROFILE_INTERVAL)
+
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    Add a timing tree to the JSON response of requests sent with an
+    X-Debug-Trace: 1 header or a trace=1 query parameter, and dump a stack
+    profile of requests slower than PROFILE_SLOW_REQUESTS seconds.
+    """
+    trace = wants_trace(request)
+    threshold = settings.PROFILE_SLOW_REQUESTS
+    if not trace and threshold is None:
+        return await call_next(request)
+
+    profile = stack_sampler.open() if threshold is not None else None
+    start = time.perf_counter()
+    try:
+        if trace:
+            with start_trace(f"{request.method} {request.url.path}") as root:
+                response = await call_next(request)
+        else:
+            response = await call_next(request)
+    finally:
+        elapsed = time.perf_counter() - start
+        if profile is not None:
+            stack_sampler.close(profile)
+
+    if profile is not None and threshold is not None and elapsed >= threshold:
+        name = request.url.path.strip("/").replace("/", "_") or "root"
+        path = Path(settings.PROFILE_DIR) / (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{elapsed * 1000:.0f}ms.folded"
+        )
+        await asyncio.to_thread(profile.dump, path)
+        logger.warning(
+            f"Slow request {request.url.path} took {elapsed:.2f}s, profile: {path}"
+        )
+
+    if not trace or response.headers.get("content-type") != "application/json":
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    data = json.loads(body)
+    if isinstance(data, dict):
+        data["trace"] = root.to_dict()
+    headers = {
+        key: value for key, value in response.headers.items() if key != "content-length"
+    }
+    return JSONResponse(data, status_code=response.status_code, headers=headers)
+
+
 # Initialize services
 model_manager = ModelManager()
 doc_processor = DocumentProcessor()
-summary_generator = SummaryGenerator(model_manager)
+summary_cache = SummaryCache() if settings.CACHE_ENABLED else None
+summary_generator = SummaryGenerator(
+    model_manager,
+    cache=summary_cache,
+    manifests=ManifestStore(settings.MANIFEST_DB_PATH),
+)
+
+# Blocking extraction and LLM work runs here, off the event loop
+executor = ThreadPoolExecutor(
+    max_workers=settings.PROVIDER_WORKERS, thread_name_prefix="api-worker"
+)
+
+
+async def run_blocking(func, *args):
+    """
+    Run a blocking call in the API executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, in_context(func), *args)
+
+
+async def timed_summary(func, *args) -> Tuple[SummaryResponse, float]:
+    """
+    Generate a summary in the API executor and measure its latency.
+    """
+    start = time.perf_counter()
+    summary = await run_blocking(func, *args)
+    return summary, time.perf_counter() - start
+
+
+def summaries_response(
+    providers: List[ProviderName], results: List[Tuple[SummaryResponse, float]]
+) -> dict:
+    """
+    Render the summaries and latencies of every provider.
+    """
+    summaries = [summary for summary, _ in results]
+    timings = [
+        {"provider": provider, "seconds": round(elapsed, 3)}
+        for provider, (_, elapsed) in zip(providers, results)
+    ]
+    return {"summaries": summaries, "timings": timings}
+
+
+async def summarize_text(
+    text: str,
+    summary_type: SummaryType,
+    providers: List[ProviderName],
+    document_id: Optional[str],
+    map_reduce: Optional[bool] = None,
+) -> dict:
+    """
+    Summarize a text with every requested provider concurrently.
+    """
+    results = await asyncio.gather(
+        *[
+            timed_summary(
+                summary_generator.generate_summary,
+                SummaryRequest(
+                    text=text,
+                    summary_type=summary_type,
+                    provider=provider,
+                    document_id=document_id,
+                    map_reduce=map_reduce,
+                ),
+            )
+            for provider in providers
+        ]
+    )
+    return summaries_response(providers, results)
+
+
+async def summarize_pieces(
+    iter_pieces: Callable[[], Iterable[str]],
+    summary_type: SummaryType,
+    providers: List[ProviderName],
+    document_id: Optional[str],
+    map_reduce: Optional[bool] = None,
+) -> dict:
+    """
+    Summarize a document from its text pieces with every requested provider
+    concurrently, each reading the pieces iter_pieces returns for it.
+    """
+    results = await asyncio.gather(
+        *[
+            timed_summary(
+                summary_generator.generate_summary_from_pieces,
+                iter_pieces(),
+                summary_type,
+                provider,
+                map_reduce,
+                document_id,
+            )
+            for provider in providers
+        ]
+    )
+    return summaries_response(providers, results)
+
+
+async def summarize_document(
+    document: Union[str, SharedText],
+    summary_type: SummaryType,
+    providers: List[ProviderName],
+    document_id: Optional[str],
+    map_reduce: Optional[bool] = None,
+) -> dict:
+    """
+    Summarize a document opened with DocumentProcessor.open_text: from its
+    text if it was extracted before, so that cached and in-flight summaries
+    are reused, and otherwise from its pieces, extracted once for every
+    provider while the first chunks are summarized.
+    """
+    if isinstance(document, str):
+        return await summarize_text(
+            document, summary_type, providers, document_id, map_reduce
+        )
+    return await summarize_pieces(
+        lambda: document, summary_type, providers, document_id, map_reduce
+    )
 
 
 @app.post("/summarize", response_model=Dict)
-async def generate_summary(file_path: str, summary_type: str = "brief", providers: List[str] = ["anthropic"]):
+async def generate_summary(summary_req: PathSummaryReq):
     """
-    Generate a summary from a file path
+    Generate a summary from a file path with every requested provider concurrently.
+
+    PDF and DOCX files are streamed into chunks while they are extracted,
+    see summarize_document, and TXT files above MAX_FILE_SIZE are streamed
+    instead of loaded.
     """
     try:
+        suffix = Path(summary_req.file_path).suffix.lower()
+        if suffix in doc_processor.STREAMED_FORMATS:
+            with span("extract", file=Path(summary_req.file_path).name):
+                document = await run_blocking(
+                    doc_processor.open_text, summary_req.file_path
+                )
+            return await summarize_document(
+                document,
+                summary_req.summary_type,
+                summary_req.providers,
+                summary_req.document_id,
+                summary_req.map_reduce,
+            )
+
+        if doc_processor.needs_streaming(summary_req.file_path):
+            return await summarize_pieces(
+                partial(doc_processor.iter_text, summary_req.file_path),
+                summary_req.summary_type,
+                summary_req.providers,
+                summary_req.document_id,
+                summary_req.map_reduce,
+            )
 
         # Extract text from file_path
-        text = doc_processor.extract_text(summary_req.file_path)
-                                    
-        # Generate summary
-        summaries = []
-        for provider in providers:
-            summary_req = SummaryRequest(
-                text=text, summary_type=summary_type, provider=provider
+        with span("extract", file=Path(summary_req.file_path).name):
+            text = await run_blocking(doc_processor.extract_text, summary_req.file_path)
+
+        return await summarize_text(
+            text,
+            summary_req.summary_type,
+            summary_req.providers,
+            summary_req.document_id,
+            summary_req.map_reduce,
+        )
+
+    except Exception as e:
+        logger.error(f"Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/summarize/upload", response_model=Dict)
+async def summarize_upload(
+    file: UploadFile = File(...),
+    summary_type: SummaryType = Form("brief"),
+    providers: List[ProviderName] = Form(["anthropic"]),
+    document_id: Optional[str] = Form(None),
+    map_reduce: Optional[bool] = Form(None),
+):
+    """
+    Generate a summary of an uploaded document with every requested provider
+    concurrently.
+
+    The document is extracted straight from the upload buffer, which only
+    spills to disk above UPLOAD_SPOOL_SIZE. PDF and DOCX files are streamed
+    into chunks page by page or paragraph by paragraph.
+    """
+    filename = file.filename or ""
+    streamed = Path(filename).suffix.lower() in doc_processor.STREAMED_FORMATS
+    try:
+        with span("extract", file=filename):
+            if streamed:
+                data = await run_blocking(doc_processor.read_file, file.file, filename)
+                document = await run_blocking(
+                    doc_processor.open_text_from_bytes, data, filename
+                )
+            else:
+                text = await run_blocking(
+                    doc_processor.extract_text_from_file, file.file, filename
+                )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+
+    try:
+        if streamed:
+            return await summarize_document(
+                document, summary_type, providers, document_id, map_reduce
             )
-            summaries.append(summary_generator.generate_summary(summary_req))
-            
-        return {"summaries": summaries}
+        return await summarize_text(
+            text, summary_type, providers, document_id, map_reduce
+        )
 
     except Exception as e:
         logger.error(f"Error processing document: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/compare-summaries", response_model=SummaryCompareResp)
-async def compare_summaries(file_path: str, summaries: List[SummaryResponse], provider: str = "anthropic"):
+def sse_event(event: str, data) -> str:
+    """
+    Format a Server-Sent Event.
     """
-    Generate and compare summaries from different providers for
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_provider(summary_req: SummaryRequest, queue: asyncio.Queue):
     """
+    Summarize with one provider, pushing chunk, delta and summary events to the queue.
+    """
+    provider = summary_req.provider
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+
+    if summary_generator.is_single_pass(summary_req.text, provider):
+        deltas = []
+        try:
+            async for delta in summary_generator.astream_summary(summary_req):
+                deltas.append(delta)
+                await queue.put(("delta", {"provider": provider, "content": delta}))
+            summary = SummaryResponse(
+                provider=provider,
+                summary="".join(deltas),
+                summary_type=summary_req.summary_type,
+            )
+        except Exception as e:
+            logger.error(f"Error streaming summary from {provider}: {e}")
+            summary = SummaryResponse(
+                provider=provider,
+                summary_type=summary_req.summary_type,
+                error=str(e),
+                partial_summary="".join(deltas) if deltas else None,
+            )
+    else:
+
+        def on_chunk(index: int, chunk_summary: str):
+            event = {"provider": provider, "index": index, "summary": chunk_summary}
+            loop.call_soon_threadsafe(queue.put_nowait, ("chunk", event))
+
+        summary = await run_blocking(
+            summary_generator.generate_summary, summary_req, on_chunk
+        )
+
+    await queue.put(
+        (
+            "summary",
+            {
+                **summary.model_dump(),
+                "seconds": round(time.perf_counter() - start, 3),
+            },
+        )
+    )
 
+
+@app.post("/summarize/stream")
+async def stream_summary(summary_req: PathSummaryReq):
+    """
+    Generate summaries with every requested provider, streaming progress as
+    Server-Sent Events: "delta" for tokens of single-call summaries, "chunk"
+    for each chunk summary of long texts, "summary" for each provider result
+    and a final "done".
+    """
     try:
-        # Validate file using DocumentClass
-        doc = DocumentClass(file_path=file_path)
+        text = await run_blocking(doc_processor.extract_text, summary_req.file_path)
+    except Exception as e:
+        logger.error(f"Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(
+                stream_provider(
+                    SummaryRequest(
+                        text=text,
+                        summary_type=summary_req.summary_type,
+                        provider=provider,
+                        map_reduce=summary_req.map_reduce,
+                    ),
+                    queue,
+                )
+            )
+            for provider in summary_req.providers
+        ]
+        pending = len(tasks)
+        try:
+            while pending:
+                event, data = await queue.get()
+                if event == "summary":
+                    pending -= 1
+                yield sse_event(event, data)
+            yield sse_event("done", {"providers": summary_req.providers})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 
+@app.post("/compare-summaries", response_model=SummaryCompareResp)
+async def compare_summaries(compare_req: PathCompareReq):
+    """
+    Compare and evaluate summaries, optionally against the source document.
+    """
+
+    try:
         # Extract text from document
-        text = doc_processor.extract_text(doc)
+        text = None
+        if compare_req.file_path:
+            with span("extract", file=Path(compare_req.file_path).name):
+                text = await run_blocking(
+                    doc_processor.extract_text, compare_req.file_path
+                )
 
-        # Generate summaries from all requested providers
-        summaries = []
-        
-        compare_req = SummaryCompareReq(text=text, summaries=summaries, provider=provider)
-        evaluation = summary_generator.compare_summaries(compare_req)
+        summary_compare_req = SummaryCompareReq(
+            text=text,
+            summaries=compare_req.summaries,
+            provider=compare_req.provider,
+            token_budget=compare_req.token_budget,
+        )
+        evaluation = await run_blocking(
+            summary_generator.compare_summaries, summary_compare_req
+        )
 
         return evaluation
 
@@ -86,6 +519,53 @@ async def compare_summaries(file_path: str, summaries: List[SummaryResponse], pr
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(job_request: JobRequest):
+    """
+    Queue a summarize or compare job. Poll GET /jobs/{id} for its progress.
+    """
+    if job_pool is None:
+        raise HTTPException(status_code=503, detail="Job workers are not running")
+    job_id = await run_blocking(job_pool.submit, job_request)
+    return await run_blocking(job_pool.store.get, job_id)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """
+    Status, progress and result of a job.
+    """
+    if job_pool is None:
+        raise HTTPException(status_code=503, detail="Job workers are not running")
+    job = await run_blocking(job_pool.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@app.get("/stats")
+async def stats():
+    """
+    Runtime counters of the summary services.
+    """
+    return {
+        "cache": summary_cache.stats() if summary_cache else None,
+        "admission": model_manager.admission_stats(),
+        "providers": model_manager.provider_stats(),
+        "coalescing": summary_generator.coalescing_stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Stage timings, call counters and token counts in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/health")
 async def health_check():
     """
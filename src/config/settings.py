@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
 # from pydantic import ConfigDict
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -23,10 +23,102 @@ class Settings(BaseSettings):
 
     # Documents
     MAX_FILE_SIZE: int = 10 * 1024 * 1024
+    # Streamed TXT files are read in blocks and have no size limit
+    TXT_STREAM_BLOCK_SIZE: int = 1024 * 1024
+    UPLOAD_SPOOL_SIZE: int = 2 * 1024 * 1024
+    TEXT_CACHE_MAX_ENTRIES: int = 128
+    TEXT_CACHE_DIR: Optional[str] = None
+    PDF_PARALLEL_PAGE_THRESHOLD: int = 200
+    PDF_WORKERS: int = 4
 
-    CHUNK_SIZE: int = 4000
+    # Chunk sizes are measured in model tokens
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 0
+    SINGLE_PASS_TOKENS: int = 2500
+    COMPARE_TOKEN_BUDGET: int = 8000
+    # Map-reduce merges chunk summaries in groups of at most REDUCE_FAN_IN
+    # summaries and REDUCE_TOKENS tokens, sized to the provider's context
+    MAP_REDUCE: bool = False
+    REDUCE_FAN_IN: int = 8
+    REDUCE_TOKENS: int = 6000
+    PROVIDER_REDUCE_TOKENS: Dict[str, int] = {}
     REQUEST_TIMEOUT: int = 30
     MAX_RETRIES: int = 3
 
+    # Concurrency
+    CHUNK_WORKERS: int = 16
+    CHUNK_CONCURRENCY: int = 4
+    PROVIDER_CONCURRENCY: Dict[str, int] = {}
+    PROVIDER_WORKERS: int = 8
+
+    # Provider admission: {"openai": {"rpm": 500, "tpm": 30000}}
+    PROVIDER_RATE_LIMITS: Dict[str, Dict[str, int]] = {}
+    AIMD_MAX_CONCURRENCY: int = 16
+    RETRY_BASE_DELAY: float = 1.0
+    RETRY_MAX_DELAY: float = 30.0
+
+    # Hedging and failover
+    LATENCY_WINDOW: int = 500
+    HEDGE_ENABLED: bool = False
+    HEDGE_DELAY: Optional[float] = None
+    HEDGE_PROVIDERS: Dict[str, str] = {}
+    HEDGE_WORKERS: int = 32
+    CIRCUIT_FAILURE_RATE: float = 0.5
+    CIRCUIT_WINDOW: int = 20
+    CIRCUIT_MIN_CALLS: int = 10
+    CIRCUIT_OPEN_SECONDS: float = 30.0
+    FAILOVER_PROVIDERS: Dict[str, List[str]] = {}
+
+    # Micro-batching: calls to these providers starting within BATCH_WINDOW_MS
+    # of each other are sent as one batch of at most BATCH_MAX_SIZE prompts
+    BATCH_PROVIDERS: List[str] = []
+    BATCH_WINDOW_MS: float = 10.0
+    BATCH_MAX_SIZE: int = 16
+
+    # Summary cache
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_TTL: int = 7 * 24 * 60 * 60
+    CACHE_DB_PATH: Optional[str] = None
+    # Chunk manifests of documents with a document_id, kept without expiry
+    # in this database, or in a bounded in-memory LRU if unset
+    MANIFEST_DB_PATH: Optional[str] = None
+    MANIFEST_MAX_ENTRIES: int = 10000
+
+    # Background jobs
+    JOB_DB_PATH: str = ".cache/jobs.db"
+    JOB_WORKERS: int = 2
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_LEASE_SECONDS: int = 600
+
+    # Profiling: dump a stack profile of requests slower than this many seconds
+    PROFILE_SLOW_REQUESTS: Optional[float] = None
+    PROFILE_DIR: str = ".cache/profiles"
+    PROFILE_INTERVAL: float = 0.005
+
+    # Local fake provider for load tests
+    FAKE_PROVIDER_ENABLED: bool = False
+    FAKE_LATENCY_MEDIAN: float = 0.5
+    FAKE_LATENCY_SIGMA: float = 0.5
+    FAKE_ERROR_RATE: float = 0.0
+    FAKE_RATE_LIMIT_RATE: float = 0.0
+    FAKE_OUTPUT_TOKENS: int = 150
+
+    # Extractive pre-filter: chunks are cut to their most central sentences,
+    # EXTRACTIVE_RATIO of their tokens, before they are sent to a provider
+    EXTRACTIVE_PREFILTER: bool = False
+    EXTRACTIVE_RATIO: float = 0.5
+    # Offline "extractive" provider answering with the most central sentences
+    EXTRACTIVE_PROVIDER_ENABLED: bool = True
+    EXTRACTIVE_SUMMARY_TOKENS: int = 200
+
+    # Near-duplicate chunks: MinHash signatures in an LSH index of the text
+    # and of the last DEDUP_INDEX_SIZE chunks summarized per provider
+    DEDUP_ENABLED: bool = False
+    DEDUP_THRESHOLD: float = 0.85
+    DEDUP_PERMUTATIONS: int = 64
+    DEDUP_BANDS: int = 16
+    DEDUP_INDEX_SIZE: int = 10000
+
 
 settings = Settings()
@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -8,6 +8,15 @@ from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Providers a request can name
+ProviderName = Literal["openai", "anthropic", "gemma", "fake", "extractive"]
+
+# Kinds of summary a request can ask for
+SummaryType = Literal["brief", "detailed", "bullets"]
+
+# Texts a comparison prompt can be built from
+CompareSource = Literal["raw", "condensed", "excerpts"]
+
 
 class DocumentClass(BaseModel):
     """
@@ -32,8 +41,22 @@ class SummaryRequest(BaseModel):
     """
 
     text: str = Field(..., min_length=1)
-    summary_type: Literal["brief", "detailed", "bullets"] = "brief"
-    provider: Literal["openai", "anthropic", "gemma"] = "anthropic"
+    summary_type: SummaryType = "brief"
+    provider: ProviderName = "anthropic"
+    document_id: Optional[str] = None
+    map_reduce: Optional[bool] = None
+
+
+class PathSummaryReq(BaseModel):
+    """
+    Input for summarizing a document on the server by its path.
+    """
+
+    file_path: str
+    summary_type: SummaryType = "brief"
+    providers: List[ProviderName] = ["anthropic"]
+    document_id: Optional[str] = None
+    map_reduce: Optional[bool] = None
 
 
 class SummaryResponse(BaseModel):
@@ -46,6 +69,11 @@ class SummaryResponse(BaseModel):
     summary_type: str
     error: Optional[str] = None
     partial_summary: Optional[str] = None
+    chunks_reused: Optional[int] = None
+    chunks_regenerated: Optional[int] = None
+    reduce_depth: Optional[int] = None
+    total_tokens: Optional[int] = None
+    chunks_deduplicated: Optional[int] = None
 
 
 class SummaryCompareReq(BaseModel):
@@ -56,6 +84,18 @@ class SummaryCompareReq(BaseModel):
     text: Optional[str] = None
     summaries: List[SummaryResponse]
     provider: str = "anthropic"
+    token_budget: Optional[int] = Field(None, gt=0)
+
+
+class PathCompareReq(BaseModel):
+    """
+    Input for comparing summaries of a document on the server.
+    """
+
+    file_path: Optional[str] = None
+    summaries: List[SummaryResponse]
+    provider: str = "anthropic"
+    token_budget: Optional[int] = Field(None, gt=0)
 
 
 class SummaryCompareResp(BaseModel):
@@ -65,3 +105,35 @@ class SummaryCompareResp(BaseModel):
 
     provider: str
     evaluation_of_summaries: str
+    prompt_tokens: Optional[int] = None
+    source: Optional[CompareSource] = None
+
+
+class JobRequest(BaseModel):
+    """
+    Input for a background summarize or compare job.
+    """
+
+    kind: Literal["summarize", "compare"] = "summarize"
+    file_path: Optional[str] = None
+    summary_type: SummaryType = "brief"
+    providers: List[ProviderName] = ["anthropic"]
+    document_id: Optional[str] = None
+    map_reduce: Optional[bool] = None
+    summaries: List[SummaryResponse] = []
+    provider: str = "anthropic"
+    token_budget: Optional[int] = Field(None, gt=0)
+
+
+class JobStatus(BaseModel):
+    """
+    Status, progress and result of a background job.
+    """
+
+    id: str
+    kind: str
+    status: Literal["queued", "running", "completed", "failed"]
+    chunks_done: int = 0
+    chunks_total: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
@@ -0,0 +1,330 @@
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+CHARS_PER_TOKEN = 4
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    Cheap token estimate of roughly four characters per token.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _tiktoken_counter(model: str) -> Callable[[str], int]:
+    """
+    Token counter backed by tiktoken for OpenAI models.
+    """
+    import tiktoken
+
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+
+    def count(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return count
+
+
+# Providers without a local tokenizer fall back to the approximation
+TOKENIZER_FACTORIES = {
+    "openai": lambda: _tiktoken_counter(settings.OPENAI_MODEL),
+}
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(provider: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Return the token counter of a provider.
+
+    Args:
+        provider: LLM provider, None for the approximation
+
+    Returns:
+        A function counting the tokens of a text
+    """
+    factory = TOKENIZER_FACTORIES.get(provider) if provider is not None else None
+    if factory is None:
+        return approximate_token_count
+    try:
+        return factory()
+    except Exception as e:
+        logger.warning(f"Tokenizer for {provider} unavailable, approximating: {e}")
+        return approximate_token_count
+
+
+class _Unit(NamedTuple):
+    text: str
+    tokens: int
+    paragraph_start: bool
+
+
+class TextChunker:
+    """
+    Split text into chunks of at most max_tokens model tokens.
+
+    Chunks end on sentence boundaries and preferably on paragraph
+    boundaries. Consecutive chunks can share overlap_tokens of trailing
+    sentences. Every sentence is tokenized once, so chunking is linear in
+    the length of the text.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = settings.CHUNK_SIZE,
+        overlap_tokens: int = settings.CHUNK_OVERLAP,
+        count_tokens: Callable[[str], int] = approximate_token_count,
+    ):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be positive")
+        if overlap_tokens * 2 >= max_tokens:
+            raise ValueError("overlap_tokens must be less than half of max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Split a text into chunks.
+        """
+        return list(self.iter_chunks([text]))
+
+    def iter_chunks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Incrementally split a stream of text pieces into chunks.
+
+        Pieces are treated as ending on a line break, like the pages of a
+        PDF. Chunks are yielded as soon as they are full.
+        """
+        current: List[_Unit] = []
+        # Number of units in current that are not overlap from the previous chunk
+        state = {"tokens": 0, "fresh": 0}
+
+        def add(unit: _Unit) -> Iterator[str]:
+            while current and state["tokens"] + unit.tokens > self.max_tokens:
+                if not state["fresh"]:
+                    # Only overlap is left and it does not fit with the unit
+                    current.clear()
+                    state["tokens"] = 0
+                    break
+                yield self._emit(current, state)
+            current.append(unit)
+            state["tokens"] += unit.tokens
+            state["fresh"] += 1
+
+        for unit in self._iter_units(pieces):
+            yield from add(unit)
+
+        if state["fresh"]:
+            yield self._render(current)
+
+    def _emit(self, current: List[_Unit], state: dict) -> str:
+        """
+        Render a chunk from the front of current and keep the remainder,
+        preceded by the overlap, as the start of the next chunk.
+        """
+        cut = len(current)
+        tokens = 0
+        paragraph_cut = None
+        for index, unit in enumerate(current):
+            if unit.paragraph_start and index and tokens * 2 >= self.max_tokens:
+                paragraph_cut = index
+            tokens += unit.tokens
+        if paragraph_cut is not None:
+            cut = paragraph_cut
+
+        chunk_units = current[:cut]
+        remainder = current[cut:]
+
+        overlap: List[_Unit] = []
+        overlap_tokens = 0
+        for unit in reversed(chunk_units):
+            if overlap_tokens + unit.tokens > self.overlap_tokens:
+                break
+            overlap.insert(0, unit._replace(paragraph_start=False))
+            overlap_tokens += unit.tokens
+
+        current[:] = overlap + remainder
+        state["tokens"] = sum(unit.tokens for unit in current)
+        state["fresh"] = len(remainder)
+        return self._render(chunk_units)
+
+    @staticmethod
+    def _render(units: List[_Unit]) -> str:
+        parts = []
+        for index, unit in enumerate(units):
+            if index:
+                parts.append("\n\n" if unit.paragraph_start else " ")
+            parts.append(unit.text)
+        return "".join(parts)
+
+    def _iter_units(self, pieces: Iterable[str]) -> Iterator[_Unit]:
+        """
+        Turn a stream of text pieces into sentence units.
+        """
+        lines: List[str] = []
+        length = 0
+        paragraph_start = True
+        flush_chars = self.max_tokens * CHARS_PER_TOKEN
+
+        for piece in pieces:
+            for line in piece.splitlines():
+                line = line.strip()
+                if line:
+                    lines.append(line)
+                    length += len(line) + 1
+                elif lines:
+                    # A blank line ends the paragraph
+                    yield from self._sentence_units(" ".join(lines), paragraph_start)
+                    lines, length, paragraph_start = [], 0, True
+
+            if length > flush_chars:
+                # Emit the complete sentences of a long paragraph early
+                text = " ".join(lines)
+                sentences = SENTENCE_END.split(text)
+                tail = sentences.pop()
+                if sentences:
+                    yield from self._sentence_units(
+                        " ".join(sentences), paragraph_start
+                    )
+                    paragraph_start = False
+                if len(tail) > flush_chars:
+                    # No sentence end in sight, emit all but the last word window
+                    windows = list(self._split_words(tail))
+                    tail = windows.pop()
+                    for window in windows:
+                        yield _Unit(window, self.count_tokens(window), paragraph_start)
+                        paragraph_start = False
+                lines = [tail] if tail else []
+                length = len(tail)
+
+        if lines:
+            yield from self._sentence_units(" ".join(lines), paragraph_start)
+
+    def _sentence_units(self, text: str, paragraph_start: bool) -> Iterator[_Unit]:
+        """
+        Split a paragraph into sentence units, splitting oversized sentences
+        on words.
+        """
+        for sentence in SENTENCE_END.split(text):
+            if not sentence:
+                continue
+            tokens = self.count_tokens(sentence)
+            if tokens <= self.max_tokens:
+                yield _Unit(sentence, tokens, paragraph_start)
+            else:
+                for part in self._split_words(sentence):
+                    yield _Unit(part, self.count_tokens(part), paragraph_start)
+                    paragraph_start = False
+                continue
+            paragraph_start = False
+
+    def _split_words(self, sentence: str) -> Iterator[str]:
+        """
+        Split an oversized sentence into word windows of at most max_tokens.
+        """
+        words: List[str] = []
+        tokens = 0
+        for word in sentence.split():
+            word_tokens = (
+                self.count_tokens(" " + word) if words else self.count_tokens(word)
+            )
+            if words and tokens + word_tokens > self.max_tokens:
+                yield " ".join(words)
+                words, tokens = [], self.count_tokens(word)
+            else:
+                tokens += word_tokens
+            words.append(word)
+        if words:
+            yield " ".join(words)
+
+
+class AnchoredChunker:
+    """
+    Split text into chunks of whole lines with content-defined boundaries.
+
+    A chunk ends after an anchor line, one whose content hash is divisible
+    by anchor_period, once it holds min_tokens. Since boundaries depend on
+    the lines around them rather than on their offsets, an edit only changes
+    the chunks around it and the chunks of the rest of the document keep
+    their content and hash. Lines rather than blank-line paragraphs are the
+    units because PDF and DOCX text separates paragraphs with single line
+    breaks. Lines longer than max_tokens are split on sentences by a
+    TextChunker.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = settings.CHUNK_SIZE,
+        min_tokens: Optional[int] = None,
+        anchor_period: int = 4,
+        count_tokens: Callable[[str], int] = approximate_token_count,
+    ):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        self.min_tokens = max_tokens // 4 if min_tokens is None else min_tokens
+        self.anchor_period = anchor_period
+        self.count_tokens = count_tokens
+        self._splitter = TextChunker(max_tokens, 0, count_tokens)
+
+    def _is_anchor(self, line: str) -> bool:
+        digest = hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.anchor_period == 0
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Split a text into chunks.
+        """
+        return list(self.iter_chunks([text]))
+
+    def iter_chunks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Incrementally split a stream of text pieces into chunks.
+
+        Pieces are treated as ending on a line break, like the pages of a
+        PDF. Lines are kept apart by a line break in chunks, and by a blank
+        line where the text had one.
+        """
+        current: List[str] = []
+        tokens = 0
+        blank = False
+
+        def flush() -> Iterator[str]:
+            nonlocal current, tokens
+            if current:
+                yield "".join(current)
+            current, tokens = [], 0
+
+        for piece in pieces:
+            for line in piece.splitlines():
+                # Normalize whitespace so reindented lines keep their hash
+                line = " ".join(line.split())
+                if not line:
+                    blank = True
+                    continue
+                separator = "\n\n" if blank else "\n"
+                blank = False
+                line_tokens = self.count_tokens(line)
+                if line_tokens > self.max_tokens:
+                    yield from flush()
+                    yield from self._splitter.chunk(line)
+                    continue
+                if current and tokens + line_tokens > self.max_tokens:
+                    yield from flush()
+                current.append(separator + line if current else line)
+                tokens += line_tokens
+                if tokens >= self.min_tokens and self._is_anchor(line):
+                    yield from flush()
+
+        yield from flush()
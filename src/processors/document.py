@@ -1,15 +1,222 @@
+import codecs
+import hashlib
+import io
 import logging
+import mmap
+import multiprocessing
+import os
+import threading
+import weakref
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import (
+    BinaryIO,
+    Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+from xml.etree import ElementTree
 
 import pypdf
-from docx import Document
 
 from ..config.settings import settings
 from ..models.schemas import DocumentClass
+from ..services.cache import LRUCache
+from ..services.metrics import CACHE_LOOKUPS, EXTRACT_SECONDS
+from .shared import SharedText
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A document on disk, or an uploaded document in a binary file object
+Source = Union[Path, BinaryIO]
+
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = WORD_NAMESPACE + "p"
+_W_T = WORD_NAMESPACE + "t"
+_W_TAB = WORD_NAMESPACE + "tab"
+_W_BREAKS = {WORD_NAMESPACE + "br", WORD_NAMESPACE + "cr"}
+_W_TC = WORD_NAMESPACE + "tc"
+_W_BODY = WORD_NAMESPACE + "body"
+
+
+def iter_docx_text(source: Union[Path, BinaryIO]) -> Iterator[str]:
+    """
+    Stream the text of a docx file in document order.
+
+    word/document.xml is read from the zip with an incremental parser and
+    every finished top-level element is dropped, so memory stays flat in
+    the size of the document. Body paragraphs are yielded one by one, empty
+    ones included, and every table cell is yielded as one piece with its
+    paragraphs on separate lines.
+    """
+    with zipfile.ZipFile(source) as archive, archive.open("word/document.xml") as xml:
+        body = None
+        depth = 0
+        # Text runs of the paragraphs being read; text boxes nest paragraphs
+        paragraphs: List[List[str]] = []
+        # Paragraphs of the table cells being read, innermost last
+        cells: List[List[str]] = []
+
+        for event, element in ElementTree.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if element.tag == _W_P:
+                    paragraphs.append([])
+                elif element.tag == _W_BODY:
+                    body = element
+                elif element.tag == _W_TC:
+                    cells.append([])
+                continue
+
+            depth -= 1
+            tag = element.tag
+            if tag == _W_P:
+                paragraph = "".join(paragraphs.pop())
+                if cells:
+                    cells[-1].append(paragraph)
+                else:
+                    yield paragraph
+            elif tag == _W_TC:
+                cell = "\n".join(paragraph for paragraph in cells.pop() if paragraph)
+                if cell:
+                    yield cell
+            elif paragraphs:
+                if tag == _W_T:
+                    paragraphs[-1].append(element.text or "")
+                elif tag == _W_TAB:
+                    paragraphs[-1].append("\t")
+                elif tag in _W_BREAKS:
+                    paragraphs[-1].append("\n")
+
+            if depth == 2 and body is not None:
+                # A top-level block of the body is done, drop it
+                body.clear()
+
+
+# Byte order marks, longest first since UTF-32 LE starts with the UTF-16 LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def detect_encoding(head: bytes) -> str:
+    """
+    Guess the encoding of a text file from its first bytes.
+
+    A byte order mark decides; otherwise the text is UTF-8 if the bytes
+    decode as such, and Windows-1252, which legacy Windows exports use,
+    if they do not.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # head may end inside a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return "cp1252"
+    return "utf-8"
+
+
+def iter_txt_text(
+    source: Source,
+    block_size: int = settings.TXT_STREAM_BLOCK_SIZE,
+    encoding: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Stream the text of a txt file of any size.
+
+    Files on disk are memory-mapped and file objects, such as uploads, are
+    read, and both are decoded block by block, so memory stays flat in the
+    size of the file. Undecodable bytes are replaced rather than failing the
+    document. Every piece ends on a line break, or on a space for lines
+    longer than a block, because chunkers treat piece ends as line ends.
+
+    Args:
+        source: path to the txt file, or a binary file object positioned at
+            its start
+        block_size: number of bytes decoded at a time
+        encoding: encoding of the file, detected from its first block if None
+
+    Returns:
+        Iterator over consecutive pieces of the text
+    """
+    if not isinstance(source, (str, Path)):
+        yield from _decode_blocks(
+            iter(lambda: source.read(block_size), b""), block_size, encoding
+        )
+        return
+
+    with open(source, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            yield from _decode_blocks(
+                (
+                    mapped[offset : offset + block_size]
+                    for offset in range(0, size, block_size)
+                ),
+                block_size,
+                encoding,
+            )
+
+
+def _decode_blocks(
+    blocks: Iterable[bytes], block_size: int, encoding: Optional[str]
+) -> Iterator[str]:
+    """
+    Decode consecutive blocks of a txt file into pieces, see iter_txt_text.
+    """
+    decoder = None
+    carry = ""
+    for block in blocks:
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(encoding or detect_encoding(block))(
+                errors="replace"
+            )
+        text = carry + decoder.decode(block)
+        cut = text.rfind("\n")
+        if cut < 0:
+            cut = text.rfind(" ")
+        if cut < 0 and len(text) > block_size:
+            # No break in sight, split the run of characters
+            cut = len(text) - 1
+        if cut < 0:
+            carry = text
+            continue
+        yield text[: cut + 1]
+        carry = text[cut + 1 :]
+
+    if decoder is None:
+        return
+    text = carry + decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract text from a range of PDF pages. Runs in a worker process.
+    """
+    with open(path, "rb") as f:
+        reader = pypdf.PdfReader(f)
+        return [reader.pages[i].extract_text() for i in range(start, stop)]
+
 
 class DocumentProcessor:
     """
@@ -17,56 +224,457 @@ class DocumentProcessor:
     """
 
     SUPPORTED_FORMATS = {".txt", ".pdf", ".docx"}
+    # Formats summarized from their pieces while later pieces are extracted
+    STREAMED_FORMATS = {".pdf", ".docx"}
+
+    def __init__(
+        self,
+        cache_size: int = settings.TEXT_CACHE_MAX_ENTRIES,
+        cache_dir: Optional[str] = settings.TEXT_CACHE_DIR,
+        pdf_workers: int = settings.PDF_WORKERS,
+        pdf_parallel_threshold: int = settings.PDF_PARALLEL_PAGE_THRESHOLD,
+    ):
+        self.pdf_workers = pdf_workers
+        self.pdf_parallel_threshold = pdf_parallel_threshold
+        self._pdf_pool: Optional[ProcessPoolExecutor] = None
+        self._pdf_pool_lock = threading.Lock()
+        self._text_cache = LRUCache(max_entries=cache_size) if cache_size else None
+        # Documents being extracted by open_text, while they have readers
+        self._shared: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        self._shared_lock = threading.Lock()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
 
-    def extract_text(self, file_path: Path):
+    def extract_text(self, file_path: str):
         """
         Extract text from a document
 
+        Unchanged files are served from the extracted-text cache, which is
+        keyed by the resolved path, modification time and size of the file.
+
         Args:
             file_path: path to the document
 
         Returns:
             Extracted text from the document
         """
-        input_doc = DocumentClass(file_path=file_path)
-        doc_path = Path(input_doc.file_path)
-        doc_suffix = doc_path.suffix
+        doc_path = self._validate(file_path)
+        doc_suffix = doc_path.suffix.lower()
+
+        if self._text_cache is None:
+            return self._extract(doc_path, doc_suffix)
+
+        stat = doc_path.stat()
+        key = (str(doc_path.resolve()), stat.st_mtime_ns, stat.st_size)
+        cached = self._text_cache.get(key)
+        if cached is not None:
+            CACHE_LOOKUPS.inc(cache="text", result="memory_hit")
+            return cached[1]
+
+        content_hash = hashlib.sha256(doc_path.read_bytes()).hexdigest()
+        text = self._load_persisted(content_hash)
+        if text is None:
+            CACHE_LOOKUPS.inc(cache="text", result="miss")
+            text = self._extract(doc_path, doc_suffix)
+            self._persist(content_hash, text)
+        else:
+            CACHE_LOOKUPS.inc(cache="text", result="disk_hit")
+
+        self._text_cache.set(key, (content_hash, text))
+        return text
+
+    def extract_text_from_file(self, fileobj: BinaryIO, filename: str) -> str:
+        """
+        Extract text from a document held in a binary file object, such as
+        an upload spooled in memory, without writing it to disk.
+
+        Uploads are cached by the hash of their content.
+
+        Args:
+            fileobj: seekable binary file object with the document
+            filename: name of the document, whose suffix gives its format
+
+        Returns:
+            Extracted text from the document
+        """
+        doc_suffix = Path(filename).suffix.lower()
+        if doc_suffix not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported format: {doc_suffix}")
+
+        digest = hashlib.sha256()
+        size = 0
+        fileobj.seek(0)
+        for block in iter(lambda: fileobj.read(1024 * 1024), b""):
+            size += len(block)
+            if size > settings.MAX_FILE_SIZE:
+                raise ValueError(f"File size exceeds limit: {filename}")
+            digest.update(block)
+        content_hash = digest.hexdigest()
+        fileobj.seek(0)
+
+        key = ("sha256", content_hash)
+        if self._text_cache is not None:
+            cached = self._text_cache.get(key)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(cache="text", result="memory_hit")
+                return cached[1]
+
+        text = self._load_persisted(content_hash)
+        if text is None:
+            CACHE_LOOKUPS.inc(cache="text", result="miss")
+            text = self._extract(fileobj, doc_suffix)
+            self._persist(content_hash, text)
+        else:
+            CACHE_LOOKUPS.inc(cache="text", result="disk_hit")
+
+        if self._text_cache is not None:
+            self._text_cache.set(key, (content_hash, text))
+        return text
+
+    def extract_text_from_bytes(self, data: bytes, filename: str) -> str:
+        """
+        Extract text from the content of a document, see extract_text_from_file.
+        """
+        return self.extract_text_from_file(io.BytesIO(data), filename)
+
+    def open_text(self, file_path: str) -> Union[str, SharedText]:
+        """
+        Open a document to be summarized while it is extracted.
+
+        A document extracted before is served from the extracted-text cache
+        as its text. Otherwise its pieces are extracted as they are read,
+        once for every reader, see SharedText, and the text is cached once
+        the document has been read to the end. Concurrent calls for the same
+        document share its SharedText.
 
+        Args:
+            file_path: path to the document
+
+        Returns:
+            The text of the document, or its shared pieces
+        """
+        doc_path = self._validate(file_path)
+        stat = doc_path.stat()
+        return self._open(
+            (str(doc_path.resolve()), stat.st_mtime_ns, stat.st_size),
+            lambda: hashlib.sha256(doc_path.read_bytes()).hexdigest(),
+            doc_path,
+            doc_path.suffix.lower(),
+        )
+
+    def open_text_from_bytes(
+        self, data: bytes, filename: str
+    ) -> Union[str, SharedText]:
+        """
+        Open the content of a document to be summarized while it is
+        extracted, see open_text.
+
+        Args:
+            data: content of the document, as returned by read_file
+            filename: name of the document, whose suffix gives its format
+
+        Returns:
+            The text of the document, or its shared pieces
+        """
+        doc_suffix = Path(filename).suffix.lower()
         if doc_suffix not in self.SUPPORTED_FORMATS:
             raise ValueError(f"Unsupported format: {doc_suffix}")
+        content_hash = hashlib.sha256(data).hexdigest()
+        return self._open(
+            ("sha256", content_hash),
+            lambda: content_hash,
+            io.BytesIO(data),
+            doc_suffix,
+        )
 
+    def _open(
+        self,
+        key: Hashable,
+        content_hash: Callable[[], str],
+        source: Source,
+        doc_suffix: str,
+    ) -> Union[str, SharedText]:
+        """
+        Look a document up in the extracted-text caches, or share its pieces.
+        """
+        if self._text_cache is not None:
+            cached = self._text_cache.get(key)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(cache="text", result="memory_hit")
+                return cached[1]
+
+        digest = content_hash()
+        text = self._load_persisted(digest)
+        if text is not None:
+            CACHE_LOOKUPS.inc(cache="text", result="disk_hit")
+            if self._text_cache is not None:
+                self._text_cache.set(key, (digest, text))
+            return text
+
+        with self._shared_lock:
+            shared = self._shared.get(key)
+            if shared is None:
+                CACHE_LOOKUPS.inc(cache="text", result="miss")
+                shared = SharedText(
+                    key,
+                    self._iter_pieces(source, doc_suffix),
+                    partial(self._finish_shared, key, digest, doc_suffix),
+                )
+                self._shared[key] = shared
+        return shared
+
+    def _finish_shared(
+        self,
+        key: Hashable,
+        content_hash: str,
+        doc_suffix: str,
+        pieces: Optional[List[str]],
+        seconds: float,
+    ) -> Optional[str]:
+        """
+        Record and cache the extraction of a SharedText, see open_text.
+        """
+        with self._shared_lock:
+            self._shared.pop(key, None)
+        if pieces is None:
+            return None
+        EXTRACT_SECONDS.observe(seconds, format=doc_suffix.lstrip(".") or "txt")
+        text = self._join(pieces, doc_suffix)
+        self._persist(content_hash, text)
+        if self._text_cache is not None:
+            self._text_cache.set(key, (content_hash, text))
+        return text
+
+    def read_file(self, fileobj: BinaryIO, filename: str) -> bytes:
+        """
+        Read the content of a document held in a binary file object, checking
+        its format and size.
+
+        Args:
+            fileobj: seekable binary file object with the document
+            filename: name of the document, whose suffix gives its format
+
+        Returns:
+            Content of the document
+        """
+        doc_suffix = Path(filename).suffix.lower()
+        if doc_suffix not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported format: {doc_suffix}")
+
+        fileobj.seek(0)
+        data = fileobj.read(settings.MAX_FILE_SIZE + 1)
+        if len(data) > settings.MAX_FILE_SIZE:
+            raise ValueError(f"File size exceeds limit: {filename}")
+        return data
+
+    def needs_streaming(self, file_path: str) -> bool:
+        """
+        Whether a document is summarized from its pieces: a PDF or DOCX file,
+        whose first pages or paragraphs are chunked while later ones are
+        parsed, or a txt file above MAX_FILE_SIZE, which can only be read
+        that way.
+        """
+        path = Path(file_path)
+        if path.suffix.lower() in self.STREAMED_FORMATS:
+            return True
+        return (
+            path.suffix.lower() == ".txt"
+            and path.is_file()
+            and path.stat().st_size > settings.MAX_FILE_SIZE
+        )
+
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        """
+        Lazily extract text from a document piece by piece.
+
+        PDF pages are parsed one at a time as the iterator is consumed, so
+        downstream chunking and summarization can start before the whole
+        document has been read. TXT files are memory-mapped and decoded in
+        blocks, and are not bound by MAX_FILE_SIZE.
+
+        Args:
+            file_path: path to the document
+
+        Returns:
+            Iterator over the text of consecutive pages or paragraphs
+        """
+        check_size = Path(file_path).suffix.lower() != ".txt"
+        doc_path = self._validate(file_path, check_size=check_size)
+        return self._iter_pieces(doc_path, doc_path.suffix.lower())
+
+    def iter_text_from_bytes(self, data: bytes, filename: str) -> Iterator[str]:
+        """
+        Lazily extract text from the content of a document piece by piece,
+        see iter_text.
+
+        Args:
+            data: content of the document, as returned by read_file
+            filename: name of the document, whose suffix gives its format
+
+        Returns:
+            Iterator over the text of consecutive pages or paragraphs
+        """
+        doc_suffix = Path(filename).suffix.lower()
+        if doc_suffix not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported format: {doc_suffix}")
+        return self._iter_pieces(io.BytesIO(data), doc_suffix)
+
+    def _iter_pieces(self, source: Source, doc_suffix: str) -> Iterator[str]:
+        """
+        Extract text from a validated document piece by piece.
+        """
         try:
             if doc_suffix == ".pdf":
-                return self._extract_from_pdf(doc_path)
+                yield from self._iter_pdf_pages(source)
             elif doc_suffix == ".docx":
-                return self._extract_from_docx(doc_path)
+                yield from self._iter_docx_paragraphs(source)
             else:
-                return self._extract_from_txt(doc_path)
+                yield from iter_txt_text(source)
         except Exception as e:
-            logger.error(f"Error processing {doc_path}: {e}")
+            logger.error(f"Error processing {getattr(source, 'name', source)}: {e}")
             raise
 
-    def _extract_from_pdf(self, path: Path):
+    def _validate(self, file_path: str, check_size: bool = True) -> Path:
+        """
+        Validate a document and return its path.
+        """
+        if check_size:
+            doc_path = Path(DocumentClass(file_path=file_path).file_path)
+        else:
+            doc_path = Path(file_path)
+            if not doc_path.exists():
+                raise ValueError(f"File not found: {file_path}")
+        doc_suffix = doc_path.suffix.lower()
+
+        if doc_suffix not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported format: {doc_suffix}")
+
+        return doc_path
+
+    def _load_persisted(self, content_hash: str) -> Optional[str]:
+        """
+        Load previously extracted text of a document from the cache directory.
+        """
+        if self.cache_dir is None:
+            return None
+        cache_file = self.cache_dir / f"{content_hash}.txt"
+        if not cache_file.exists():
+            return None
+        return cache_file.read_text(encoding="utf-8")
+
+    def _persist(self, content_hash: str, text: str):
+        """
+        Write extracted text to the cache directory.
+        """
+        if self.cache_dir is None:
+            return
+        cache_file = self.cache_dir / f"{content_hash}.txt"
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp_file.write_text(text, encoding="utf-8")
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"Could not persist extracted text to {cache_file}: {e}")
+
+    def _extract(self, source: Source, doc_suffix: str):
+        """
+        Extract text from a validated document according to its format.
+        """
+        try:
+            with EXTRACT_SECONDS.time(format=doc_suffix.lstrip(".") or "txt"):
+                if doc_suffix == ".pdf":
+                    return self._extract_from_pdf(source)
+                elif doc_suffix == ".docx":
+                    return self._extract_from_docx(source)
+                else:
+                    return self._extract_from_txt(source)
+        except Exception as e:
+            logger.error(f"Error processing {getattr(source, 'name', source)}: {e}")
+            raise
+
+    @staticmethod
+    def _join(pieces: Iterable[str], doc_suffix: str) -> str:
+        """
+        Join the pieces of a document, see _iter_pieces, into its text.
+        """
+        if doc_suffix == ".pdf":
+            return "\n".join(pieces).strip()
+        elif doc_suffix == ".docx":
+            return "\n".join(pieces)
+        else:
+            return "".join(pieces).strip()
+
+    def _extract_from_pdf(self, source: Source):
         """
         Extract text from PDF file.
         """
+        return self._join(self._iter_pdf_pages(source), ".pdf")
+
+    def _iter_pdf_pages(self, source: Source) -> Iterator[str]:
+        """
+        Extract text from PDF file page by page.
+
+        Documents on disk with at least pdf_parallel_threshold pages are
+        split into page ranges that are extracted in a process pool and
+        yielded back in page order.
+        """
+        if not isinstance(source, Path):
+            for page in pypdf.PdfReader(source).pages:
+                yield page.extract_text()
+            return
+
+        path = source
         with open(path, "rb") as f:
             reader = pypdf.PdfReader(f)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            page_count = len(reader.pages)
+            if self.pdf_workers <= 1 or page_count < self.pdf_parallel_threshold:
+                for page in reader.pages:
+                    yield page.extract_text()
+                return
+
+        # Several ranges per worker keep the workers busy when pages differ in cost
+        range_count = min(page_count, self.pdf_workers * 4)
+        bounds = [page_count * i // range_count for i in range(range_count + 1)]
+        ranges = zip(bounds[:-1], bounds[1:])
+        pool = self._get_pdf_pool()
+        futures = [
+            pool.submit(_extract_page_range, str(path), start, stop)
+            for start, stop in ranges
+        ]
+        for future in futures:
+            yield from future.result()
 
-    def _extract_from_docx(self, path: Path):
+    def _get_pdf_pool(self) -> ProcessPoolExecutor:
+        """
+        Return the process pool for PDF extraction, starting it on first use.
+
+        Workers are spawned rather than forked: the API process runs threads
+        and an event loop whose locks a forked child could inherit held.
+        """
+        with self._pdf_pool_lock:
+            if self._pdf_pool is None:
+                self._pdf_pool = ProcessPoolExecutor(
+                    max_workers=self.pdf_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pdf_pool
+
+    def _extract_from_docx(self, source: Source):
         """
         Extract text from docx file.
         """
-        doc = Document(str(path))
-        return "\n".join([par.text for par in doc.paragraphs])
+        return self._join(self._iter_docx_paragraphs(source), ".docx")
+
+    def _iter_docx_paragraphs(self, source: Source) -> Iterator[str]:
+        """
+        Extract text from docx file paragraph by paragraph, including the
+        text of table cells.
+        """
+        yield from iter_docx_text(source)
 
-    def _extract_from_txt(self, path: Path):
+    def _extract_from_txt(self, source: Source):
         """
-        Extract text from txt file.
+        Extract text from txt file, see iter_txt_text.
         """
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
+        return self._join(iter_txt_text(source), ".txt")
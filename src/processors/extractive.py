@@ -0,0 +1,130 @@
+import re
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from .chunker import SENTENCE_END, approximate_token_count
+
+TERM = re.compile(r"\w{3,}")
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split a text into sentences, treating every line as ending one, so that
+    headings and list items stand on their own.
+    """
+    sentences = []
+    for line in text.splitlines():
+        for sentence in SENTENCE_END.split(line.strip()):
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def _tfidf(sentences: List[str]):
+    """
+    Build the L2-normalized TF-IDF matrix of the sentences in coordinate
+    form, with sublinear term frequencies.
+
+    Returns:
+        Row indices, column indices and values of the non-zero entries, and
+        the number of terms
+    """
+    vocabulary: Dict[str, int] = {}
+    term_ids = []
+    lengths = np.empty(len(sentences), dtype=np.int64)
+    for row, sentence in enumerate(sentences):
+        ids = [
+            vocabulary.setdefault(term, len(vocabulary))
+            for term in TERM.findall(sentence.lower())
+        ]
+        term_ids.extend(ids)
+        lengths[row] = len(ids)
+
+    term_count = len(vocabulary)
+    rows = np.repeat(np.arange(len(sentences), dtype=np.int64), lengths)
+    cols = np.asarray(term_ids, dtype=np.int64)
+    # Merge repeated terms of a sentence into one entry with their count
+    keys, counts = np.unique(rows * term_count + cols, return_counts=True)
+    rows, cols = np.divmod(keys, max(term_count, 1))
+
+    document_frequency = np.bincount(cols, minlength=term_count)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    values = (1 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values**2, minlength=len(sentences)))
+    values /= norms[rows]
+    return rows, cols, values, term_count
+
+
+def rank_sentences(
+    sentences: List[str],
+    damping: float = 0.85,
+    max_iterations: int = 50,
+    tolerance: float = 1e-6,
+) -> np.ndarray:
+    """
+    Score sentences by TextRank centrality over their TF-IDF cosine
+    similarities.
+
+    The similarity matrix S = X X^T is never built: every power iteration
+    multiplies by X^T and then X in coordinate form with np.bincount, so a
+    step costs time linear in the number of terms of the text instead of
+    quadratic in its number of sentences.
+
+    Returns:
+        The score of every sentence; scores sum to one
+    """
+    count = len(sentences)
+    if count == 0:
+        return np.zeros(0)
+    rows, cols, values, term_count = _tfidf(sentences)
+    has_terms = np.bincount(rows, minlength=count) > 0
+
+    def similarity(weights: np.ndarray) -> np.ndarray:
+        # S @ weights without the self-similarity of each sentence
+        terms = np.bincount(cols, weights=values * weights[rows], minlength=term_count)
+        spread = np.bincount(rows, weights=values * terms[cols], minlength=count)
+        return spread - weights * has_terms
+
+    degrees = similarity(np.ones(count))
+    connected = degrees > 1e-12
+    inverse_degrees = np.divide(1.0, degrees, out=np.zeros(count), where=connected)
+
+    scores = np.full(count, 1.0 / count)
+    for _ in range(max_iterations):
+        # Sentences without neighbours spread their score evenly
+        dangling = scores[~connected].sum()
+        updated = (1 - damping) / count + damping * (
+            similarity(scores * inverse_degrees) + dangling / count
+        )
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def extract_sentences(
+    text: str,
+    max_tokens: int,
+    count_tokens: Callable[[str], int] = approximate_token_count,
+) -> str:
+    """
+    Select the most central sentences of a text that fit in max_tokens, in
+    document order, one per line.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+    scores = rank_sentences(sentences)
+
+    selected = []
+    used = 0
+    for index in np.argsort(-scores, kind="stable"):
+        tokens = count_tokens(sentences[index]) + 1
+        if used + tokens <= max_tokens:
+            selected.append(index)
+            used += tokens
+            if max_tokens - used < 2:
+                break
+    return "\n".join(sentences[index] for index in sorted(selected))
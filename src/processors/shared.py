@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Callable, Hashable, Iterator, List, Optional
+
+
+class SharedText:
+    """
+    Text pieces of a document, extracted once and shared by its readers.
+
+    Every iteration replays the pieces extracted so far and extracts the
+    next ones as it reaches them, so concurrent readers, such as the
+    summaries of several providers, parse every page once. text holds the
+    text of the document once it has been read to the end.
+
+    finish receives the pieces and the seconds spent extracting them once
+    the document has been read, or None if extraction failed, and returns
+    the text.
+    """
+
+    def __init__(
+        self,
+        key: Hashable,
+        pieces: Iterator[str],
+        finish: Callable[[Optional[List[str]], float], Optional[str]],
+    ):
+        self.key = key
+        self.text: Optional[str] = None
+        self._source = pieces
+        self._finish = finish
+        self._pieces: List[str] = []
+        self._done = False
+        self._error: Optional[Exception] = None
+        self._seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[str]:
+        index = 0
+        while True:
+            if index == len(self._pieces):
+                with self._lock:
+                    if index == len(self._pieces) and not self._done:
+                        self._extract_next()
+                if self._error is not None:
+                    raise self._error
+                if index == len(self._pieces):
+                    return
+            yield self._pieces[index]
+            index += 1
+
+    def _extract_next(self):
+        """
+        Extract the next piece, or finish the document. Called under the lock.
+        """
+        start = time.perf_counter()
+        try:
+            piece = next(self._source)
+        except StopIteration:
+            self._done = True
+            self._seconds += time.perf_counter() - start
+            self.text = self._finish(self._pieces, self._seconds)
+        except Exception as e:
+            self._done = True
+            self._error = e
+            self._finish(None, self._seconds)
+        else:
+            self._seconds += time.perf_counter() - start
+            self._pieces.append(piece)
@@ -1,2 +1,3 @@
+from .cache import ManifestStore, SummaryCache
 from .model_manager import ModelManager
 from .summary import *
@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _Batch:
+    def __init__(self):
+        self.items: List[Any] = []
+        self.futures: List[Future] = []
+
+
+class MicroBatcher:
+    """
+    Gather concurrent calls into batches.
+
+    The first caller of a batch leads it: it waits up to window seconds for
+    other callers to join, or until the batch holds max_size items, then
+    dispatches the batch in its own thread and fans the results out. The
+    callers that joined wait for and get their own result or exception.
+
+    dispatch receives the items of a batch and returns one result per item,
+    in order; an Exception in place of a result is raised to that item's
+    caller only, while an exception raised by dispatch fails the whole batch.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[Any]], List[Any]],
+        window: float,
+        max_size: int,
+    ):
+        self._dispatch = dispatch
+        self.window = window
+        self.max_size = max_size
+        self._open: Optional[_Batch] = None
+        self._condition = threading.Condition()
+        self._counters = {"batches": 0, "items": 0}
+
+    def call(self, item: Any):
+        """
+        Add item to the open batch, or open one, and return its result.
+        """
+        with self._condition:
+            batch = self._open
+            leader = batch is None
+            if batch is None:
+                batch = self._open = _Batch()
+            future: Future = Future()
+            batch.items.append(item)
+            batch.futures.append(future)
+            if len(batch.items) >= self.max_size:
+                self._open = None
+                self._condition.notify_all()
+
+        if leader:
+            self._gather(batch)
+            self._run(batch)
+        return future.result()
+
+    def _gather(self, batch: _Batch):
+        """
+        Wait until the window of the batch ends or the batch is full.
+        """
+        deadline = time.monotonic() + self.window
+        with self._condition:
+            while self._open is batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._open = None
+                    break
+                self._condition.wait(remaining)
+            self._counters["batches"] += 1
+            self._counters["items"] += len(batch.items)
+
+    def _run(self, batch: _Batch):
+        try:
+            results = self._dispatch(batch.items)
+        except BaseException as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            counters: Dict[str, float] = dict(self._counters)
+        counters["mean_size"] = (
+            counters["items"] / counters["batches"] if counters["batches"] else 0.0
+        )
+        return counters
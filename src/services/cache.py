@@ -0,0 +1,330 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import settings
+from .metrics import CACHE_LOOKUPS
+from .model_manager import get_model_name
+
+logger = logging.getLogger(__name__)
+
+
+def hash_text(text: str) -> str:
+    """
+    Return the hex SHA-256 digest of a text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with TTL eviction.
+    """
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached value, or None when missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entries over capacity.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    On-disk cache shared between processes through a SQLite database.
+    """
+
+    def __init__(self, db_path: str, ttl: Optional[float] = None):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._local = threading.local()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the cached value, or None when missing or expired.
+        """
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self.ttl and created_at + self.ttl < time.time():
+            with conn:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        return value
+
+    def set(self, key: str, value: str):
+        """
+        Store a value, replacing any previous entry.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+
+
+# cache_lookups_total result label of every lookup counter, shared with the text cache
+_LOOKUP_RESULTS = {
+    "memory_hits": "memory_hit",
+    "disk_hits": "disk_hit",
+    "misses": "miss",
+}
+
+
+class SummaryCache:
+    """
+    Content-addressed summary cache with an in-process and an on-disk tier.
+
+    Entries are keyed by the hash of the text, the summary type, the provider
+    and the provider's configured model, so changing a model invalidates its
+    summaries. Whole-document summaries and chunk summaries share the tiers
+    under separate key namespaces.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.CACHE_MAX_ENTRIES,
+        ttl: Optional[float] = settings.CACHE_TTL,
+        db_path: Optional[str] = settings.CACHE_DB_PATH,
+    ):
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.disk = SQLiteCache(db_path, ttl=ttl) if db_path else None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, text: str, summary_type: str, provider: str) -> str:
+        """
+        Build the cache key of a summary.
+
+        Args:
+            kind: key namespace, "summary", "map_reduce", "chunk", "reduce"
+                or "manifest"
+            text: text that is summarized, or the id of a manifest's document
+            summary_type: type of the summary
+            provider: LLM provider
+        """
+        model = get_model_name(provider)
+        return f"{kind}:{provider}:{model}:{summary_type}:{hash_text(text)}"
+
+    def _count(self, counter: str, count: bool):
+        if not count:
+            return
+        with self._lock:
+            self._counters[counter] += 1
+        CACHE_LOOKUPS.inc(cache="summary", result=_LOOKUP_RESULTS[counter])
+
+    def get(self, key: str, count: bool = True) -> Optional[str]:
+        """
+        Look a key up in the memory tier, then in the disk tier.
+
+        Lookups made with count=False, such as the opportunistic ones of
+        comparisons, are left out of the hit and miss counters.
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits", count)
+            return value
+
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Summary cache read failed: {e}")
+                value = None
+            if value is not None:
+                self._count("disk_hits", count)
+                self.memory.set(key, value)
+                return value
+
+        self._count("misses", count)
+        return None
+
+    def set(self, key: str, value: str):
+        """
+        Store a value in both tiers.
+        """
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except sqlite3.Error as e:
+                logger.warning(f"Summary cache write failed: {e}")
+
+    def get_summary(
+        self, text: str, summary_type: str, provider: str, count: bool = True
+    ) -> Optional[str]:
+        return self.get(self.make_key("summary", text, summary_type, provider), count)
+
+    def set_summary(self, text: str, summary_type: str, provider: str, summary: str):
+        self.set(self.make_key("summary", text, summary_type, provider), summary)
+
+    def get_map_reduce(
+        self, text: str, summary_type: str, provider: str, count: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the merged summary of a text with its reduce_depth and
+        total_tokens, see SummaryGenerator._reduce.
+        """
+        key = self.make_key("map_reduce", text, summary_type, provider)
+        value = self.get(key, count)
+        return json.loads(value) if value is not None else None
+
+    def set_map_reduce(
+        self,
+        text: str,
+        summary_type: str,
+        provider: str,
+        summary: str,
+        reduce_depth: Optional[int],
+        total_tokens: Optional[int],
+    ):
+        entry = {
+            "summary": summary,
+            "reduce_depth": reduce_depth,
+            "total_tokens": total_tokens,
+        }
+        self.set(
+            self.make_key("map_reduce", text, summary_type, provider), json.dumps(entry)
+        )
+
+    def get_chunk(self, chunk: str, summary_type: str, provider: str) -> Optional[str]:
+        return self.get(self.make_key("chunk", chunk, summary_type, provider))
+
+    def set_chunk(self, chunk: str, summary_type: str, provider: str, summary: str):
+        self.set(self.make_key("chunk", chunk, summary_type, provider), summary)
+
+    def get_reduce(
+        self, summaries: str, summary_type: str, provider: str
+    ) -> Optional[str]:
+        return self.get(self.make_key("reduce", summaries, summary_type, provider))
+
+    def set_reduce(
+        self, summaries: str, summary_type: str, provider: str, summary: str
+    ):
+        self.set(self.make_key("reduce", summaries, summary_type, provider), summary)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit and miss counters of the cache.
+        """
+        with self._lock:
+            counters: Dict[str, float] = dict(self._counters)
+        lookups = sum(counters.values())
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        counters["hit_rate"] = hits / lookups if lookups else 0.0
+        counters["memory_entries"] = len(self.memory)
+        return counters
+
+
+class ManifestStore:
+    """
+    Chunk manifests of the documents summarized with a document_id.
+
+    Manifests are kept without expiry in a SQLite database when db_path is
+    set, so chunk reuse does not depend on the summary cache. Otherwise the
+    max_entries most recently used manifests are kept in process memory.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: int = settings.MANIFEST_MAX_ENTRIES,
+    ):
+        self.disk = SQLiteCache(db_path) if db_path else None
+        self._memory = LRUCache(max_entries=max_entries)
+
+    def get(
+        self, document_id: str, summary_type: str, provider: str
+    ) -> List[Dict[str, str]]:
+        """
+        Return the chunk manifest stored for the last version of a document:
+        the hash and summary of each of its chunks, in document order.
+        """
+        key = SummaryCache.make_key("manifest", document_id, summary_type, provider)
+        if self.disk is None:
+            value = self._memory.get(key)
+        else:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Manifest read failed: {e}")
+                value = None
+        return json.loads(value) if value is not None else []
+
+    def set(
+        self,
+        document_id: str,
+        summary_type: str,
+        provider: str,
+        manifest: List[Dict[str, str]],
+    ):
+        key = SummaryCache.make_key("manifest", document_id, summary_type, provider)
+        value = json.dumps(manifest)
+        if self.disk is None:
+            self._memory.set(key, value)
+            return
+        try:
+            self.disk.set(key, value)
+        except sqlite3.Error as e:
+            logger.warning(f"Manifest write failed: {e}")
@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls with the same key.
+
+    The first caller of a key runs the call; callers arriving while it is in
+    flight wait for and share its result or exception instead of repeating
+    the call.
+    """
+
+    def __init__(self, name: str = "calls"):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {"executed": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, func: Callable):
+        """
+        Run func for a key, or wait for the call already in flight for it.
+        """
+        with self._lock:
+            in_flight = self._calls.get(key)
+            if in_flight is None:
+                future: Future = Future()
+                self._calls[key] = future
+                self._counters["executed"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if in_flight is not None:
+            return in_flight.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["in_flight"] = len(self._calls)
+        return counters
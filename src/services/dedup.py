@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, List, Optional, Set, Tuple, TypeVar
+
+import numpy as np
+
+from ..config.settings import settings
+
+# Mersenne prime modulus of the MinHash permutations
+_PRIME = (1 << 61) - 1
+_SHINGLE_WORDS = 3
+
+Value = TypeVar("Value")
+
+
+class MinHasher:
+    """
+    MinHash signatures of texts over their word 3-gram shingles.
+
+    Words are hashed with the builtin string hash and combined into shingle
+    hashes with NumPy, and the permutations are applied to all shingles at
+    once, so a chunk of a thousand tokens is signed in a fraction of a
+    millisecond. String hashes are salted per process, so signatures are
+    only comparable within one process, which is where the indexes live.
+    """
+
+    def __init__(self, permutations: int = settings.DEDUP_PERMUTATIONS, seed: int = 1):
+        generator = np.random.default_rng(seed)
+        self.permutations = permutations
+        self._a = generator.integers(1, _PRIME, size=permutations, dtype=np.uint64)
+        self._b = generator.integers(0, _PRIME, size=permutations, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        signed = np.fromiter(map(hash, words), dtype=np.int64, count=len(words))
+        hashes = signed.view(np.uint64) & np.uint64(0xFFFFFFFF)
+        if len(hashes) >= _SHINGLE_WORDS:
+            hashes = (
+                hashes[:-2] * np.uint64(0x9E3779B1)
+                ^ hashes[1:-1] * np.uint64(0x85EBCA77)
+                ^ hashes[2:]
+            ) & np.uint64(0xFFFFFFFF)
+        elif len(hashes) == 0:
+            hashes = np.zeros(1, dtype=np.uint64)
+        # Products wrap around 64 bits, as in common MinHash implementations;
+        # multipliers spanning the whole modulus keep the permutations
+        # independent, while small ones would all favour the smallest hash
+        permuted = (np.outer(hashes, self._a) + self._b) % np.uint64(_PRIME)
+        return (permuted & np.uint64(0xFFFFFFFF)).min(axis=0)
+
+
+class LSHIndex(Generic[Value]):
+    """
+    Locality-sensitive hashing index of MinHash signatures.
+
+    Signatures are split into bands, and texts sharing a band are candidate
+    near-duplicates; a candidate matches if the share of equal signature
+    entries, an estimate of the Jaccard similarity of the two texts, is at
+    least threshold. The oldest entries are evicted above max_entries.
+    """
+
+    def __init__(
+        self,
+        bands: int = settings.DEDUP_BANDS,
+        threshold: float = settings.DEDUP_THRESHOLD,
+        max_entries: Optional[int] = settings.DEDUP_INDEX_SIZE,
+    ):
+        self.bands = bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[np.ndarray, Value]]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        if len(signature) % self.bands == 0:
+            return [band.tobytes() for band in signature.reshape(self.bands, -1)]
+        return [band.tobytes() for band in np.array_split(signature, self.bands)]
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[Hashable, Value]]:
+        """
+        Return the key and value of the most similar indexed signature at or
+        above the threshold, if any.
+        """
+        with self._lock:
+            candidates: Set[Hashable] = set()
+            for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(band_key, ()))
+            best = None
+            best_similarity = self.threshold
+            for key in candidates:
+                indexed, value = self._entries[key]
+                similarity = float(np.mean(indexed == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = (key, value), similarity
+            return best
+
+    def add(self, key: Hashable, signature: np.ndarray, value: Value):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (signature, value)
+            for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(band_key, set()).add(key)
+            while (
+                self.max_entries is not None and len(self._entries) > self.max_entries
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable):
+        signature, _ = self._entries.pop(key)
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[band_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
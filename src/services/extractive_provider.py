@@ -0,0 +1,66 @@
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ..config.settings import settings
+from ..processors.chunker import approximate_token_count
+from ..processors.extractive import extract_sentences
+
+
+class ExtractiveChatModel(BaseChatModel):
+    """
+    Offline chat model answering with the most central sentences of the
+    prompt, ranked by TextRank over TF-IDF similarities.
+
+    Summarization prompts start with an instruction line ending in a colon,
+    possibly after a preamble; these lines are not part of the text and are
+    dropped. Bullet summaries are answered with one bullet per sentence.
+    """
+
+    max_tokens: int = 200
+
+    @classmethod
+    def from_settings(cls) -> "ExtractiveChatModel":
+        return cls(max_tokens=settings.EXTRACTIVE_SUMMARY_TOKENS)
+
+    @property
+    def _llm_type(self) -> str:
+        return "extractive"
+
+    @staticmethod
+    def _split_instruction(prompt: str):
+        """
+        Split a prompt into its instruction and its text.
+        """
+        lines = prompt.split("\n")
+        for index, line in enumerate(lines[:2]):
+            if line.rstrip().endswith(":"):
+                return "\n".join(lines[: index + 1]), "\n".join(lines[index + 1 :])
+        return "", prompt
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = "\n".join(str(message.content) for message in messages)
+        instruction, text = self._split_instruction(prompt)
+        summary = extract_sentences(text, self.max_tokens)
+        if "bullet" in instruction.lower():
+            summary = "\n".join(
+                f"- {sentence}" for sentence in summary.split("\n") if sentence
+            )
+
+        input_tokens = approximate_token_count(prompt)
+        output_tokens = approximate_token_count(summary)
+        return AIMessage(
+            content=summary,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
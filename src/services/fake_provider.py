@@ -0,0 +1,162 @@
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from ..config.settings import settings
+from ..processors.chunker import approximate_token_count
+
+
+class FakeProviderError(Exception):
+    """
+    Error raised by the fake provider, carrying an HTTP status code like
+    the errors of the provider SDKs.
+    """
+
+    def __init__(
+        self, status_code: int, message: str, retry_after: Optional[float] = None
+    ):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Local chat model answering with filler text, for load tests without
+    paying for API calls.
+
+    Latencies are drawn from a log-normal distribution around
+    latency_median. A call fails with a 500 error with probability
+    error_rate and is rate limited with a 429 error with probability
+    rate_limit_rate.
+
+    Batches are answered like a provider batch endpoint: after a single
+    latency draw, with every prompt failing independently.
+    """
+
+    latency_median: float = 0.5
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    output_tokens: int = 150
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._random = random.Random(self.seed)
+
+    @classmethod
+    def from_settings(cls) -> "FakeChatModel":
+        return cls(
+            latency_median=settings.FAKE_LATENCY_MEDIAN,
+            latency_sigma=settings.FAKE_LATENCY_SIGMA,
+            error_rate=settings.FAKE_ERROR_RATE,
+            rate_limit_rate=settings.FAKE_RATE_LIMIT_RATE,
+            output_tokens=settings.FAKE_OUTPUT_TOKENS,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self.latency_median * self._random.lognormvariate(0, self.latency_sigma)
+
+    def _check_failure(self):
+        draw = self._random.random()
+        if draw < self.rate_limit_rate:
+            raise FakeProviderError(429, "Too Many Requests", retry_after=1.0)
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise FakeProviderError(500, "Internal Server Error")
+
+    def _content(self) -> str:
+        return " ".join(["summary"] * self.output_tokens)
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = "".join(str(message.content) for message in messages)
+        input_tokens = approximate_token_count(prompt)
+        return AIMessage(
+            content=self._content(),
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": input_tokens + self.output_tokens,
+            },
+        )
+
+    def _batch_messages(self, inputs: List[Any], return_exceptions: bool) -> List[Any]:
+        results: List[Any] = []
+        for value in inputs:
+            try:
+                self._check_failure()
+                messages = self._convert_input(value).to_messages()
+                results.append(self._message(messages))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def batch(
+        self,
+        inputs: List[Any],
+        config=None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> List[Any]:
+        time.sleep(self._latency())
+        return self._batch_messages(inputs, return_exceptions)
+
+    async def abatch(
+        self,
+        inputs: List[Any],
+        config=None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> List[Any]:
+        await asyncio.sleep(self._latency())
+        return self._batch_messages(inputs, return_exceptions)
+
+    def _generate(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self._latency())
+        self._check_failure()
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self._latency())
+        self._check_failure()
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    def _stream(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._latency())
+        self._check_failure()
+        for index, word in enumerate(self._content().split(" ")):
+            content = f" {word}" if index else word
+            yield ChatGenerationChunk(message=AIMessageChunk(content=content))
+
+    async def _astream(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._latency())
+        self._check_failure()
+        for index, word in enumerate(self._content().split(" ")):
+            content = f" {word}" if index else word
+            yield ChatGenerationChunk(message=AIMessageChunk(content=content))
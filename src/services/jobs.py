@@ -0,0 +1,377 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..config.settings import settings
+from ..models.schemas import (
+    JobRequest,
+    JobStatus,
+    SummaryCompareReq,
+    SummaryRequest,
+)
+from ..processors.document import DocumentProcessor
+from .cache import hash_text
+from .summary import SummaryGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """
+    SQLite-backed store of background jobs and their finished chunk summaries.
+
+    The store can be shared by several processes. Running jobs hold a lease
+    that their worker renews while it runs them; jobs whose lease expired
+    are handed out again, so work of a crashed worker is resumed elsewhere.
+    """
+
+    def __init__(
+        self,
+        db_path: str = settings.JOB_DB_PATH,
+        lease_seconds: float = settings.JOB_LEASE_SECONDS,
+    ):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "request TEXT NOT NULL, text_hash TEXT, "
+                "chunks_done INTEGER NOT NULL DEFAULT 0, "
+                "chunks_total INTEGER NOT NULL DEFAULT 0, "
+                "result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_chunks ("
+                "job_id TEXT NOT NULL, provider TEXT NOT NULL, idx INTEGER NOT NULL, "
+                "summary TEXT NOT NULL, PRIMARY KEY (job_id, provider, idx))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_request: JobRequest) -> str:
+        """
+        Store a new queued job and return its id.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, request, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, job_request.kind, job_request.model_dump_json(), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """
+        Return the status of a job, or None if it does not exist.
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT id, kind, status, chunks_done, chunks_total, result, error "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return JobStatus(
+            id=row[0],
+            kind=row[1],
+            status=row[2],
+            chunks_done=row[3],
+            chunks_total=row[4],
+            result=json.loads(row[5]) if row[5] else None,
+            error=row[6],
+        )
+
+    def get_request(self, job_id: str) -> JobRequest:
+        row = (
+            self._connection()
+            .execute("SELECT request FROM jobs WHERE id = ?", (job_id,))
+            .fetchone()
+        )
+        return JobRequest.model_validate_json(row[0])
+
+    def claim(self) -> Optional[str]:
+        """
+        Atomically take the oldest queued job, or a running job whose lease
+        expired, and mark it as running.
+        """
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND updated_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now - self.lease_seconds,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                (now, row[0]),
+            )
+        return row[0]
+
+    def renew(self, job_id: str):
+        """
+        Extend the lease of a running job.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+
+    def start_text(self, job_id: str, text_hash: str):
+        """
+        Record the hash of the text a job works on. Chunk summaries stored
+        for a different text are discarded.
+        """
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT text_hash FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row and row[0] != text_hash:
+                conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            conn.execute(
+                "UPDATE jobs SET text_hash = ?, updated_at = ? WHERE id = ?",
+                (text_hash, time.time(), job_id),
+            )
+
+    def set_total(self, job_id: str, chunks_total: int, chunks_done: int = 0):
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET chunks_total = ?, chunks_done = ?, updated_at = ? "
+                "WHERE id = ?",
+                (chunks_total, chunks_done, time.time(), job_id),
+            )
+
+    def add_chunk(self, job_id: str, provider: str, index: int, summary: str):
+        """
+        Persist a finished chunk summary and advance the job's progress.
+        """
+        with self._connection() as conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO job_chunks (job_id, provider, idx, summary) "
+                "VALUES (?, ?, ?, ?)",
+                (job_id, provider, index, summary),
+            ).rowcount
+            conn.execute(
+                "UPDATE jobs SET chunks_done = chunks_done + ?, updated_at = ? "
+                "WHERE id = ?",
+                (inserted, time.time(), job_id),
+            )
+
+    def chunks(self, job_id: str, provider: str) -> Dict[int, str]:
+        """
+        Return the chunk summaries a job already finished for a provider.
+        """
+        rows = self._connection().execute(
+            "SELECT idx, summary FROM job_chunks WHERE job_id = ? AND provider = ?",
+            (job_id, provider),
+        )
+        return {index: summary for index, summary in rows}
+
+    def complete(self, job_id: str, result: dict):
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', result = ?, "
+                "chunks_done = chunks_total, updated_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id),
+            )
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def fail(self, job_id: str, error: str):
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+
+class JobWorkerPool:
+    """
+    Worker threads that drain the job store with bounded concurrency.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        doc_processor: DocumentProcessor,
+        summary_generator: SummaryGenerator,
+        workers: int = settings.JOB_WORKERS,
+        poll_interval: float = settings.JOB_POLL_INTERVAL,
+    ):
+        self.store = store
+        self.doc_processor = doc_processor
+        self.summary_generator = summary_generator
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """
+        Start the worker threads. Jobs left unfinished by an earlier run are
+        picked up once their lease expires.
+        """
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, job_request: JobRequest) -> str:
+        """
+        Queue a job and wake up an idle worker.
+        """
+        job_id = self.store.create(job_request)
+        self._wakeup.set()
+        return job_id
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job_id = self.store.claim()
+            except sqlite3.Error as e:
+                logger.error(f"Could not claim a job: {e}")
+                job_id = None
+            if job_id is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run_job(job_id)
+
+    def run_job(self, job_id: str):
+        """
+        Run a claimed job and store its result.
+
+        A job where every provider failed is marked as failed.
+        """
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job_id, done),
+            name=f"job-heartbeat-{job_id[:8]}",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            job_request = self.store.get_request(job_id)
+            if job_request.kind == "summarize":
+                result = self._summarize(job_id, job_request)
+            else:
+                result = self._compare(job_request)
+            self.store.complete(job_id, result)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.fail(job_id, str(e))
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _heartbeat(self, job_id: str, done: threading.Event):
+        """
+        Renew the lease of a job until it is done, so that a long document or
+        slow providers do not let the job be claimed by another worker.
+        """
+        while not done.wait(self.store.lease_seconds / 3):
+            try:
+                self.store.renew(job_id)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew the lease of job {job_id}: {e}")
+
+    def _summarize(self, job_id: str, job_request: JobRequest) -> dict:
+        if not job_request.file_path:
+            raise ValueError("file_path is required for summarize jobs")
+        text = self.doc_processor.extract_text(job_request.file_path)
+        self.store.start_text(job_id, hash_text(text))
+
+        completed = {
+            provider: self.store.chunks(job_id, provider)
+            for provider in job_request.providers
+        }
+        self.store.set_total(
+            job_id,
+            chunks_total=sum(
+                self.summary_generator.count_chunks(
+                    text, provider, document_id=job_request.document_id
+                )
+                for provider in job_request.providers
+            ),
+            chunks_done=sum(len(chunks) for chunks in completed.values()),
+        )
+
+        summaries = []
+        for provider in job_request.providers:
+            summary = self.summary_generator.generate_summary(
+                SummaryRequest(
+                    text=text,
+                    summary_type=job_request.summary_type,
+                    provider=provider,
+                    document_id=job_request.document_id,
+                    map_reduce=job_request.map_reduce,
+                ),
+                on_chunk=partial(self.store.add_chunk, job_id, provider),
+                completed_chunks=completed[provider],
+            )
+            summaries.append(summary.model_dump())
+
+        errors = [
+            f"{summary['provider']}: {summary['error']}"
+            for summary in summaries
+            if summary["error"]
+        ]
+        if summaries and len(errors) == len(summaries):
+            raise RuntimeError("Every provider failed: " + "; ".join(errors))
+        return {"summaries": summaries}
+
+    def _compare(self, job_request: JobRequest) -> dict:
+        text = None
+        if job_request.file_path:
+            text = self.doc_processor.extract_text(job_request.file_path)
+        evaluation = self.summary_generator.compare_summaries(
+            SummaryCompareReq(
+                text=text,
+                summaries=job_request.summaries,
+                provider=job_request.provider,
+                token_budget=job_request.token_budget,
+            )
+        )
+        return evaluation.model_dump()
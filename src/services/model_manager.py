@@ -1,77 +1,553 @@
+import asyncio
+import contextvars
 import logging
 import os
-# from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from dotenv import load_dotenv
-from langchain_anthropic import ChatAnthropic
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
-from langchain_openai import ChatOpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..config.settings import settings
+from ..processors.chunker import approximate_token_count
+from .batching import MicroBatcher
+from .metrics import LLM_BATCH_SIZE, LLM_CALL_SECONDS, LLM_ERRORS, LLM_TOKENS
+from .rate_limit import AdmissionController, is_retryable_error
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyTracker
+from .tracing import in_context, span
 
 # logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+# Settings field holding the configured model name of each provider
+PROVIDER_MODEL_SETTINGS = {
+    "openai": "OPENAI_MODEL",
+    "anthropic": "ANTHROPIC_MODEL",
+    "gemma": "GOOGLE_MODEL",
+}
+
+
+def get_model_name(provider: str) -> str:
+    """
+    Return the configured model name of a provider.
+    """
+    field = PROVIDER_MODEL_SETTINGS.get(provider)
+    return getattr(settings, field) if field else provider
+
+
+def _used_tokens(response) -> int:
+    """
+    Total tokens reported in a LangChain response's usage metadata.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0)
+
+
+def _record_tokens(provider: str, model: str, usage: Optional[dict]):
+    """
+    Count the prompt and completion tokens of a LangChain usage metadata.
+    """
+    if not usage:
+        return
+    LLM_TOKENS.inc(
+        usage.get("input_tokens", 0), provider=provider, model=model, type="prompt"
+    )
+    LLM_TOKENS.inc(
+        usage.get("output_tokens", 0), provider=provider, model=model, type="completion"
+    )
+
+
+_served: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar(
+    "served_providers", default=None
+)
+
+
+@contextmanager
+def served_providers() -> Iterator[Set[str]]:
+    """
+    Collect the providers that serve the completions made in the block, in
+    this context or in contexts copied from it.
+
+    A completion is served by another provider than the requested one on
+    failover, or when a hedge sent to another provider wins. Collections
+    nest: the providers are added to the enclosing collection as well.
+    """
+    parent = _served.get()
+    served: Set[str] = set()
+    token = _served.set(served)
+    try:
+        yield served
+    finally:
+        _served.reset(token)
+        if parent is not None:
+            parent.update(served)
+
+
+def record_served(*providers: str):
+    """
+    Add providers to the current served_providers collection, if any.
+    """
+    served = _served.get()
+    if served is not None:
+        served.update(providers)
+
+
+def _create_openai():
+    from langchain_openai import ChatOpenAI
+
+    # Retries are handled by the provider's AdmissionController
+    return ChatOpenAI(
+        model=settings.OPENAI_MODEL,
+        temperature=0,
+        # timeout=30,
+        max_retries=0,
+    )
+
+
+def _create_anthropic():
+    from langchain_anthropic import ChatAnthropic
+
+    return ChatAnthropic(
+        model=settings.ANTHROPIC_MODEL,
+        temperature=0,
+        # timeout=30,
+        max_retries=0,
+        max_tokens=2048,
+    )
+
+
+def _create_gemma():
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
+    # Open source models
+    hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
+    if not hf_token:
+        raise ValueError("HUGGINGFACEHUB_API_TOKEN is not set")
+
+    hf_neo = HuggingFaceEndpoint(
+        repo_id=settings.GOOGLE_MODEL,
+        task="text-generation",
+        huggingfacehub_api_token=hf_token,
+    )
+    return ChatHuggingFace(llm=hf_neo)
+
+
+def _create_fake():
+    from .fake_provider import FakeChatModel
+
+    return FakeChatModel.from_settings()
+
+
+def _create_extractive():
+    from .extractive_provider import ExtractiveChatModel
+
+    return ExtractiveChatModel.from_settings()
+
+
+class ProviderFactory(NamedTuple):
+    """
+    Builds the chat model of a provider on first use.
+    """
+
+    create: Callable
+    enabled: Callable[[], bool]
+
+
+PROVIDER_FACTORIES: Dict[str, ProviderFactory] = {
+    "openai": ProviderFactory(
+        _create_openai, lambda: bool(os.getenv("OPENAI_API_KEY"))
+    ),
+    "anthropic": ProviderFactory(
+        _create_anthropic, lambda: bool(os.getenv("ANTHROPIC_API_KEY"))
+    ),
+    "gemma": ProviderFactory(_create_gemma, lambda: os.getenv("USE_GEMMA") == "True"),
+    "fake": ProviderFactory(_create_fake, lambda: settings.FAKE_PROVIDER_ENABLED),
+    "extractive": ProviderFactory(
+        _create_extractive, lambda: settings.EXTRACTIVE_PROVIDER_ENABLED
+    ),
+}
+
+
+def register_provider(
+    name: str, create: Callable, enabled: Callable[[], bool] = lambda: True
+):
+    """
+    Register a chat model factory under a provider name.
+
+    Args:
+        name: provider name used in requests
+        create: function building the LangChain chat model
+        enabled: function telling whether the provider is configured
+    """
+    PROVIDER_FACTORIES[name] = ProviderFactory(create, enabled)
+
 
 class ModelManager:
     """
     Model manager to switch between Anthropic and OpenAI models.
+
+    Chat models are built, and their LangChain integrations imported, on the
+    first completion requested from each provider.
+
+    Calls are tracked per provider: latency percentiles drive optional
+    hedging, and a circuit breaker fails requests over to the providers in
+    FAILOVER_PROVIDERS while a provider keeps erroring. Concurrent calls to
+    the providers in BATCH_PROVIDERS are micro-batched.
     """
 
     def __init__(self):
         self.models = {}
-        self._setup_models()
+        self.admission: Dict[str, AdmissionController] = {}
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self._hedges: Dict[str, Dict[str, int]] = {}
+        self._models_lock = threading.Lock()
+        # One lock per provider, so building a model does not stall the others
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=settings.HEDGE_WORKERS, thread_name_prefix="hedge"
+        )
 
-    def _setup_models(self):
+    @property
+    def providers(self) -> List[str]:
         """
-        Initialize models
+        Names of the configured providers.
         """
+        return [
+            name for name, factory in PROVIDER_FACTORIES.items() if factory.enabled()
+        ] + [name for name in self.models if name not in PROVIDER_FACTORIES]
 
-        if os.getenv("OPENAI_API_KEY"):
-            self.models["openai"] = ChatOpenAI(
-                model=settings.OPENAI_MODEL,
-                temperature=0,
-                # timeout=30,
-                max_retries=settings.MAX_RETRIES,
-            )
+    def get_model(self, provider: str):
+        """
+        Return the chat model of a provider, building it on first use.
+        """
+        model = self.models.get(provider)
+        if model is not None:
+            return model
 
-        if os.getenv("ANTHROPIC_API_KEY"):
-            self.models["anthropic"] = ChatAnthropic(
-                model=settings.ANTHROPIC_MODEL,
-                temperature=0,
-                # timeout=30,
-                max_retries=settings.MAX_RETRIES,
-                max_tokens=2048,
-            )
+        factory = PROVIDER_FACTORIES.get(provider)
+        if factory is None or not factory.enabled():
+            raise ValueError(f"The provider {provider} is not supported.")
+
+        with self._models_lock:
+            build_lock = self._build_locks.setdefault(provider, threading.Lock())
+        with build_lock:
+            model = self.models.get(provider)
+            if model is None:
+                logger.info(f"Initializing {provider} model")
+                model = self.models[provider] = factory.create()
+            return model
+
+    def get_admission(self, provider: str) -> AdmissionController:
+        """
+        Return the admission controller of a provider.
+        """
+        admission = self.admission.get(provider)
+        if admission is None:
+            with self._models_lock:
+                admission = self.admission.setdefault(
+                    provider, AdmissionController.from_settings(provider)
+                )
+        return admission
+
+    def admission_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            provider: admission.stats()
+            for provider, admission in self.admission.items()
+        }
+
+    def get_latency(self, provider: str) -> LatencyTracker:
+        with self._models_lock:
+            return self.latency.setdefault(provider, LatencyTracker())
+
+    def get_breaker(self, provider: str) -> CircuitBreaker:
+        with self._models_lock:
+            return self.breakers.setdefault(provider, CircuitBreaker())
+
+    def get_batcher(self, provider: str) -> MicroBatcher:
+        with self._models_lock:
+            batcher = self.batchers.get(provider)
+            if batcher is None:
+                batcher = self.batchers[provider] = MicroBatcher(
+                    lambda prompts: self._complete_batch(provider, prompts),
+                    window=settings.BATCH_WINDOW_MS / 1000,
+                    max_size=settings.BATCH_MAX_SIZE,
+                )
+            return batcher
+
+    def provider_stats(self) -> Dict[str, dict]:
+        """
+        Latency percentiles, circuit state, hedging and batching counters per
+        provider.
+        """
+        providers = set(self.latency) | set(self.breakers)
+        stats = {
+            provider: {
+                "latency": self.get_latency(provider).stats(),
+                "circuit": self.get_breaker(provider).state,
+                **self._hedges.get(provider, {"hedges": 0, "hedges_won": 0}),
+            }
+            for provider in sorted(providers)
+        }
+        for provider, batcher in self.batchers.items():
+            stats.setdefault(provider, {})["batching"] = batcher.stats()
+        return stats
 
-        # Open source models
-        hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
-        if not hf_token:
-            raise ValueError("HUGGINGFACEHUB_API_TOKEN is not set")
+    def _route(self, provider: str) -> str:
+        """
+        Return the provider to send a call to, failing over while the
+        provider's circuit is open.
+        """
+        if self.get_breaker(provider).allow():
+            return provider
+        for fallback in settings.FAILOVER_PROVIDERS.get(provider, []):
+            if fallback in self.providers and self.get_breaker(fallback).allow():
+                logger.warning(
+                    f"Circuit of {provider} is open, failing over to {fallback}"
+                )
+                return fallback
+        raise CircuitOpenError(f"The circuit of provider {provider} is open.")
+
+    def _hedge_delay(self, provider: str) -> Optional[float]:
+        """
+        Delay after which a call is hedged, None when hedging is off or the
+        provider has too few samples for a p95.
+        """
+        if not settings.HEDGE_ENABLED:
+            return None
+        if settings.HEDGE_DELAY is not None:
+            return settings.HEDGE_DELAY
+        return self.get_latency(provider).percentile(95)
+
+    def _count_hedge(self, provider: str, counter: str):
+        with self._models_lock:
+            counters = self._hedges.setdefault(provider, {"hedges": 0, "hedges_won": 0})
+            counters[counter] += 1
+
+    async def astream_completion(self, provider: str, prompt: str):
+        """
+        Stream chat completion deltas from specified model.
 
-        if os.getenv("USE_GEMMA") == 'True':
-            hf_neo = HuggingFaceEndpoint(
-                repo_id=settings.GOOGLE_MODEL,
-                task="text-generation",
-                huggingfacehub_api_token=hf_token,
+        Streams are admitted like other calls but not retried, since their
+        deltas may already have been forwarded.
+        """
+        provider = self._route(provider)
+        record_served(provider)
+        model = self.get_model(provider)
+        admission = self.get_admission(provider)
+        tokens = approximate_token_count(prompt)
+        admitted = asyncio.ensure_future(asyncio.to_thread(admission.acquire, tokens))
+        try:
+            await asyncio.shield(admitted)
+        except asyncio.CancelledError:
+            # The waiting thread cannot be interrupted, release its slot once it has one
+
+            def release(future: asyncio.Future):
+                if not future.cancelled() and future.exception() is None:
+                    admission.release(tokens=tokens)
+
+            admitted.add_done_callback(release)
+            raise
+
+        model_name = get_model_name(provider)
+        start = time.perf_counter()
+        error = None
+        try:
+            async for chunk in model.astream(prompt):
+                _record_tokens(
+                    provider, model_name, getattr(chunk, "usage_metadata", None)
+                )
+                content = chunk.content
+                if isinstance(content, list):
+                    # Content blocks, as returned by Anthropic models
+                    content = "".join(
+                        block.get("text", "") if isinstance(block, dict) else block
+                        for block in content
+                    )
+                if content:
+                    yield content
+        except Exception as e:
+            error = e
+            LLM_ERRORS.inc(provider=provider, model=model_name)
+            logger.error(f"Error streaming completion from {provider}: {e}")
+            raise
+        finally:
+            admission.release(error=error, tokens=tokens)
+            self.get_breaker(provider).record(error is None)
+            LLM_CALL_SECONDS.observe(
+                time.perf_counter() - start, provider=provider, model=model_name
             )
-            self.models["gemma"] = ChatHuggingFace(llm=hf_neo)
 
-    @retry(
-        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)
-    )
     def get_completion(self, provider: str, prompt: str):
         """
         Get chat completion from specified model.
+
+        The call goes through the provider's admission controller, which
+        applies its rate limits and concurrency and retries rate-limited or
+        transient failures. With HEDGE_ENABLED, a call still running after
+        HEDGE_DELAY, or the provider's observed p95, is raced against a
+        second call to the provider in HEDGE_PROVIDERS (by default the same
+        provider) and the first response wins. Calls to the providers in
+        BATCH_PROVIDERS wait up to BATCH_WINDOW_MS for other calls to join
+        them and are sent as one batch.
+
+        The provider that served the call, which differs from the requested
+        one on failover or a won hedge, is recorded for served_providers.
         """
-        if provider not in self.models:
-            raise ValueError(f"The provider {provider} is not supported.")
+        provider = self._route(provider)
+        hedge_delay = self._hedge_delay(provider)
+        if hedge_delay is None:
+            result = self._call(provider, prompt)
+        else:
+            result, provider = self._hedged_completion(provider, prompt, hedge_delay)
+        record_served(provider)
+        return result
+
+    def _call(self, provider: str, prompt: str):
+        if provider in settings.BATCH_PROVIDERS:
+            try:
+                return self.get_batcher(provider).call(prompt)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    raise
+                # Retried alone by this caller, so the rest of the batch is not held up
+                logger.warning(
+                    f"Batched completion from {provider} failed, retrying alone: {e}"
+                )
+        return self._complete(provider, prompt)
+
+    def _hedged_completion(
+        self, provider: str, prompt: str, hedge_delay: float
+    ) -> Tuple[Any, str]:
+        """
+        Race the call against a hedge sent after hedge_delay seconds.
+
+        A losing call that already started cannot be interrupted; its result
+        is discarded.
+
+        Returns:
+            The result of the winning call and the provider that served it
+        """
+        primary = self._hedge_executor.submit(in_context(self._call), provider, prompt)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result(), provider
+
+        secondary = settings.HEDGE_PROVIDERS.get(provider, provider)
+        if secondary not in self.providers or not self.get_breaker(secondary).allow():
+            return primary.result(), provider
+
+        self._count_hedge(provider, "hedges")
+        hedge = self._hedge_executor.submit(in_context(self._call), secondary, prompt)
+        futures = [primary, hedge]
+        errors = []
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            if future is hedge:
+                self._count_hedge(provider, "hedges_won")
+            for other in futures:
+                other.cancel()
+            return result, secondary if future is hedge else provider
+        raise errors[0]
+
+    def _complete(self, provider: str, prompt: str):
+        """
+        Get chat completion from a provider and record its outcome.
+        """
+        model = self.get_model(provider)
+        admission = self.get_admission(provider)
+        model_name = get_model_name(provider)
+        start = time.perf_counter()
 
         try:
-            response = self.models[provider].invoke(prompt)
-            return response.content
+            with span("llm_call", provider=provider, model=model_name):
+                response = admission.call(
+                    lambda: model.invoke(prompt),
+                    tokens=approximate_token_count(prompt),
+                    usage=_used_tokens,
+                )
         except Exception as e:
+            self.get_breaker(provider).record(False)
+            LLM_ERRORS.inc(provider=provider, model=model_name)
+            LLM_CALL_SECONDS.observe(
+                time.perf_counter() - start, provider=provider, model=model_name
+            )
             logger.error(f"Error getting completion from {provider}: {e}")
             raise
+
+        elapsed = time.perf_counter() - start
+        self.get_breaker(provider).record(True)
+        self.get_latency(provider).record(elapsed)
+        LLM_CALL_SECONDS.observe(elapsed, provider=provider, model=model_name)
+        _record_tokens(provider, model_name, getattr(response, "usage_metadata", None))
+        return response.content
+
+    def _complete_batch(self, provider: str, prompts: List[str]) -> List[Any]:
+        """
+        Get chat completions of several prompts in one batched call.
+
+        The batch goes through the model's batch interface, which providers
+        with a batch endpoint implement and LangChain otherwise runs as
+        concurrent calls. It is admitted with one request and one concurrency
+        slot per prompt, see AdmissionController.call_batch. Nothing is
+        retried here: the callers of prompts that failed with a retryable
+        error retry them alone, see _call, and record their outcome then.
+
+        Returns:
+            The completion of each prompt, or the exception it failed with
+        """
+        model = self.get_model(provider)
+        admission = self.get_admission(provider)
+        model_name = get_model_name(provider)
+        start = time.perf_counter()
+        LLM_BATCH_SIZE.observe(len(prompts), provider=provider)
+
+        try:
+            with span(
+                "llm_batch", provider=provider, model=model_name, size=len(prompts)
+            ):
+                responses = admission.call_batch(
+                    lambda: model.batch(
+                        prompts,
+                        config={"max_concurrency": len(prompts)},
+                        return_exceptions=True,
+                    ),
+                    tokens=[approximate_token_count(prompt) for prompt in prompts],
+                    usage=_used_tokens,
+                )
+        except Exception as e:
+            if not is_retryable_error(e):
+                for _ in prompts:
+                    self.get_breaker(provider).record(False)
+                    LLM_ERRORS.inc(provider=provider, model=model_name)
+            logger.error(f"Error getting batched completions from {provider}: {e}")
+            raise
+
+        elapsed = time.perf_counter() - start
+        results: List[Any] = []
+        for response in responses:
+            if isinstance(response, Exception):
+                if not is_retryable_error(response):
+                    self.get_breaker(provider).record(False)
+                    LLM_ERRORS.inc(provider=provider, model=model_name)
+                    logger.error(
+                        f"Error getting completion from {provider}: {response}"
+                    )
+                results.append(response)
+                continue
+            self.get_breaker(provider).record(True)
+            self.get_latency(provider).record(elapsed)
+            LLM_CALL_SECONDS.observe(elapsed, provider=provider, model=model_name)
+            _record_tokens(
+                provider, model_name, getattr(response, "usage_metadata", None)
+            )
+            results.append(response.content)
+        return results
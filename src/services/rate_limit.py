@@ -0,0 +1,376 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..config.settings import settings
+from .metrics import LLM_RETRIES
+from .tracing import add_to_span, set_attribute
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_STATUS_CODES = {429, 503, 529}
+RETRYABLE_STATUS_CODES = OVERLOAD_STATUS_CODES | {408, 409, 500, 502, 504}
+RETRYABLE_ERROR_NAMES = ("Timeout", "Connection", "RateLimit", "Overloaded")
+
+
+def error_status_code(error: Exception) -> Optional[int]:
+    """
+    HTTP status code carried by a provider SDK error, if any.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def is_overload_error(error: Exception) -> bool:
+    """
+    Whether an error means the provider is rate limiting or overloaded.
+    """
+    status_code = error_status_code(error)
+    if status_code is not None:
+        return status_code in OVERLOAD_STATUS_CODES
+    name = type(error).__name__
+    return "RateLimit" in name or "Overloaded" in name
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Whether a failed call may succeed when sent again.
+    """
+    status_code = error_status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    name = type(error).__name__
+    return any(part in name for part in RETRYABLE_ERROR_NAMES)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Delay requested by the provider through a Retry-After header.
+    """
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(0.0, float(retry_after)) if retry_after is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter that honors Retry-After.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = settings.MAX_RETRIES,
+        base_delay: float = settings.RETRY_BASE_DELAY,
+        max_delay: float = settings.RETRY_MAX_DELAY,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def next_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Delay before retrying a failed attempt, or None to give up.
+
+        Args:
+            attempt: number of the failed attempt, starting at 1
+            error: the error of the failed attempt
+        """
+        if attempt >= self.max_attempts or not is_retryable_error(error):
+            return None
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute.
+
+    Reservations may drive the bucket negative; the caller then waits until
+    its reservation is covered, which keeps waiting callers in order.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens from the bucket and return how long to wait for them.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def adjust(self, amount: float):
+        """
+        Correct an earlier reservation, e.g. with the actual token usage.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    The limit grows by about one per window of successful calls and halves
+    on an overload error, at most once per cooldown.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._clock = clock
+        self._decreased_at = float("-inf")
+        self._condition = threading.Condition()
+
+    def acquire(self, count: int = 1):
+        """
+        Take count slots at once. A count above the limit waits until no
+        slot is taken.
+        """
+        with self._condition:
+            while self.in_flight and self.in_flight + count > int(self.limit):
+                self._condition.wait()
+            self.in_flight += count
+
+    def release(self, overloaded: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                now = self._clock()
+                if now - self._decreased_at >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._decreased_at = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class AdmissionController:
+    """
+    Per-provider admission: request and token rate limits, adaptive
+    concurrency and the retry policy for calls to the provider.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = settings.AIMD_MAX_CONCURRENCY,
+        retry_policy: Optional[RetryPolicy] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.provider = provider
+        self.requests = (
+            TokenBucket(requests_per_minute, clock=clock)
+            if requests_per_minute
+            else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        )
+        self.concurrency = AIMDLimiter(max_concurrency, clock=clock)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._clock = clock
+        self._sleep = sleep
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "retries": 0,
+            "overloads": 0,
+            "waited_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls, provider: str) -> "AdmissionController":
+        limits = settings.PROVIDER_RATE_LIMITS.get(provider, {})
+        return cls(
+            provider,
+            requests_per_minute=limits.get("rpm"),
+            tokens_per_minute=limits.get("tpm"),
+        )
+
+    def _wait(self, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self._counters["waited_seconds"] += seconds
+            self._sleep(seconds)
+
+    def acquire(self, tokens: int = 0, requests: int = 1):
+        """
+        Block until a call with the given token estimate is admitted.
+
+        A batched call counts as one request and takes one concurrency slot
+        per item, each released on its own.
+        """
+        self._wait(self._paused_until - self._clock())
+        if self.requests is not None:
+            self._wait(self.requests.reserve(requests))
+        if self.tokens is not None and tokens:
+            self._wait(self.tokens.reserve(tokens))
+        self.concurrency.acquire(requests)
+
+    def release(
+        self, error: Optional[Exception] = None, used_tokens: int = 0, tokens: int = 0
+    ):
+        """
+        Release an admitted call.
+
+        Args:
+            error: error of the call, if it failed
+            used_tokens: actual tokens used by the call, if known
+            tokens: the token estimate the call was admitted with
+        """
+        overloaded = error is not None and is_overload_error(error)
+        self.concurrency.release(overloaded=overloaded)
+        if self.tokens is not None and used_tokens:
+            self.tokens.adjust(used_tokens - tokens)
+        if error is not None and overloaded:
+            with self._lock:
+                self._counters["overloads"] += 1
+            retry_after = retry_after_seconds(error)
+            if retry_after:
+                # Pause every caller of the provider instead of letting each hit the limit
+                self._paused_until = max(
+                    self._paused_until, self._clock() + retry_after
+                )
+
+    def call(self, func: Callable, tokens: int = 0, usage: Optional[Callable] = None):
+        """
+        Run a provider call under admission control, retrying per the policy.
+
+        Args:
+            func: the call to make
+            tokens: estimated tokens of the call
+            usage: optional function returning the actual tokens used from
+                the call's result
+
+        Returns:
+            The result of the call
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            set_attribute("attempts", attempt)
+            waiting_since = time.perf_counter()
+            self.acquire(tokens)
+            add_to_span(
+                "admission_wait_ms", (time.perf_counter() - waiting_since) * 1000
+            )
+            with self._lock:
+                self._counters["calls"] += 1
+            try:
+                result = func()
+            except Exception as e:
+                self.release(error=e)
+                delay = self.retry_policy.next_delay(attempt, e)
+                if delay is None:
+                    raise
+                logger.warning(
+                    f"Attempt {attempt} for {self.provider} failed, retrying in {delay:.1f}s: {e}"
+                )
+                with self._lock:
+                    self._counters["retries"] += 1
+                LLM_RETRIES.inc(provider=self.provider)
+                self._wait(delay)
+                continue
+            self.release(
+                used_tokens=usage(result) if usage is not None else 0, tokens=tokens
+            )
+            return result
+
+    def call_batch(
+        self, func: Callable, tokens: List[int], usage: Optional[Callable] = None
+    ) -> List[Any]:
+        """
+        Run a batched provider call under admission control, without retries.
+
+        The batch is admitted as one request and one concurrency slot per
+        item, and every item is released with its own outcome, so an item
+        that is rate limited shrinks the concurrency limit and pauses the
+        provider like a single call would.
+
+        Args:
+            func: the call to make, returning one result per item and an
+                Exception in place of the result of a failed item
+            tokens: estimated tokens of every item
+            usage: optional function returning the actual tokens used from
+                an item's result
+
+        Returns:
+            The results of the call
+        """
+        set_attribute("attempts", 1)
+        waiting_since = time.perf_counter()
+        self.acquire(sum(tokens), requests=len(tokens))
+        add_to_span("admission_wait_ms", (time.perf_counter() - waiting_since) * 1000)
+        with self._lock:
+            self._counters["calls"] += len(tokens)
+        try:
+            results = func()
+        except Exception as e:
+            for _ in tokens:
+                self.release(error=e)
+            raise
+        for result, estimate in zip(results, tokens):
+            if isinstance(result, Exception):
+                self.release(error=result)
+            else:
+                self.release(
+                    used_tokens=usage(result) if usage is not None else 0,
+                    tokens=estimate,
+                )
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["concurrency_limit"] = int(self.concurrency.limit)
+        counters["in_flight"] = self.concurrency.in_flight
+        return counters
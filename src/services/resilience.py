@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from ..config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when a provider's circuit is open and no fallback is available.
+    """
+
+
+class LatencyTracker:
+    """
+    Sliding window of call latencies with percentile estimates.
+    """
+
+    def __init__(self, window: int = settings.LATENCY_WINDOW, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Return the q-th percentile, or None before min_samples calls.
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            count = len(self._samples)
+        return {
+            "samples": count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker with half-open probing.
+
+    The circuit opens when at least failure_rate of the last window calls
+    failed. After open_seconds a single probe call is let through: its
+    success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_rate: float = settings.CIRCUIT_FAILURE_RATE,
+        window: int = settings.CIRCUIT_WINDOW,
+        min_calls: int = settings.CIRCUIT_MIN_CALLS,
+        open_seconds: float = settings.CIRCUIT_OPEN_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be sent. In half-open state only one probe is.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, success: bool):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if success:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                self.state == self.CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures >= self.failure_rate * len(self._outcomes)
+            ):
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
@@ -1,17 +1,81 @@
 import logging
-from typing import Dict, List
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from ..config.settings import settings
 from ..models.schemas import (
+    CompareSource,
     SummaryCompareReq,
     SummaryCompareResp,
     SummaryRequest,
     SummaryResponse,
 )
-from .model_manager import ModelManager
+from ..processors.chunker import AnchoredChunker, TextChunker, get_token_counter
+from ..processors.extractive import extract_sentences
+from ..processors.shared import SharedText
+from .cache import ManifestStore, SummaryCache, hash_text
+from .coalescing import SingleFlight
+from .dedup import LSHIndex, MinHasher
+from .metrics import CHUNK_SECONDS, DEDUP_CHUNKS
+from .model_manager import ModelManager, record_served, served_providers
+from .tracing import in_context, set_attribute, span
 
 logger = logging.getLogger(__name__)
 
+# Called with the index and summary of every chunk as soon as it completes
+ChunkCallback = Callable[[int, str], None]
+
+
+class ChunkResults(NamedTuple):
+    """
+    Outcome of summarizing the chunks of a text, see _summarize_chunks.
+    """
+
+    summaries: List[Optional[str]]
+    errors: List[Optional[Exception]]
+    # None unless DEDUP_ENABLED
+    deduplicated: Optional[int]
+
+
+def truncate_to_tokens(
+    text: str, max_tokens: int, count_tokens: Callable[[str], int]
+) -> str:
+    """
+    Return the longest word prefix of a text that fits in max_tokens.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def key_excerpts(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """
+    Select the most central sentences of a text that fit in max_tokens, in
+    document order, see extract_sentences.
+    """
+    return extract_sentences(text, max_tokens, count_tokens)
+
 
 class SummaryGenerator:
     """Generate summaries from text using different LLMs"""
@@ -22,73 +86,936 @@ class SummaryGenerator:
         "detailed": "Provide a detailed summary of the following text, including main points and key details:",
         "bullets": "Summarize the following text in bullet points, highlighting key information:",
     }
+    REDUCE_PREAMBLE = "The following text consists of summaries of consecutive parts of one document, in order."
     COMPARE_PROMPT = """
     Consider the following text and the provided summaries. Compare and evaluate the provided summaries.
-    Here is the raw text: {text}
-    These are the summaries: {summaries}
+    Here is the {source}: {text}
+    These are the summaries:
+    {summaries}
     """
+    COMPARE_SOURCES = {
+        "raw": "raw text",
+        "condensed": "condensed version of the text",
+        "excerpts": "key excerpts of the text",
+    }
+    # Summary types searched in the cache for a condensed version of the text
+    CONDENSED_TYPES = ("detailed", "bullets", "brief")
 
-    def __init__(self, model_manager: ModelManager):
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        cache: Optional[SummaryCache] = None,
+        manifests: Optional[ManifestStore] = None,
+    ):
         self.model_manager = model_manager
+        self.cache = cache
+        # Chunk manifests of documents, in memory unless a store is given
+        self.manifests = manifests if manifests is not None else ManifestStore()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.CHUNK_WORKERS, thread_name_prefix="summary-chunk"
+        )
+        self._provider_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+        self._summary_flight = SingleFlight("summaries")
+        self._chunk_flight = SingleFlight("chunks")
+        self._hasher = MinHasher()
+        self._corpus_indexes: Dict[Tuple[str, str], LSHIndex[str]] = {}
 
-    def _chunk_text(self, text: str) -> list[str]:
+    @staticmethod
+    def _provider_limit(provider: str) -> int:
         """
-        Split text into smaller chunks.
+        Return the maximum number of concurrent chunk calls for a provider.
+        """
+        return max(
+            1, settings.PROVIDER_CONCURRENCY.get(provider, settings.CHUNK_CONCURRENCY)
+        )
+
+    def _provider_slot(self, provider: str) -> threading.BoundedSemaphore:
+        """
+        Return the semaphore capping concurrent chunk calls for a provider.
+        """
+        with self._slots_lock:
+            if provider not in self._provider_slots:
+                self._provider_slots[provider] = threading.BoundedSemaphore(
+                    self._provider_limit(provider)
+                )
+            return self._provider_slots[provider]
+
+    def _summarize_chunk(
+        self, chunk: str, provider: str, summary_type: str, reduce: bool = False
+    ) -> str:
+        """
+        Summarize a single chunk while holding one of the provider's slots.
+
+        With reduce, the chunk is a group of partial summaries to merge.
+        Otherwise it is cut by the extractive pre-filter first, if enabled.
         """
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_length = 0
+        if not reduce:
+            chunk = self._prefilter(chunk, provider)
+        if self.cache is not None:
+            lookup = self.cache.get_reduce if reduce else self.cache.get_chunk
+            cached = lookup(chunk, summary_type, provider)
+            if cached is not None:
+                set_attribute("cached", True)
+                record_served(provider)
+                return cached
 
-        for word in words:
-            if len(word) + current_length > self.CHUNK_SIZE:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [word]
-                current_length = len(word)
+        def complete() -> Tuple[str, Set[str]]:
+            if reduce:
+                prompt = self._reduce_prompt(summary_type, chunk)
             else:
-                current_chunk.append(word)
-                current_length += len(word) + 1
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+                prompt = self._prompt(summary_type, chunk)
+            waiting_since = time.perf_counter()
+            with self._provider_slot(provider), served_providers() as served:
+                set_attribute(
+                    "slot_wait_ms",
+                    round((time.perf_counter() - waiting_since) * 1000, 3),
+                )
+                summary = self.model_manager.get_completion(
+                    provider=provider, prompt=prompt
+                )
+
+            if self.cache is not None and len(served) <= 1:
+                store = self.cache.set_reduce if reduce else self.cache.set_chunk
+                store(chunk, summary_type, self._served_by(provider, served), summary)
+            return summary, served
+
+        kind = "reduce" if reduce else "chunk"
+        key = SummaryCache.make_key(kind, chunk, summary_type, provider)
+        # Calls that joined another one's generation learn who served it here
+        summary, served = self._chunk_flight.do(key, complete)
+        record_served(*served)
+        return summary
+
+    def _summarize_chunks(
+        self,
+        chunks: Iterable[str],
+        provider: str,
+        summary_type: str,
+        on_chunk: Optional[ChunkCallback] = None,
+        completed_chunks: Optional[Dict[int, str]] = None,
+        reduce: bool = False,
+    ) -> ChunkResults:
+        """
+        Summarize chunks concurrently.
 
-        return chunks
+        Chunks are submitted as they are produced, and at most twice the
+        provider's concurrency limit is in flight at once, so a lazy chunk
+        iterator is only consumed as fast as the provider keeps up.
+
+        With DEDUP_ENABLED, a chunk that is a near-duplicate of an earlier
+        chunk of the same text, or of a recently summarized chunk of any
+        text, reuses that chunk's summary instead of being sent.
+
+        Args:
+            chunks: chunks of the text in document order
+            provider: LLM provider
+            summary_type: type of the summary
+            on_chunk: optional callback receiving each finished chunk summary
+            completed_chunks: summaries of chunks finished by an earlier run,
+                by chunk index; these chunks are not sent again. A lazy chunk
+                iterator may add to it up to the chunk it yields
+            reduce: whether the chunks are groups of partial summaries to merge
+
+        Returns:
+            Chunk summaries and chunk errors, both in document order, and
+            the number of deduplicated chunks if enabled. Exactly one of the
+            two entries is set for every chunk.
+        """
+        in_flight = threading.Semaphore(2 * self._provider_limit(provider))
+        if completed_chunks is None:
+            completed_chunks = {}
+        dedup = settings.DEDUP_ENABLED and not reduce
+        if dedup:
+            document: LSHIndex[int] = LSHIndex(max_entries=None)
+            corpus = self._corpus_index(provider, summary_type)
+        deduplicated = 0
+
+        def notify(index: int, summary: str):
+            if on_chunk is not None:
+                try:
+                    on_chunk(index, summary)
+                except Exception as e:
+                    logger.warning(f"Chunk callback failed: {e}")
+
+        def run(index: int, chunk: str, signature=None) -> str:
+            if index in completed_chunks:
+                in_flight.release()
+                return completed_chunks[index]
+            try:
+                with span(
+                    "reduce_group" if reduce else "chunk",
+                    index=index,
+                    provider=provider,
+                ):
+                    summary = self._summarize_chunk(
+                        chunk, provider, summary_type, reduce
+                    )
+            finally:
+                in_flight.release()
+            if signature is not None:
+                corpus.add(hash_text(chunk), signature, summary)
+            notify(index, summary)
+            return summary
+
+        def reuse(index: int, source: Future) -> Future:
+            future: Future = Future()
+
+            def done(source: Future):
+                try:
+                    summary = source.result()
+                except Exception as e:
+                    future.set_exception(e)
+                    return
+                notify(index, summary)
+                future.set_result(summary)
+
+            source.add_done_callback(done)
+            return future
+
+        futures: List[Future] = []
+        for index, chunk in enumerate(chunks):
+            signature = None
+            if dedup and index not in completed_chunks:
+                signature = self._hasher.signature(chunk)
+                source: Optional[Future] = None
+                duplicate = document.query(signature)
+                if duplicate is not None:
+                    source = futures[duplicate[1]]
+                else:
+                    recent = corpus.query(signature)
+                    if recent is not None:
+                        source = Future()
+                        source.set_result(recent[1])
+                if source is not None:
+                    deduplicated += 1
+                    futures.append(reuse(index, source))
+                    continue
+                document.add(index, signature, index)
+            in_flight.acquire()
+            futures.append(
+                self._executor.submit(in_context(run), index, chunk, signature)
+            )
+
+        summaries: List[Optional[str]] = []
+        errors: List[Optional[Exception]] = []
+        for index, future in enumerate(futures):
+            try:
+                summaries.append(future.result())
+                errors.append(None)
+            except Exception as e:
+                logger.error(f"Error summarizing chunk {index} with {provider}: {e}")
+                summaries.append(None)
+                errors.append(e)
+
+        if deduplicated:
+            DEDUP_CHUNKS.inc(deduplicated, provider=provider)
+            set_attribute("chunks_deduplicated", deduplicated)
+        return ChunkResults(summaries, errors, deduplicated if dedup else None)
+
+    def _corpus_index(self, provider: str, summary_type: str) -> "LSHIndex[str]":
+        """
+        Return the index of recently summarized chunks of a provider and
+        summary type, holding their summaries.
+        """
+        with self._slots_lock:
+            return self._corpus_indexes.setdefault((provider, summary_type), LSHIndex())
+
+    @staticmethod
+    def _served_by(provider: str, served: Set[str]) -> str:
+        """
+        Label of the providers that served a result, see served_providers: the
+        requested provider if no completion was made, else the providers that
+        served them joined with "+". Results of several providers are not
+        cached, as no request asks for them.
+        """
+        return "+".join(sorted(served)) if served else provider
+
+    def _prompt(self, summary_type: str, text: str) -> str:
+        """
+        Build the summarization prompt of a text.
+        """
+        return f"{self.SUMMARY_TYPES.get(summary_type)}\n{text}"
+
+    @staticmethod
+    def _prefilter(chunk: str, provider: str) -> str:
+        """
+        With EXTRACTIVE_PREFILTER, cut a chunk to its most central sentences,
+        EXTRACTIVE_RATIO of its tokens, to send fewer input tokens.
+        """
+        if not settings.EXTRACTIVE_PREFILTER or provider == "extractive":
+            return chunk
+        count_tokens = get_token_counter(provider)
+        tokens = count_tokens(chunk)
+        filtered = extract_sentences(
+            chunk, max(1, int(tokens * settings.EXTRACTIVE_RATIO)), count_tokens
+        )
+        if not filtered:
+            return chunk
+        set_attribute("prefilter_tokens_saved", tokens - count_tokens(filtered))
+        return filtered
+
+    def _reduce_prompt(self, summary_type: str, summaries: str) -> str:
+        """
+        Build the prompt merging a group of partial summaries.
+        """
+        return f"{self.REDUCE_PREAMBLE}\n{self._prompt(summary_type, summaries)}"
 
-    def generate_summary(self, summary_request: SummaryRequest) -> SummaryResponse:
+    @staticmethod
+    def _reduce_tokens(provider: str) -> int:
+        """
+        Return the maximum tokens of partial summaries merged in one call.
+        """
+        return settings.PROVIDER_REDUCE_TOKENS.get(provider, settings.REDUCE_TOKENS)
+
+    def _reduce_groups(self, summaries: List[str], provider: str) -> List[List[str]]:
+        """
+        Pack consecutive summaries into groups of at most REDUCE_FAN_IN
+        summaries that fit in the provider's reduce budget.
+
+        Summaries over half the budget are truncated, so every group but the
+        last merges at least two summaries and each level shrinks.
+        """
+        count_tokens = get_token_counter(provider)
+        budget = self._reduce_tokens(provider)
+        fan_in = max(2, settings.REDUCE_FAN_IN)
+        groups: List[List[str]] = []
+        group: List[str] = []
+        tokens = 0
+        for summary in summaries:
+            summary = truncate_to_tokens(summary, budget // 2, count_tokens)
+            summary_tokens = count_tokens(summary)
+            if group and (tokens + summary_tokens > budget or len(group) == fan_in):
+                groups.append(group)
+                group, tokens = [], 0
+            group.append(summary)
+            tokens += summary_tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    def _reduce(
+        self, summaries: List[str], provider: str, summary_type: str
+    ) -> Tuple[str, int, int]:
+        """
+        Merge partial summaries level by level until one remains.
+
+        The groups of a level, see _reduce_groups, are merged concurrently;
+        a group of a single summary is carried to the next level as is.
+
+        Returns:
+            The final summary, the number of levels and the tokens of the
+            reduce prompts and outputs
+        """
+        count_tokens = get_token_counter(provider)
+        depth = 0
+        tokens = 0
+        while len(summaries) > 1:
+            depth += 1
+            groups = self._reduce_groups(summaries, provider)
+            texts = ["\n\n".join(group) for group in groups]
+            carried = {
+                index: group[0] for index, group in enumerate(groups) if len(group) == 1
+            }
+            with span("reduce", level=depth, groups=len(groups)):
+                results, errors, _ = self._summarize_chunks(
+                    texts, provider, summary_type, completed_chunks=carried, reduce=True
+                )
+            for error in errors:
+                if error is not None:
+                    raise error
+            summaries = [summary for summary in results if summary is not None]
+            tokens += sum(
+                count_tokens(self._reduce_prompt(summary_type, text))
+                + count_tokens(summary)
+                for index, (text, summary) in enumerate(zip(texts, summaries))
+                if index not in carried
+            )
+        return summaries[0], depth, tokens
+
+    def _map_tokens(
+        self,
+        chunks: Iterable[str],
+        summaries: Iterable[str],
+        provider: str,
+        summary_type: str,
+    ) -> int:
+        """
+        Tokens of the prompts and outputs of the map stage.
+        """
+        count_tokens = get_token_counter(provider)
+        return sum(
+            count_tokens(self._prompt(summary_type, chunk)) for chunk in chunks
+        ) + sum(count_tokens(summary) for summary in summaries)
+
+    def is_single_pass(self, text: str, provider: str) -> bool:
+        """
+        Whether a text is summarized with a single call instead of chunks.
+        """
+        return get_token_counter(provider)(text) <= settings.SINGLE_PASS_TOKENS
+
+    @staticmethod
+    def _map_reduce(map_reduce: Optional[bool]) -> bool:
+        """
+        Resolve a request's map_reduce option against MAP_REDUCE.
+        """
+        return settings.MAP_REDUCE if map_reduce is None else map_reduce
+
+    def count_chunks(
+        self, text: str, provider: str, document_id: Optional[str] = None
+    ) -> int:
+        """
+        Number of LLM calls generate_summary makes for a text.
+        """
+        if self.is_single_pass(text, provider):
+            return 1
+        if document_id is not None:
+            return len(self._anchored_chunk_text(text, provider))
+        return len(self._chunk_text(text, provider))
+
+    def _chunker(self, provider: Optional[str] = None) -> TextChunker:
+        """
+        Return a chunker measuring text with the provider's tokenizer.
+        """
+        return TextChunker(
+            max_tokens=self.CHUNK_SIZE,
+            overlap_tokens=settings.CHUNK_OVERLAP,
+            count_tokens=get_token_counter(provider),
+        )
+
+    def _chunk_text(self, text: str, provider: Optional[str] = None) -> list[str]:
+        """
+        Split text into smaller chunks.
+        """
+        with CHUNK_SECONDS.time(), span("chunking") as chunking_span:
+            chunks = self._chunker(provider).chunk(text)
+            if chunking_span is not None:
+                chunking_span.attributes["chunks"] = len(chunks)
+            return chunks
+
+    def _anchored_chunker(self, provider: Optional[str] = None) -> AnchoredChunker:
+        """
+        Return a chunker with content-defined boundaries measuring text with
+        the provider's tokenizer.
+        """
+        return AnchoredChunker(
+            max_tokens=self.CHUNK_SIZE, count_tokens=get_token_counter(provider)
+        )
+
+    def _anchored_chunk_text(
+        self, text: str, provider: Optional[str] = None
+    ) -> list[str]:
+        """
+        Split text into chunks with content-defined line boundaries.
+        """
+        with CHUNK_SECONDS.time(), span("chunking") as chunking_span:
+            chunks = self._anchored_chunker(provider).chunk(text)
+            if chunking_span is not None:
+                chunking_span.attributes["chunks"] = len(chunks)
+            return chunks
+
+    def _iter_chunks(
+        self, pieces: Iterable[str], provider: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Incrementally split a stream of text pieces into chunks.
+
+        Each chunk is yielded as soon as it is full, so only the chunk being
+        built is held in memory.
+        """
+        return self._chunker(provider).iter_chunks(pieces)
+
+    def generate_summary(
+        self,
+        summary_request: SummaryRequest,
+        on_chunk: Optional[ChunkCallback] = None,
+        completed_chunks: Optional[Dict[int, str]] = None,
+    ) -> SummaryResponse:
         """
         Generate summary from the text.
 
+        Requests with a document_id are summarized incrementally, see
+        _generate_document_summary. With map_reduce, or MAP_REDUCE by
+        default, chunk summaries are merged into one summary, see _reduce;
+        otherwise they are joined.
+
         Args:
             text: text to be summarized
             provider: LLM provider
+            on_chunk: optional callback receiving each finished chunk summary
+            completed_chunks: chunk summaries of an interrupted earlier run,
+                by chunk index
 
         Returns:
             A dictionary containing the provider info and the summary
         """
+        if on_chunk is None and not completed_chunks:
+            # Identical requests in flight share one generation
+            key = SummaryCache.make_key(
+                "summary",
+                summary_request.text,
+                summary_request.summary_type,
+                summary_request.provider,
+            )
+            return self._summary_flight.do(
+                (
+                    key,
+                    summary_request.document_id,
+                    self._map_reduce(summary_request.map_reduce),
+                ),
+                lambda: self._generate_summary(summary_request),
+            )
+        return self._generate_summary(summary_request, on_chunk, completed_chunks)
+
+    def _generate_summary(
+        self,
+        summary_request: SummaryRequest,
+        on_chunk: Optional[ChunkCallback] = None,
+        completed_chunks: Optional[Dict[int, str]] = None,
+    ) -> SummaryResponse:
+        """
+        Generate summary from the text, see generate_summary.
+        """
+        with span(
+            "summary",
+            provider=summary_request.provider,
+            summary_type=summary_request.summary_type,
+        ):
+            if summary_request.document_id is not None:
+                return self._generate_document_summary(
+                    summary_request, on_chunk, completed_chunks
+                )
+            return self._generate_text_summary(
+                summary_request, on_chunk, completed_chunks
+            )
+
+    def _generate_text_summary(
+        self,
+        summary_request: SummaryRequest,
+        on_chunk: Optional[ChunkCallback] = None,
+        completed_chunks: Optional[Dict[int, str]] = None,
+    ) -> SummaryResponse:
+        """
+        Generate summary of a text without a document_id.
+        """
         text = summary_request.text
         provider = summary_request.provider
         summary_type = summary_request.summary_type
+        map_reduce = self._map_reduce(summary_request.map_reduce)
         summaries = []
+        reduce_depth = total_tokens = deduplicated = None
 
         try:
-            if len(text) < 10000:
-                prompt = f"{self.SUMMARY_TYPES.get(summary_type)}\n{text}"
-                final_summary = self.model_manager.get_completion(
-                    provider=provider, prompt=prompt
-                )
-            else:
-                chunks = self._chunk_text(text)
+            if self.cache is not None and map_reduce:
+                entry = self.cache.get_map_reduce(text, summary_type, provider)
+                if entry is not None:
+                    return SummaryResponse(
+                        provider=provider, summary_type=summary_type, **entry
+                    )
+            elif self.cache is not None:
+                cached = self.cache.get_summary(text, summary_type, provider)
+                if cached is not None:
+                    return SummaryResponse(
+                        provider=provider, summary=cached, summary_type=summary_type
+                    )
 
-                for chunk in chunks:
-                    prompt = f"{self.SUMMARY_TYPES.get(summary_type)}\n{chunk}"
-                    summary = self.model_manager.get_completion(
+            with served_providers() as served:
+                if self.is_single_pass(text, provider):
+                    prompt = self._prompt(summary_type, text)
+                    final_summary = self.model_manager.get_completion(
                         provider=provider, prompt=prompt
                     )
-                    summaries.append(summary)
+                    if map_reduce:
+                        reduce_depth = 0
+                        total_tokens = self._map_tokens(
+                            [text], [final_summary], provider, summary_type
+                        )
+                else:
+                    chunks = self._chunk_text(text, provider)
+                    results, errors, deduplicated = self._summarize_chunks(
+                        chunks, provider, summary_type, on_chunk, completed_chunks
+                    )
+                    summaries = [summary for summary in results if summary is not None]
+                    for error in errors:
+                        if error is not None:
+                            raise error
+
+                    final_summary = "\n\n".join(summaries)
+                    if map_reduce:
+                        final_summary, reduce_depth, reduce_tokens = self._reduce(
+                            summaries, provider, summary_type
+                        )
+                        total_tokens = reduce_tokens + self._map_tokens(
+                            chunks, summaries, provider, summary_type
+                        )
+
+            served_by = self._served_by(provider, served)
+            if self.cache is not None and len(served) <= 1:
+                self._cache_summary(
+                    text,
+                    summary_type,
+                    served_by,
+                    map_reduce,
+                    final_summary,
+                    reduce_depth,
+                    total_tokens,
+                )
+
+            return SummaryResponse(
+                provider=served_by,
+                summary=final_summary,
+                summary_type=summary_type,
+                reduce_depth=reduce_depth,
+                total_tokens=total_tokens,
+                chunks_deduplicated=deduplicated,
+            )
+
+        except Exception as e:
+            logger.error(f"An error occured in generating summary: {e}")
+            return SummaryResponse(
+                provider=provider,
+                summary_type=summary_type,
+                error=str(e),
+                partial_summary="\n\n".join(summaries) if summaries else None,
+            )
+
+    def _generate_document_summary(
+        self,
+        summary_request: SummaryRequest,
+        on_chunk: Optional[ChunkCallback] = None,
+        completed_chunks: Optional[Dict[int, str]] = None,
+    ) -> SummaryResponse:
+        """
+        Summarize a new version of a document, reusing the chunk summaries of
+        its previous version, see _summarize_document.
+
+        The text is split with content-defined line boundaries, so an edit
+        leaves the other chunks unchanged.
+        """
+        text = summary_request.text
+        provider = summary_request.provider
+        document_id = summary_request.document_id
+        if document_id is None:
+            raise ValueError("A document summary needs a document_id")
+
+        if self.is_single_pass(text, provider):
+            chunks = [text]
+        else:
+            chunks = self._anchored_chunk_text(text, provider)
+        return self._summarize_document(
+            chunks,
+            summary_request.summary_type,
+            provider,
+            document_id,
+            self._map_reduce(summary_request.map_reduce),
+            on_chunk,
+            completed_chunks,
+        )
+
+    def _summarize_document(
+        self,
+        chunks: Iterable[str],
+        summary_type: str,
+        provider: str,
+        document_id: str,
+        map_reduce: bool,
+        on_chunk: Optional[ChunkCallback] = None,
+        completed_chunks: Optional[Dict[int, str]] = None,
+    ) -> SummaryResponse:
+        """
+        Summarize the chunks of a document version.
+
+        Chunks whose hash is in the document's manifest reuse their stored
+        summary and only changed chunks are sent to the provider. Chunks may
+        be produced lazily, as they are hashed on their way to the provider.
+        """
+        summaries: List[str] = []
+        reduce_depth = total_tokens = deduplicated = None
+        count_tokens = get_token_counter(provider)
+        hashes: List[str] = []
+        reused: Dict[int, str] = {}
+        prompt_tokens: List[int] = []
+        completed = dict(completed_chunks or {})
+
+        try:
+            previous = {
+                entry["hash"]: entry["summary"]
+                for entry in self.manifests.get(document_id, summary_type, provider)
+            }
+
+            def tracked(chunks: Iterable[str]) -> Iterator[str]:
+                for index, chunk in enumerate(chunks):
+                    chunk_hash = hash_text(chunk)
+                    hashes.append(chunk_hash)
+                    if map_reduce:
+                        prompt_tokens.append(
+                            count_tokens(self._prompt(summary_type, chunk))
+                        )
+                    if chunk_hash in previous:
+                        reused[index] = previous[chunk_hash]
+                        if index not in completed:
+                            completed[index] = reused[index]
+                            if on_chunk is not None:
+                                on_chunk(index, reused[index])
+                    yield chunk
+
+            with served_providers() as served:
+                results, errors, deduplicated = self._summarize_chunks(
+                    tracked(chunks), provider, summary_type, on_chunk, completed
+                )
+            summaries = [summary for summary in results if summary is not None]
+            for error in errors:
+                if error is not None:
+                    raise error
+            if reused:
+                served.add(provider)
+
+            # The manifest is the requested provider's, not another one's that served in its place
+            if served <= {provider}:
+                self.manifests.set(
+                    document_id,
+                    summary_type,
+                    provider,
+                    [
+                        {"hash": chunk_hash, "summary": summary}
+                        for chunk_hash, summary in zip(hashes, summaries)
+                    ],
+                )
+            logger.info(
+                f"Document {document_id}: reused {len(reused)} of {len(hashes)} chunks"
+            )
+
+            final_summary = "\n\n".join(summaries)
+            if map_reduce and summaries:
+                with served_providers() as reduce_served:
+                    final_summary, reduce_depth, reduce_tokens = self._reduce(
+                        summaries, provider, summary_type
+                    )
+                served |= reduce_served
+                total_tokens = (
+                    sum(prompt_tokens)
+                    + self._map_tokens([], summaries, provider, summary_type)
+                    + reduce_tokens
+                )
+
+            return SummaryResponse(
+                provider=self._served_by(provider, served),
+                summary=final_summary,
+                summary_type=summary_type,
+                chunks_reused=len(reused),
+                chunks_regenerated=len(hashes) - len(reused),
+                reduce_depth=reduce_depth,
+                total_tokens=total_tokens,
+                chunks_deduplicated=deduplicated,
+            )
+
+        except Exception as e:
+            logger.error(f"An error occured in generating summary: {e}")
+            return SummaryResponse(
+                provider=provider,
+                summary_type=summary_type,
+                error=str(e),
+                partial_summary="\n\n".join(summaries) if summaries else None,
+            )
+
+    def _cache_summary(
+        self,
+        text: str,
+        summary_type: str,
+        provider: str,
+        map_reduce: bool,
+        summary: str,
+        reduce_depth: Optional[int],
+        total_tokens: Optional[int],
+    ):
+        """
+        Cache the summary of a text, under the map-reduce entry with its
+        stats if the chunk summaries were merged.
+        """
+        if self.cache is None:
+            return
+        if map_reduce:
+            self.cache.set_map_reduce(
+                text, summary_type, provider, summary, reduce_depth, total_tokens
+            )
+        else:
+            self.cache.set_summary(text, summary_type, provider, summary)
+
+    async def astream_summary(
+        self, summary_request: SummaryRequest
+    ) -> AsyncIterator[str]:
+        """
+        Stream the summary of a single-pass text as it is generated.
+
+        The summary is cached like the one of generate_summary, under the
+        map_reduce entry with MAP_REDUCE, so either call reuses the other's.
+
+        Args:
+            summary_request: request whose text fits in a single call
+
+        Returns:
+            Async iterator over the summary deltas
+        """
+        text = summary_request.text
+        provider = summary_request.provider
+        summary_type = summary_request.summary_type
+        map_reduce = self._map_reduce(summary_request.map_reduce)
+
+        if self.cache is not None:
+            if map_reduce:
+                entry = self.cache.get_map_reduce(text, summary_type, provider)
+                cached = entry["summary"] if entry is not None else None
+            else:
+                cached = self.cache.get_summary(text, summary_type, provider)
+            if cached is not None:
+                yield cached
+                return
+
+        deltas = []
+        with served_providers() as served:
+            async for delta in self.model_manager.astream_completion(
+                provider, self._prompt(summary_type, text)
+            ):
+                deltas.append(delta)
+                yield delta
+
+        if self.cache is not None and len(served) <= 1:
+            summary = "".join(deltas)
+            self._cache_summary(
+                text,
+                summary_type,
+                self._served_by(provider, served),
+                map_reduce,
+                summary,
+                0,
+                self._map_tokens([text], [summary], provider, summary_type),
+            )
+
+    def generate_summary_from_pieces(
+        self,
+        pieces: Iterable[str],
+        summary_type: str = "brief",
+        provider: str = "anthropic",
+        map_reduce: Optional[bool] = None,
+        document_id: Optional[str] = None,
+    ) -> SummaryResponse:
+        """
+        Generate summary from a stream of text pieces, such as the pages
+        yielded by DocumentProcessor.iter_text.
+
+        Chunks are sent to the provider while later pieces are still being
+        extracted. With a document_id, the chunks have content-defined
+        boundaries and reuse the summaries of the document's previous
+        version, see _summarize_document.
+
+        Pieces shared by DocumentProcessor.open_text are summarized once for
+        identical requests in flight, and, without a document_id, the summary
+        is cached under the text of the document, so that summarizing its
+        text later is a cache hit.
+
+        Args:
+            pieces: text pieces in document order
+            summary_type: type of the summary
+            provider: LLM provider
+            map_reduce: whether to merge the chunk summaries into one,
+                MAP_REDUCE if None
+            document_id: optional id of the document the text is a version of
+
+        Returns:
+            The summary response
+        """
+        map_reduce = self._map_reduce(map_reduce)
+        if isinstance(pieces, SharedText):
+            shared = pieces
+            return self._summary_flight.do(
+                ("pieces", shared.key, summary_type, provider, document_id, map_reduce),
+                lambda: self._generate_summary_from_pieces(
+                    shared, summary_type, provider, map_reduce, document_id
+                ),
+            )
+        return self._generate_summary_from_pieces(
+            pieces, summary_type, provider, map_reduce, document_id
+        )
+
+    def _generate_summary_from_pieces(
+        self,
+        pieces: Iterable[str],
+        summary_type: str,
+        provider: str,
+        map_reduce: bool,
+        document_id: Optional[str],
+    ) -> SummaryResponse:
+        """
+        Generate summary from a stream of text pieces, see
+        generate_summary_from_pieces.
+        """
+        if document_id is not None:
+            return self._summarize_document(
+                self._anchored_chunker(provider).iter_chunks(pieces),
+                summary_type,
+                provider,
+                document_id,
+                map_reduce,
+            )
+        summaries = []
+        reduce_depth = total_tokens = deduplicated = None
+
+        try:
+            chunks = self._iter_chunks(pieces, provider)
+            if map_reduce:
+                # Count the map prompts as the chunks stream past
+                count_tokens = get_token_counter(provider)
+                prompt_tokens = []
+
+                def counted(chunks: Iterable[str]) -> Iterator[str]:
+                    for chunk in chunks:
+                        prompt_tokens.append(
+                            count_tokens(self._prompt(summary_type, chunk))
+                        )
+                        yield chunk
+
+                chunks = counted(chunks)
+
+            with served_providers() as served:
+                results, errors, deduplicated = self._summarize_chunks(
+                    chunks, provider, summary_type
+                )
+                summaries = [summary for summary in results if summary is not None]
+                for error in errors:
+                    if error is not None:
+                        raise error
 
                 final_summary = "\n\n".join(summaries)
+                if map_reduce and summaries:
+                    final_summary, reduce_depth, reduce_tokens = self._reduce(
+                        summaries, provider, summary_type
+                    )
+                    total_tokens = (
+                        sum(prompt_tokens)
+                        + self._map_tokens([], summaries, provider, summary_type)
+                        + reduce_tokens
+                    )
+
+            served_by = self._served_by(provider, served)
+            text = pieces.text if isinstance(pieces, SharedText) else None
+            if self.cache is not None and text is not None and len(served) <= 1:
+                self._cache_summary(
+                    text,
+                    summary_type,
+                    served_by,
+                    map_reduce,
+                    final_summary,
+                    reduce_depth,
+                    total_tokens,
+                )
 
             return SummaryResponse(
-                provider=provider, summary=final_summary, summary_type=summary_type
+                provider=served_by,
+                summary=final_summary,
+                summary_type=summary_type,
+                reduce_depth=reduce_depth,
+                total_tokens=total_tokens,
+                chunks_deduplicated=deduplicated,
             )
 
         except Exception as e:
@@ -100,27 +1027,149 @@ class SummaryGenerator:
                 partial_summary="\n\n".join(summaries) if summaries else None,
             )
 
+    def coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Counters of executed and coalesced summary and chunk generations.
+        """
+        return {
+            "summaries": self._summary_flight.stats(),
+            "chunks": self._chunk_flight.stats(),
+        }
+
+    @staticmethod
+    def _render_summaries(summaries: List[SummaryResponse]) -> List[str]:
+        """
+        Render summaries as compact labeled blocks, skipping failed ones.
+        """
+        blocks = []
+        for summary in summaries:
+            if summary.summary:
+                blocks.append(
+                    f"[{summary.provider}, {summary.summary_type}]\n{summary.summary.strip()}"
+                )
+            elif summary.partial_summary:
+                blocks.append(
+                    f"[{summary.provider}, {summary.summary_type}, partial]\n"
+                    f"{summary.partial_summary.strip()}"
+                )
+        return blocks
+
+    def _cached_condensed(
+        self, text: str, providers: List[str], max_tokens: int, count_tokens
+    ) -> Optional[str]:
+        """
+        Return a cached summary of the text that fits in max_tokens.
+
+        These lookups are not counted in the cache statistics, which track
+        summarization requests.
+        """
+        if self.cache is None:
+            return None
+        for summary_type in self.CONDENSED_TYPES:
+            for provider in providers:
+                entry = self.cache.get_map_reduce(
+                    text, summary_type, provider, count=False
+                )
+                for condensed in (
+                    self.cache.get_summary(text, summary_type, provider, count=False),
+                    entry["summary"] if entry is not None else None,
+                ):
+                    if condensed is not None and count_tokens(condensed) <= max_tokens:
+                        return condensed
+        return None
+
+    def _compare_prompt(
+        self, compare_req: SummaryCompareReq, token_budget: int
+    ) -> Tuple[str, Optional[CompareSource]]:
+        """
+        Build a compare prompt that fits in the token budget.
+
+        The raw text is used when it fits next to the summaries. Otherwise a
+        cached summary of the text, or its key excerpts, take its place.
+        Summaries are only truncated when they alone leave too little room
+        for the text.
+
+        Returns:
+            The prompt and which version of the text it contains
+        """
+        provider = compare_req.provider
+        count_tokens = get_token_counter(provider)
+        text = compare_req.text
+        blocks = self._render_summaries(compare_req.summaries)
+
+        def build(source: str, source_text: str) -> str:
+            return self.COMPARE_PROMPT.format(
+                source=self.COMPARE_SOURCES[source],
+                text=source_text,
+                summaries="\n\n".join(blocks),
+            )
+
+        overhead = count_tokens(build("condensed", ""))
+        if blocks and overhead > token_budget * 3 // 4:
+            # Give every summary an equal share of half the budget
+            template_tokens = overhead - count_tokens("\n\n".join(blocks))
+            room = token_budget // 2 if text else token_budget
+            block_tokens = max(1, (room - template_tokens) // len(blocks))
+            blocks = [
+                truncate_to_tokens(block, block_tokens, count_tokens)
+                for block in blocks
+            ]
+            overhead = count_tokens(build("condensed", ""))
+
+        if not text:
+            return build("raw", "not provided"), None
+
+        available = max(0, token_budget - overhead)
+        if count_tokens(text) <= available:
+            return build("raw", text), "raw"
+
+        providers = list(
+            dict.fromkeys(
+                [provider] + [summary.provider for summary in compare_req.summaries]
+            )
+        )
+        condensed = self._cached_condensed(text, providers, available, count_tokens)
+        if condensed is not None:
+            return build("condensed", condensed), "condensed"
+
+        return (
+            build("excerpts", key_excerpts(text, available, count_tokens)),
+            "excerpts",
+        )
+
     def compare_summaries(self, compare_req: SummaryCompareReq) -> SummaryCompareResp:
         """
         Receives a list of summaries, compares and evaluates them.
 
+        The prompt is kept within compare_req.token_budget, or
+        COMPARE_TOKEN_BUDGET, tokens; see _compare_prompt.
+
         Args:
             text: raw text that was summarized
             summaries: the list of generated summaries to be compared
         Returns:
-            A dictionary containig provider info and the evaluation of summaries
+            A dictionary containig provider info, the evaluation of summaries
+            and the size of the prompt sent
         """
         try:
-            text = compare_req.text
-            summaries = compare_req.summaries
             provider = compare_req.provider
-            
+            token_budget = compare_req.token_budget or settings.COMPARE_TOKEN_BUDGET
+
+            with span("compare", provider=provider) as compare_span:
+                prompt, source = self._compare_prompt(compare_req, token_budget)
+                prompt_tokens = get_token_counter(provider)(prompt)
+                if compare_span is not None:
+                    compare_span.attributes.update(
+                        prompt_tokens=prompt_tokens, source=source
+                    )
 
-            prompt = self.COMPARE_PROMPT.format(text=text, summaries=summaries)
-            
-            evaluation = self.model_manager.get_completion(provider, prompt)
+                with served_providers() as served:
+                    evaluation = self.model_manager.get_completion(provider, prompt)
             return SummaryCompareResp(
-                provider=provider, evaluation_of_summaries=evaluation
+                provider=self._served_by(provider, served),
+                evaluation_of_summaries=evaluation,
+                prompt_tokens=prompt_tokens,
+                source=source,
             )
         except Exception as e:
             logger.error(f"An error occured during comparison: {e}")
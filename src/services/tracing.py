@@ -0,0 +1,218 @@
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Span:
+    """
+    Timed operation of a traced request, with attributes and child spans.
+    """
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes: Dict[str, Any] = attributes
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def child(self, name: str, **attributes: Any) -> "Span":
+        span = Span(name, **attributes)
+        with self._lock:
+            self.children.append(span)
+        return span
+
+    def add(self, key: str, amount: float):
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Render the span tree, with start offsets relative to origin, by
+        default the start of this span.
+        """
+        origin = self.start if origin is None else origin
+        end = self.end if self.end is not None else time.perf_counter()
+        with self._lock:
+            children = sorted(self.children, key=lambda span: span.start)
+            attributes = {
+                key: round(value, 3) if isinstance(value, float) else value
+                for key, value in self.attributes.items()
+            }
+        tree: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+        }
+        if attributes:
+            tree["attributes"] = attributes
+        tree["children"] = [child.to_dict(origin) for child in children]
+        return tree
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Trace the block: spans opened inside it, in this context or in contexts
+    copied from it, are recorded under the returned root span.
+    """
+    root = Span(name, **attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.finish()
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Record the block as a child of the current span.
+
+    Outside a trace this only reads a context variable, so spans can stay
+    in hot paths.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = parent.child(name, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+
+
+def set_attribute(key: str, value: Any):
+    """
+    Set an attribute of the current span, if any.
+    """
+    current = _current_span.get()
+    if current is not None:
+        with current._lock:
+            current.attributes[key] = value
+
+
+def add_to_span(key: str, amount: float):
+    """
+    Add to a numeric attribute of the current span, if any.
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.add(key, amount)
+
+
+def in_context(func: Callable) -> Callable:
+    """
+    Bind func to a copy of the current context, so that work submitted to
+    a thread pool records its spans under the submitting span, and the
+    providers that serve it in the submitter's served_providers.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+class StackProfile:
+    """
+    Stack samples recorded by a StackSampler while the profile was open.
+    """
+
+    def __init__(self):
+        self.samples: Counter = Counter()
+
+    def dump(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class StackSampler:
+    """
+    Sampling profiler of all threads of the process.
+
+    A daemon thread records the stack of every other thread each interval
+    seconds into every open profile, and exits once none is open, so
+    concurrent requests share one sampling thread. The samples are written
+    as folded stacks, which flame graph tools such as flamegraph.pl or
+    speedscope read. Concurrent requests share the threads, so their work
+    shows up in each other's profiles.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._profiles: List[StackProfile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self) -> StackProfile:
+        """
+        Start recording a profile, starting the sampling thread if needed.
+        """
+        profile = StackProfile()
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="stack-sampler", daemon=True
+                )
+                self._thread.start()
+        return profile
+
+    def close(self, profile: StackProfile):
+        """
+        Stop recording a profile. This does not wait for the sampling thread,
+        so it can be called from the event loop.
+        """
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(str(names.get(ident, ident)))
+                stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                for profile in self._profiles:
+                    profile.samples.update(stacks)
@@ -7,6 +7,28 @@ from src.processors.document import DocumentProcessor
 from src.services import ModelManager, SummaryGenerator
 
 
+class FakeClock:
+    """
+    Manual clock for time-dependent components; sleeping advances it.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
 @pytest.fixture
 def settings():
     return Settings()
@@ -1,71 +1,326 @@
-import pytest
-from fastapi.testclient import TestClient
+import json
+import threading
+from typing import List
 from unittest.mock import Mock, patch
 
-from typing import List
+import pytest
+from fastapi.testclient import TestClient
 
 from src.app.api import app
+from src.config.settings import settings
 from src.models import schemas
 
-
 client = TestClient(app)
 
 SAMPLE_TEXT = "This is a sample text to be summarized"
 SAMPLE_SUMMARY = "This is the summary text"
 SAMPLE_PATH = "sample_data/hnsw.txt"
 
+
 @pytest.fixture
 def mock_text_processor():
-    with patch('src.processors.document.DocumentProcessor.extract_text') as mock:
+    with patch("src.processors.document.DocumentProcessor.extract_text") as mock:
         mock.return_value = SAMPLE_TEXT
         yield mock
 
+
 @pytest.fixture
 def api_mock_summary_generator():
-    with patch('src.services.summary.SummaryGenerator') as MockClass:
-        instance = MockClass.return_value
+    with patch("src.app.api.summary_generator") as instance:
 
         # Mock the instance methods
         instance.generate_summary.return_value = schemas.SummaryResponse(
-            provider = 'anthropic',
-            summary = SAMPLE_SUMMARY,
-            summary_type = 'brief',
-            error = None,
-            partial_summary = None
-            )
+            provider="anthropic",
+            summary=SAMPLE_SUMMARY,
+            summary_type="brief",
+            error=None,
+            partial_summary=None,
+        )
         instance.compare_summaries.return_value = schemas.SummaryCompareResp(
-            provider = 'anthropic',
-            evaluation_of_summaries = "Compare summaries"
+            provider="anthropic", evaluation_of_summaries="Compare summaries"
         )
         yield instance
 
 
 class TestSummarizeEndpoint:
-    
-    def test_successful_summary_generation(self, mock_text_processor,  api_mock_summary_generator):
+
+    def test_successful_summary_generation(
+        self, mock_text_processor, api_mock_summary_generator
+    ):
         request_data = {
             "file_path": SAMPLE_PATH,
             "summary_type": "brief",
-            "providers": ["anthropic"]
+            "providers": ["anthropic"],
         }
 
-        response = client.post("/summarize", json=request_data) 
+        response = client.post("/summarize", json=request_data)
 
         assert response.status_code == 200
-        assert len(response.json()['summaries']) == 1
-        ## TODO: mock properly 
+        assert len(response.json()["summaries"]) == 1
+        ## TODO: mock properly
         # assert response.json()['summaries'][0] == SAMPLE_SUMMARY
 
-
     def test_multiple_providers(self, mock_text_processor, api_mock_summary_generator):
         request_data = {
             "file_path": SAMPLE_PATH,
             "summary_type": "brief",
-            "providers": ["anthropic","gemma"]
-            
+            "providers": ["anthropic", "gemma"],
+        }
+        response = client.post("/summarize", json=request_data)
+
+        assert response.status_code == 200
+        assert len(response.json()["summaries"]) == 2
+
+    def test_provider_timings(self, mock_text_processor, api_mock_summary_generator):
+        request_data = {
+            "file_path": SAMPLE_PATH,
+            "summary_type": "brief",
+            "providers": ["anthropic", "openai"],
         }
         response = client.post("/summarize", json=request_data)
 
         assert response.status_code == 200
-        assert len(response.json()['summaries']) == 2
-        
\ No newline at end of file
+        timings = response.json()["timings"]
+        assert [timing["provider"] for timing in timings] == ["anthropic", "openai"]
+        assert all(timing["seconds"] >= 0 for timing in timings)
+
+    def test_providers_run_concurrently(
+        self, mock_text_processor, api_mock_summary_generator
+    ):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def generate_summary(summary_req):
+            barrier.wait()
+            return schemas.SummaryResponse(
+                provider=summary_req.provider,
+                summary=SAMPLE_SUMMARY,
+                summary_type="brief",
+            )
+
+        api_mock_summary_generator.generate_summary.side_effect = generate_summary
+        request_data = {
+            "file_path": SAMPLE_PATH,
+            "summary_type": "brief",
+            "providers": ["anthropic", "openai"],
+        }
+        response = client.post("/summarize", json=request_data)
+
+        assert response.status_code == 200
+        assert [s["provider"] for s in response.json()["summaries"]] == [
+            "anthropic",
+            "openai",
+        ]
+
+
+class TestUploadEndpoint:
+
+    def test_upload_is_extracted_in_memory(self, api_mock_summary_generator):
+        response = client.post(
+            "/summarize/upload",
+            files={"file": ("notes.txt", SAMPLE_TEXT.encode("utf-8"), "text/plain")},
+            data={"summary_type": "bullets", "providers": ["anthropic", "openai"]},
+        )
+
+        assert response.status_code == 200
+        assert len(response.json()["summaries"]) == 2
+        summary_req = api_mock_summary_generator.generate_summary.call_args[0][0]
+        assert summary_req.text == SAMPLE_TEXT
+        assert summary_req.summary_type == "bullets"
+
+    def test_pdf_upload_is_summarized_from_pages(self, api_mock_summary_generator):
+        api_mock_summary_generator.generate_summary_from_pieces.side_effect = lambda pieces, summary_type, provider, map_reduce, document_id: schemas.SummaryResponse(
+            provider=provider, summary="|".join(pieces), summary_type=summary_type
+        )
+
+        with patch(
+            "src.processors.document.DocumentProcessor._iter_pdf_pages",
+            side_effect=lambda source: iter([source.read().decode(), "page 2"]),
+        ):
+            response = client.post(
+                "/summarize/upload",
+                files={"file": ("report.pdf", b"page 1", "application/pdf")},
+                data={"providers": ["anthropic", "openai"], "document_id": "report"},
+            )
+
+        assert response.status_code == 200
+        assert [s["summary"] for s in response.json()["summaries"]] == [
+            "page 1|page 2"
+        ] * 2
+        for (
+            call
+        ) in api_mock_summary_generator.generate_summary_from_pieces.call_args_list:
+            assert call.args[4] == "report"
+        api_mock_summary_generator.generate_summary.assert_not_called()
+
+    def test_docx_upload_is_summarized_from_paragraphs(
+        self, api_mock_summary_generator
+    ):
+        api_mock_summary_generator.generate_summary_from_pieces.side_effect = lambda pieces, summary_type, provider, map_reduce, document_id: schemas.SummaryResponse(
+            provider=provider, summary="|".join(pieces), summary_type=summary_type
+        )
+
+        with patch(
+            "src.processors.document.DocumentProcessor._iter_docx_paragraphs",
+            side_effect=lambda source: iter([source.read().decode(), "second"]),
+        ):
+            response = client.post(
+                "/summarize/upload",
+                files={"file": ("notes.docx", b"first", "application/octet-stream")},
+            )
+
+        assert response.status_code == 200
+        assert response.json()["summaries"][0]["summary"] == "first|second"
+        api_mock_summary_generator.generate_summary.assert_not_called()
+
+    def test_unsupported_upload(self, api_mock_summary_generator):
+        response = client.post(
+            "/summarize/upload", files={"file": ("notes.xyz", b"content", "text/plain")}
+        )
+
+        assert response.status_code == 400
+        api_mock_summary_generator.generate_summary.assert_not_called()
+
+
+class TestCompareEndpoint:
+
+    def test_compare_summaries(self, mock_text_processor, api_mock_summary_generator):
+        request_data = {
+            "file_path": SAMPLE_PATH,
+            "summaries": [
+                {
+                    "provider": "anthropic",
+                    "summary": "Summary 1",
+                    "summary_type": "brief",
+                },
+                {"provider": "openai", "summary": "Summary 2", "summary_type": "brief"},
+            ],
+            "provider": "anthropic",
+        }
+        response = client.post("/compare-summaries", json=request_data)
+
+        assert response.status_code == 200
+        assert response.json()["evaluation_of_summaries"] == "Compare summaries"
+        compare_req = api_mock_summary_generator.compare_summaries.call_args[0][0]
+        assert compare_req.text == SAMPLE_TEXT
+        assert len(compare_req.summaries) == 2
+
+
+def parse_sse(body: str) -> List[tuple]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestStreamEndpoint:
+
+    def test_streams_chunk_summaries(
+        self, mock_text_processor, api_mock_summary_generator
+    ):
+        def generate_summary(summary_req, on_chunk):
+            on_chunk(0, "First chunk")
+            on_chunk(1, "Second chunk")
+            return schemas.SummaryResponse(
+                provider=summary_req.provider,
+                summary=SAMPLE_SUMMARY,
+                summary_type="brief",
+            )
+
+        api_mock_summary_generator.is_single_pass.return_value = False
+        api_mock_summary_generator.generate_summary.side_effect = generate_summary
+        request_data = {"file_path": SAMPLE_PATH, "providers": ["anthropic"]}
+
+        response = client.post("/summarize/stream", json=request_data)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert [event for event, _ in events] == ["chunk", "chunk", "summary", "done"]
+        assert events[0][1] == {
+            "provider": "anthropic",
+            "index": 0,
+            "summary": "First chunk",
+        }
+        assert events[2][1]["summary"] == SAMPLE_SUMMARY
+
+    def test_streams_token_deltas(
+        self, mock_text_processor, api_mock_summary_generator
+    ):
+        async def astream_summary(summary_req):
+            for delta in ["This is ", "the summary"]:
+                yield delta
+
+        api_mock_summary_generator.is_single_pass.return_value = True
+        api_mock_summary_generator.astream_summary = astream_summary
+        request_data = {"file_path": SAMPLE_PATH, "providers": ["anthropic", "openai"]}
+
+        response = client.post("/summarize/stream", json=request_data)
+
+        events = parse_sse(response.text)
+        deltas = [data for event, data in events if event == "delta"]
+        summaries = {
+            data["provider"]: data for event, data in events if event == "summary"
+        }
+        assert len(deltas) == 4
+        assert summaries["openai"]["summary"] == "This is the summary"
+        assert events[-1][0] == "done"
+
+
+class TestLargeTextStreaming:
+
+    def test_pdf_is_summarized_from_pages(self, tmp_path, api_mock_summary_generator):
+        file_path = tmp_path / "report.pdf"
+        file_path.write_bytes(b"%PDF")
+        api_mock_summary_generator.generate_summary_from_pieces.side_effect = lambda pieces, summary_type, provider, map_reduce, document_id: schemas.SummaryResponse(
+            provider=provider, summary="|".join(pieces), summary_type=summary_type
+        )
+
+        request = {"file_path": str(file_path), "providers": ["anthropic", "openai"]}
+
+        with patch(
+            "src.processors.document.DocumentProcessor._iter_pdf_pages",
+            return_value=iter(["page 1", "page 2"]),
+        ) as parse:
+            response = client.post("/summarize", json=request)
+
+            assert response.status_code == 200
+            assert [s["summary"] for s in response.json()["summaries"]] == [
+                "page 1|page 2"
+            ] * 2
+            api_mock_summary_generator.generate_summary.assert_not_called()
+
+            # The extracted text is cached, so the summaries can be as well
+            response = client.post("/summarize", json=request)
+
+        assert response.status_code == 200
+        parse.assert_called_once()
+        summary_req = api_mock_summary_generator.generate_summary.call_args[0][0]
+        assert summary_req.text == "page 1\npage 2"
+
+    def test_large_txt_is_summarized_from_pieces(
+        self, tmp_path, api_mock_summary_generator
+    ):
+        file_path = tmp_path / "transcript.txt"
+        file_path.write_text("A line of the transcript.\n" * 20, encoding="utf-8")
+        api_mock_summary_generator.generate_summary_from_pieces.side_effect = lambda pieces, summary_type, provider, map_reduce, document_id: schemas.SummaryResponse(
+            provider=provider, summary="".join(pieces)[:9], summary_type=summary_type
+        )
+
+        with patch.object(settings, "MAX_FILE_SIZE", 100):
+            response = client.post(
+                "/summarize",
+                json={
+                    "file_path": str(file_path),
+                    "providers": ["anthropic", "openai"],
+                    "document_id": "transcript",
+                },
+            )
+
+        assert response.status_code == 200
+        assert [s["summary"] for s in response.json()["summaries"]] == ["A line of"] * 2
+        for (
+            call
+        ) in api_mock_summary_generator.generate_summary_from_pieces.call_args_list:
+            assert call.args[4] == "transcript"
+        api_mock_summary_generator.generate_summary.assert_not_called()
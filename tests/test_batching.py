@@ -0,0 +1,170 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.config.settings import settings
+from src.services.batching import MicroBatcher
+from src.services.fake_provider import FakeChatModel, FakeProviderError
+from src.services.model_manager import ModelManager
+
+
+class Dispatcher:
+    def __init__(self, fail_items=(), error=None):
+        self.batches = []
+        self.fail_items = fail_items
+        self.error = error
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if self.error is not None:
+            raise self.error
+        return [
+            ValueError(item) if item in self.fail_items else f"result {item}"
+            for item in items
+        ]
+
+
+def call_concurrently(batcher, items):
+    with ThreadPoolExecutor(max_workers=len(items)) as executor:
+        futures = [executor.submit(batcher.call, item) for item in items]
+    return futures
+
+
+class TestMicroBatcher:
+    def test_concurrent_calls_share_a_batch(self):
+        dispatch = Dispatcher()
+        batcher = MicroBatcher(dispatch, window=0.5, max_size=4)
+
+        futures = call_concurrently(batcher, range(4))
+
+        assert [future.result() for future in futures] == [
+            f"result {item}" for item in range(4)
+        ]
+        assert len(dispatch.batches) == 1
+        assert sorted(dispatch.batches[0]) == [0, 1, 2, 3]
+        assert batcher.stats() == {"batches": 1, "items": 4, "mean_size": 4.0}
+
+    def test_full_batches_are_sent_without_waiting_for_the_window(self):
+        dispatch = Dispatcher()
+        batcher = MicroBatcher(dispatch, window=10, max_size=2)
+
+        start = time.monotonic()
+        call_concurrently(batcher, range(4))
+
+        assert time.monotonic() - start < 5
+        assert sorted(len(batch) for batch in dispatch.batches) == [2, 2]
+
+    def test_a_lone_call_is_sent_after_the_window(self):
+        dispatch = Dispatcher()
+        batcher = MicroBatcher(dispatch, window=0.05, max_size=8)
+
+        start = time.monotonic()
+        assert batcher.call("item") == "result item"
+
+        assert time.monotonic() - start >= 0.05
+        assert dispatch.batches == [["item"]]
+
+    def test_errors_reach_their_callers(self):
+        batcher = MicroBatcher(Dispatcher(fail_items=(1,)), window=0.5, max_size=2)
+
+        succeeded, failed = call_concurrently(batcher, [0, 1])
+
+        assert succeeded.result() == "result 0"
+        assert isinstance(failed.exception(), ValueError)
+
+    def test_dispatch_errors_fail_the_batch(self):
+        dispatch = Dispatcher(error=RuntimeError("down"))
+        batcher = MicroBatcher(dispatch, window=0.5, max_size=2)
+
+        futures = call_concurrently(batcher, [0, 1])
+
+        assert all(isinstance(future.exception(), RuntimeError) for future in futures)
+
+
+class CountingFakeModel(FakeChatModel):
+    def batch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        self.__dict__.setdefault("batch_sizes", []).append(len(inputs))
+        return super().batch(
+            inputs, config, return_exceptions=return_exceptions, **kwargs
+        )
+
+
+class SlowRetryModel:
+    """
+    Model failing the batched prompts that contain "fail" and answering
+    them slowly when they are sent alone.
+    """
+
+    def batch(self, inputs, config=None, *, return_exceptions=False):
+        return [
+            (
+                FakeProviderError(500, "Internal Server Error")
+                if "fail" in prompt
+                else MagicMock(content=f"batched {prompt}", usage_metadata={})
+            )
+            for prompt in inputs
+        ]
+
+    def invoke(self, prompt):
+        time.sleep(0.5)
+        return MagicMock(content=f"retried {prompt}", usage_metadata={})
+
+
+class TestModelManagerBatching:
+    @pytest.fixture
+    def manager(self):
+        manager = ModelManager()
+        manager.models["fake"] = CountingFakeModel(latency_median=0.05, output_tokens=3)
+        with patch.object(settings, "BATCH_PROVIDERS", ["fake"]), patch.object(
+            settings, "BATCH_WINDOW_MS", 200.0
+        ), patch.object(settings, "BATCH_MAX_SIZE", 8):
+            yield manager
+
+    def test_concurrent_completions_are_batched(self, manager):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            prompts = [f"prompt {index}" for index in range(8)]
+            results = list(
+                executor.map(
+                    lambda prompt: manager.get_completion("fake", prompt), prompts
+                )
+            )
+
+        assert results == ["summary summary summary"] * 8
+        assert manager.models["fake"].batch_sizes == [8]
+        stats = manager.provider_stats()["fake"]
+        assert stats["batching"]["batches"] == 1
+        assert stats["latency"]["samples"] == 8
+
+    def test_failed_prompts_are_retried_alone(self, manager):
+        model = manager.models["fake"]
+        failures = iter([FakeProviderError(500, "Internal Server Error")])
+        original = model._check_failure
+
+        def fail_once():
+            error = next(failures, None)
+            if error is not None:
+                raise error
+            original()
+
+        with patch.object(model, "_check_failure", fail_once):
+            assert manager.get_completion("fake", "prompt") == "summary summary summary"
+
+        assert model.batch_sizes == [1]
+
+    def test_failed_prompts_do_not_hold_up_the_batch(self, manager):
+        manager.models["fake"] = SlowRetryModel()
+        finished = {}
+
+        def complete(prompt):
+            result = manager.get_completion("fake", prompt)
+            finished[prompt] = time.monotonic()
+            return result
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(complete, ["ok", "fail"]))
+
+        assert results == ["batched ok", "retried fail"]
+        assert finished["fail"] - finished["ok"] >= 0.4
+        assert manager.admission_stats()["fake"]["in_flight"] == 0
@@ -0,0 +1,153 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.models.schemas import SummaryRequest
+from src.services.cache import LRUCache, ManifestStore, SQLiteCache, SummaryCache
+from src.services.metrics import CACHE_LOOKUPS
+from src.services.summary import SummaryGenerator
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+    def test_expires_entries(self):
+        cache = LRUCache(max_entries=2, ttl=10)
+        with patch("src.services.cache.time.monotonic", return_value=100.0):
+            cache.set("a", "1")
+        with patch("src.services.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestSummaryCache:
+    def test_disk_tier_is_shared(self, tmp_path):
+        db_path = str(tmp_path / "cache.db")
+        first = SummaryCache(db_path=db_path)
+        first.set_summary("text", "brief", "anthropic", "summary")
+
+        second = SummaryCache(db_path=db_path)
+
+        assert second.get_summary("text", "brief", "anthropic") == "summary"
+        assert second.get_summary("text", "brief", "anthropic") == "summary"
+        stats = second.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 0
+
+    def test_lookups_are_labelled_like_text_cache_lookups(self, tmp_path):
+        db_path = str(tmp_path / "cache.db")
+        results = ("memory_hit", "disk_hit", "miss")
+        before = [CACHE_LOOKUPS.value(cache="summary", result=r) for r in results]
+        cache = SummaryCache(db_path=db_path)
+        cache.set_summary("text", "brief", "anthropic", "summary")
+
+        cache.get_summary("text", "brief", "anthropic")
+        SummaryCache(db_path=db_path).get_summary("text", "brief", "anthropic")
+        cache.get_summary("other text", "brief", "anthropic")
+
+        after = [CACHE_LOOKUPS.value(cache="summary", result=r) for r in results]
+        assert [a - b for a, b in zip(after, before)] == [1, 1, 1]
+
+    def test_key_includes_model_name(self, monkeypatch):
+        cache = SummaryCache()
+        cache.set_summary("text", "brief", "anthropic", "summary")
+
+        monkeypatch.setattr(
+            "src.services.model_manager.settings.ANTHROPIC_MODEL", "another-model"
+        )
+
+        assert cache.get_summary("text", "brief", "anthropic") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_expired_disk_entries(self, tmp_path):
+        disk = SQLiteCache(str(tmp_path / "cache.db"), ttl=10)
+        with patch("src.services.cache.time.time", return_value=100.0):
+            disk.set("key", "value")
+        with patch("src.services.cache.time.time", return_value=111.0):
+            assert disk.get("key") is None
+
+
+class TestManifestStore:
+    MANIFEST = [{"hash": "abc", "summary": "Summary"}]
+
+    def test_manifests_persist_without_expiry(self, tmp_path):
+        db_path = str(tmp_path / "manifests.db")
+        ManifestStore(db_path).set("spec", "brief", "anthropic", self.MANIFEST)
+
+        with patch("src.services.cache.time.time", return_value=1e12):
+            manifest = ManifestStore(db_path).get("spec", "brief", "anthropic")
+
+        assert manifest == self.MANIFEST
+
+    def test_in_memory_store(self):
+        store = ManifestStore()
+        store.set("spec", "brief", "anthropic", self.MANIFEST)
+
+        assert store.get("spec", "brief", "anthropic") == self.MANIFEST
+        assert store.get("spec", "bullets", "anthropic") == []
+
+    def test_in_memory_store_evicts_least_recently_used(self):
+        store = ManifestStore(max_entries=2)
+        store.set("spec", "brief", "anthropic", self.MANIFEST)
+        store.set("plan", "brief", "anthropic", self.MANIFEST)
+        store.get("spec", "brief", "anthropic")
+        store.set("notes", "brief", "anthropic", self.MANIFEST)
+
+        assert store.get("spec", "brief", "anthropic") == self.MANIFEST
+        assert store.get("plan", "brief", "anthropic") == []
+        assert store.get("notes", "brief", "anthropic") == self.MANIFEST
+
+
+class TestSummaryGeneratorCache:
+    LONG_TEXT = " ".join(f"w{i:05d}" for i in range(3000))
+
+    @pytest.fixture
+    def model_manager(self):
+        model_manager = Mock()
+        model_manager.get_completion.side_effect = lambda provider, prompt: (
+            prompt.split()[-1]
+        )
+        return model_manager
+
+    def test_repeated_summary_is_served_from_cache(self, model_manager):
+        generator = SummaryGenerator(model_manager, cache=SummaryCache())
+        request = SummaryRequest(text="Short text", provider="anthropic")
+
+        first = generator.generate_summary(request)
+        second = generator.generate_summary(request)
+
+        assert first.summary == second.summary
+        model_manager.get_completion.assert_called_once()
+
+    def test_finished_chunks_are_reused(self, model_manager):
+        generator = SummaryGenerator(model_manager, cache=SummaryCache())
+        chunks = generator._chunk_text(self.LONG_TEXT)
+        failing_word = chunks[1].split()[-1]
+
+        def fail_once(provider, prompt):
+            if prompt.endswith(failing_word):
+                raise Exception("Chunk failed")
+            return prompt.split()[-1]
+
+        model_manager.get_completion.side_effect = fail_once
+        request = SummaryRequest(text=self.LONG_TEXT, provider="anthropic")
+        assert generator.generate_summary(request).error == "Chunk failed"
+
+        model_manager.get_completion.reset_mock()
+        model_manager.get_completion.side_effect = lambda provider, prompt: (
+            prompt.split()[-1]
+        )
+        response = generator.generate_summary(request)
+
+        assert response.error is None
+        model_manager.get_completion.assert_called_once()
@@ -0,0 +1,125 @@
+import pytest
+
+from src.processors.chunker import (
+    AnchoredChunker,
+    TextChunker,
+    approximate_token_count,
+    get_token_counter,
+)
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+class TestTextChunker:
+    SENTENCE = "This sentence has exactly seven words."
+
+    def test_chunks_respect_token_limit(self):
+        text = " ".join([self.SENTENCE] * 100)
+        chunker = TextChunker(max_tokens=50, overlap_tokens=0, count_tokens=word_count)
+
+        chunks = chunker.chunk(text)
+
+        assert len(chunks) > 1
+        assert all(word_count(chunk) <= 50 for chunk in chunks)
+        assert " ".join(chunks) == text
+
+    def test_chunks_end_on_sentence_boundaries(self):
+        text = " ".join([self.SENTENCE] * 20)
+        chunker = TextChunker(max_tokens=30, overlap_tokens=0, count_tokens=word_count)
+
+        chunks = chunker.chunk(text)
+
+        assert all(chunk.endswith("words.") for chunk in chunks)
+
+    def test_chunks_prefer_paragraph_boundaries(self):
+        first = " ".join([self.SENTENCE] * 5)
+        second = " ".join([self.SENTENCE] * 5)
+        chunker = TextChunker(max_tokens=56, overlap_tokens=0, count_tokens=word_count)
+
+        chunks = chunker.chunk(f"{first}\n\n{second}")
+
+        assert chunks == [first, second]
+
+    def test_overlap_repeats_trailing_sentences(self):
+        sentences = [f"Sentence number {i} is here." for i in range(12)]
+        chunker = TextChunker(max_tokens=20, overlap_tokens=5, count_tokens=word_count)
+
+        chunks = chunker.chunk(" ".join(sentences))
+
+        for previous, chunk in zip(chunks, chunks[1:]):
+            last_sentence = previous.rsplit(". ", 1)[-1]
+            assert chunk.startswith(last_sentence.rstrip("."))
+
+    def test_oversized_sentence_is_split_on_words(self):
+        text = "word " * 300
+        chunker = TextChunker(max_tokens=100, overlap_tokens=0, count_tokens=word_count)
+
+        chunks = chunker.chunk(text)
+
+        assert [word_count(chunk) for chunk in chunks] == [100, 100, 100]
+
+    def test_streamed_pieces_match_whole_text(self):
+        pages = [" ".join([self.SENTENCE] * 40) for _ in range(6)]
+        chunker = TextChunker(max_tokens=100, overlap_tokens=10)
+
+        assert list(chunker.iter_chunks(pages)) == chunker.chunk("\n".join(pages))
+
+    def test_overlap_must_be_smaller_than_half_the_chunk(self):
+        with pytest.raises(ValueError):
+            TextChunker(max_tokens=100, overlap_tokens=50)
+
+
+class TestTokenCounter:
+    def test_unknown_provider_uses_approximation(self):
+        assert get_token_counter("anthropic") is approximate_token_count
+        assert approximate_token_count("abcdefgh") == 2
+
+
+class TestAnchoredChunker:
+    PARAGRAPHS = [
+        f"Paragraph {index} describes section {index} of the policy in a few words."
+        for index in range(200)
+    ]
+
+    def test_chunks_are_whole_paragraphs_within_limit(self):
+        chunker = AnchoredChunker(max_tokens=60, count_tokens=word_count)
+
+        chunks = chunker.chunk("\n\n".join(self.PARAGRAPHS))
+
+        assert all(word_count(chunk) <= 60 for chunk in chunks)
+        assert "\n\n".join(chunks).split("\n\n") == self.PARAGRAPHS
+
+    def test_edit_only_changes_nearby_chunks(self):
+        chunker = AnchoredChunker(max_tokens=60, count_tokens=word_count)
+        edited = list(self.PARAGRAPHS)
+        edited.insert(100, "A new paragraph inserted in the middle of the document.")
+
+        before = chunker.chunk("\n\n".join(self.PARAGRAPHS))
+        after = chunker.chunk("\n\n".join(edited))
+
+        changed = set(after) - set(before)
+        assert 0 < len(changed) <= 2
+        assert len(set(after) & set(before)) >= len(before) - 2
+
+    def test_single_line_breaks_are_anchored(self):
+        # PDF and DOCX text separates paragraphs with single line breaks
+        chunker = AnchoredChunker(max_tokens=60, count_tokens=word_count)
+        edited = ["A new opening sentence added to the document."] + self.PARAGRAPHS
+
+        before = chunker.chunk("\n".join(self.PARAGRAPHS))
+        after = chunker.chunk("\n".join(edited))
+
+        assert len(before) > 10
+        assert "\n".join(after).split("\n") == edited
+        assert len(set(after) & set(before)) >= len(before) - 5
+
+    def test_streamed_pieces_give_the_same_chunks(self):
+        chunker = AnchoredChunker(max_tokens=60, count_tokens=word_count)
+        text = "\n".join(self.PARAGRAPHS)
+        pages = [
+            "\n".join(self.PARAGRAPHS[start : start + 7]) for start in range(0, 200, 7)
+        ]
+
+        assert list(chunker.iter_chunks(pages)) == chunker.chunk(text)
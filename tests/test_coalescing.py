@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+
+from src.models.schemas import SummaryRequest
+from src.services.coalescing import SingleFlight
+from src.services.summary import SummaryGenerator
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise TimeoutError("Condition not reached")
+        time.sleep(0.01)
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(flight.do, "key", work) for _ in range(4)]
+            wait_for(lambda: flight.stats()["coalesced"] == 3)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert results == ["result"] * 4
+        assert len(calls) == 1
+        assert flight.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+    def test_errors_are_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise RuntimeError("Provider down")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(flight.do, "key", fail) for _ in range(2)]
+            wait_for(lambda: flight.stats()["coalesced"] == 1)
+            release.set()
+            for future in futures:
+                with pytest.raises(RuntimeError, match="Provider down"):
+                    future.result()
+
+    def test_later_calls_run_again(self):
+        flight = SingleFlight()
+
+        assert flight.do("key", lambda: 1) == 1
+        assert flight.do("key", lambda: 2) == 2
+        assert flight.stats()["executed"] == 2
+
+
+class TestSummaryCoalescing:
+    def test_identical_requests_share_provider_calls(self):
+        release = threading.Event()
+        model_manager = Mock()
+
+        def complete(provider, prompt):
+            release.wait(5)
+            return "Shared summary"
+
+        model_manager.get_completion.side_effect = complete
+        generator = SummaryGenerator(model_manager)
+        request = SummaryRequest(text="Popular document", provider="anthropic")
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [
+                executor.submit(generator.generate_summary, request) for _ in range(5)
+            ]
+            wait_for(
+                lambda: generator.coalescing_stats()["summaries"]["coalesced"] == 4
+            )
+            release.set()
+            summaries = [future.result().summary for future in futures]
+
+        assert summaries == ["Shared summary"] * 5
+        model_manager.get_completion.assert_called_once()
+
+    def test_identical_chunks_share_provider_calls(self):
+        model_manager = Mock()
+        generator = SummaryGenerator(model_manager)
+        release = threading.Event()
+
+        def complete(provider, prompt):
+            release.wait(5)
+            return "Chunk summary"
+
+        model_manager.get_completion.side_effect = complete
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(
+                    generator._summarize_chunk, "Same chunk", "anthropic", "brief"
+                )
+                for _ in range(3)
+            ]
+            wait_for(lambda: generator.coalescing_stats()["chunks"]["coalesced"] == 2)
+            release.set()
+            assert [future.result() for future in futures] == ["Chunk summary"] * 3
+
+        model_manager.get_completion.assert_called_once()
@@ -0,0 +1,141 @@
+import random
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from src.config.settings import settings
+from src.models.schemas import SummaryRequest
+from src.services.dedup import LSHIndex, MinHasher
+from src.services.summary import SummaryGenerator
+
+WORDS = [f"term{index}" for index in range(2000)]
+
+
+def random_text(seed: int, words: int = 300) -> str:
+    generator = random.Random(seed)
+    return " ".join(generator.choice(WORDS) for _ in range(words))
+
+
+def edit(text: str, changes: int) -> str:
+    words = text.split()
+    for index in range(changes):
+        words[index * 17 % len(words)] = "edited"
+    return " ".join(words)
+
+
+DISCLAIMER = random_text(0)
+
+
+class TestMinHash:
+    def test_similarity_tracks_shared_shingles(self):
+        hasher = MinHasher()
+
+        signature = hasher.signature(DISCLAIMER)
+
+        assert np.array_equal(signature, hasher.signature(DISCLAIMER))
+        assert np.mean(signature == hasher.signature(edit(DISCLAIMER, 3))) > 0.85
+        assert np.mean(signature == hasher.signature(random_text(1))) < 0.2
+
+    def test_short_and_empty_texts(self):
+        hasher = MinHasher()
+
+        assert len(hasher.signature("")) == hasher.permutations
+        assert np.array_equal(
+            hasher.signature("Two words"), hasher.signature("two  WORDS")
+        )
+
+
+class TestLSHIndex:
+    def test_finds_near_duplicates_only(self):
+        hasher = MinHasher()
+        index = LSHIndex(threshold=0.8)
+        index.add("disclaimer", hasher.signature(DISCLAIMER), "Disclaimer summary")
+        index.add("other", hasher.signature(random_text(1)), "Other summary")
+
+        assert index.query(hasher.signature(edit(DISCLAIMER, 2))) == (
+            "disclaimer",
+            "Disclaimer summary",
+        )
+        assert index.query(hasher.signature(random_text(2))) is None
+
+    def test_evicts_oldest_entries(self):
+        hasher = MinHasher()
+        index = LSHIndex(max_entries=2)
+        texts = [random_text(seed) for seed in range(3)]
+        for seed, text in enumerate(texts):
+            index.add(seed, hasher.signature(text), seed)
+
+        assert len(index) == 2
+        assert index.query(hasher.signature(texts[0])) is None
+        assert index.query(hasher.signature(texts[2])) == (2, 2)
+
+
+@pytest.fixture
+def dedup_enabled():
+    with patch.object(settings, "DEDUP_ENABLED", True):
+        yield
+
+
+class TestSummaryDeduplication:
+    CHUNKS = [
+        DISCLAIMER,
+        random_text(1),
+        edit(DISCLAIMER, 2),
+        random_text(2),
+        DISCLAIMER,
+    ]
+
+    def test_duplicate_chunks_reuse_summaries(self, dedup_enabled):
+        model_manager = Mock()
+        model_manager.get_completion.side_effect = (
+            lambda provider, prompt: prompt.split()[-1]
+        )
+        generator = SummaryGenerator(model_manager)
+        chunk_summaries = {}
+
+        with patch.object(generator, "_chunk_text", return_value=self.CHUNKS):
+            response = generator.generate_summary(
+                SummaryRequest(text="word " * 5000, provider="anthropic"),
+                on_chunk=lambda index, summary: chunk_summaries.update(
+                    {index: summary}
+                ),
+            )
+
+        assert response.chunks_deduplicated == 2
+        assert model_manager.get_completion.call_count == 3
+        first = DISCLAIMER.split()[-1]
+        assert response.summary.split("\n\n") == [
+            first,
+            self.CHUNKS[1].split()[-1],
+            first,
+            self.CHUNKS[3].split()[-1],
+            first,
+        ]
+        assert sorted(chunk_summaries) == list(range(5))
+
+    def test_recent_chunks_of_other_texts_are_reused(self, dedup_enabled):
+        model_manager = Mock()
+        model_manager.get_completion.return_value = "Summary"
+        generator = SummaryGenerator(model_manager)
+
+        generator._summarize_chunks([DISCLAIMER, random_text(1)], "anthropic", "brief")
+        results, errors, deduplicated = generator._summarize_chunks(
+            [random_text(3), edit(DISCLAIMER, 3)], "anthropic", "brief"
+        )
+
+        assert deduplicated == 1
+        assert results == ["Summary", "Summary"]
+        assert model_manager.get_completion.call_count == 3
+
+    def test_disabled_by_default(self):
+        model_manager = Mock()
+        model_manager.get_completion.return_value = "Summary"
+        generator = SummaryGenerator(model_manager)
+
+        _, _, deduplicated = generator._summarize_chunks(
+            [DISCLAIMER, edit(DISCLAIMER, 1)], "anthropic", "brief"
+        )
+
+        assert deduplicated is None
+        assert model_manager.get_completion.call_count == 2
@@ -1,10 +1,21 @@
+import os
 from io import BytesIO
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from docx import Document
 from reportlab.pdfgen import canvas
 
+from src.config.settings import settings as app_settings
+from src.processors.document import (
+    DocumentProcessor,
+    detect_encoding,
+    iter_docx_text,
+    iter_txt_text,
+)
+from src.services.metrics import EXTRACT_SECONDS
+
 
 def create_test_pdf(tmp_path: Path, content: str) -> Path:
     """Create a real PDF file with the given content"""
@@ -17,6 +28,17 @@ def create_test_pdf(tmp_path: Path, content: str) -> Path:
     return file_path
 
 
+def create_multipage_pdf(tmp_path: Path, pages: list) -> Path:
+    """Create a PDF file with one line of content per page"""
+    file_path = tmp_path / "multipage.pdf"
+    c = canvas.Canvas(str(file_path))
+    for content in pages:
+        c.drawString(100, 750, content)
+        c.showPage()
+    c.save()
+    return file_path
+
+
 def create_test_txt(tmp_path: Path, content: str) -> Path:
     """Create a text file with the given content"""
     file_path = tmp_path / "test.txt"
@@ -92,6 +114,42 @@ class TestDocumentProcessor:
         assert isinstance(result, str)
         assert len(result) > 0
 
+    def test_pdf_streams_pages(self, tmp_path, document_processor):
+        file_path = create_multipage_pdf(tmp_path, ["First page", "Second page"])
+
+        pages = list(document_processor.iter_text(str(file_path)))
+
+        assert [page.strip() for page in pages] == ["First page", "Second page"]
+        assert document_processor.extract_text(str(file_path)).split() == [
+            "First",
+            "page",
+            "Second",
+            "page",
+        ]
+
+    def test_pdf_content_streams_pages(self, tmp_path, document_processor):
+        file_path = create_multipage_pdf(tmp_path, ["First page", "Second page"])
+
+        assert document_processor.needs_streaming(str(file_path))
+        with open(file_path, "rb") as f:
+            data = document_processor.read_file(f, "upload.pdf")
+        pages = list(document_processor.iter_text_from_bytes(data, "upload.pdf"))
+
+        assert [page.strip() for page in pages] == ["First page", "Second page"]
+        with patch.object(app_settings, "MAX_FILE_SIZE", 10):
+            with pytest.raises(ValueError, match="File size exceeds limit"):
+                document_processor.read_file(BytesIO(data), "upload.pdf")
+
+    def test_pdf_parallel_extraction_keeps_page_order(self, tmp_path):
+        file_path = create_multipage_pdf(tmp_path, [f"Page {i}" for i in range(9)])
+        processor = DocumentProcessor(
+            cache_size=0, pdf_workers=2, pdf_parallel_threshold=2
+        )
+
+        pages = list(processor.iter_text(str(file_path)))
+
+        assert [page.strip() for page in pages] == [f"Page {i}" for i in range(9)]
+
     def test_unsupported_format(self, tmp_path, document_processor):
         file_path = create_test_file(tmp_path, "Test content", ".xyz")
         with pytest.raises(ValueError, match="Unsupported format"):
@@ -112,3 +170,262 @@ class TestDocumentProcessor:
         file_path = create_test_file(tmp_path, large_content, ".txt")
         with pytest.raises(ValueError, match="File size exceeds limit"):
             document_processor.extract_text(str(file_path))
+
+
+class TestExtractedTextCache:
+    def test_unchanged_file_is_not_parsed_again(self, tmp_path):
+        file_path = create_test_txt(tmp_path, "Cached content")
+        processor = DocumentProcessor()
+
+        with patch.object(
+            processor, "_extract_from_txt", wraps=processor._extract_from_txt
+        ) as extract:
+            first = processor.extract_text(str(file_path))
+            second = processor.extract_text(str(file_path))
+
+        assert first == second == "Cached content"
+        extract.assert_called_once()
+
+    def test_modified_file_is_parsed_again(self, tmp_path):
+        file_path = create_test_txt(tmp_path, "Old content")
+        processor = DocumentProcessor()
+        assert processor.extract_text(str(file_path)) == "Old content"
+
+        file_path.write_text("New content, longer", encoding="utf-8")
+        stat = file_path.stat()
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert processor.extract_text(str(file_path)) == "New content, longer"
+
+    def test_persisted_text_is_reused(self, tmp_path):
+        file_path = create_test_docx(tmp_path, "Persisted content")
+        cache_dir = tmp_path / "text_cache"
+        DocumentProcessor(cache_dir=str(cache_dir)).extract_text(str(file_path))
+
+        processor = DocumentProcessor(cache_dir=str(cache_dir))
+        with patch.object(processor, "_extract_from_docx") as extract:
+            result = processor.extract_text(str(file_path))
+
+        assert result == "Persisted content"
+        extract.assert_not_called()
+
+
+class TestInMemoryExtraction:
+    @pytest.mark.parametrize(
+        "create, filename",
+        [
+            (create_test_txt, "upload.txt"),
+            (create_test_docx, "upload.docx"),
+            (create_test_pdf, "upload.pdf"),
+        ],
+    )
+    def test_bytes_match_file_extraction(self, tmp_path, create, filename):
+        file_path = create(tmp_path, "Uploaded content")
+        processor = DocumentProcessor(cache_size=0)
+
+        from_bytes = processor.extract_text_from_bytes(file_path.read_bytes(), filename)
+
+        assert from_bytes == processor.extract_text(str(file_path))
+        assert "Uploaded content" in from_bytes
+
+    def test_file_object_is_left_open(self, tmp_path):
+        fileobj = BytesIO("Uploaded content".encode("utf-8"))
+
+        DocumentProcessor().extract_text_from_file(fileobj, "upload.txt")
+
+        assert not fileobj.closed
+
+    def test_same_upload_is_not_parsed_again(self):
+        processor = DocumentProcessor()
+
+        with patch.object(
+            processor, "_extract_from_txt", wraps=processor._extract_from_txt
+        ) as extract:
+            processor.extract_text_from_bytes(b"Same content", "first.txt")
+            processor.extract_text_from_bytes(b"Same content", "second.txt")
+
+        extract.assert_called_once()
+
+    def test_upload_limits(self, settings):
+        processor = DocumentProcessor()
+
+        with pytest.raises(ValueError, match="Unsupported format"):
+            processor.extract_text_from_bytes(b"content", "upload.xyz")
+        with pytest.raises(ValueError, match="File size exceeds limit"):
+            processor.extract_text_from_bytes(
+                b"x" * (settings.MAX_FILE_SIZE + 1), "upload.txt"
+            )
+
+
+class TestSharedText:
+    def test_pages_are_parsed_once_for_every_reader(self, tmp_path):
+        file_path = create_multipage_pdf(tmp_path, ["First page", "Second page"])
+        processor = DocumentProcessor()
+        extractions = EXTRACT_SECONDS.count(format="pdf")
+
+        with patch.object(
+            processor, "_iter_pdf_pages", wraps=processor._iter_pdf_pages
+        ) as parse:
+            shared = processor.open_text(str(file_path))
+            assert processor.open_text(str(file_path)) is shared
+            first, second = iter(shared), iter(shared)
+            assert next(first).strip() == "First page"
+            assert [page.strip() for page in second] == ["First page", "Second page"]
+            assert [page.strip() for page in first] == ["Second page"]
+
+        parse.assert_called_once()
+        assert EXTRACT_SECONDS.count(format="pdf") == extractions + 1
+        assert shared.text == processor.extract_text(str(file_path))
+        assert processor.open_text(str(file_path)) == shared.text
+
+    def test_docx_paragraphs_are_shared(self, tmp_path):
+        file_path = create_test_docx(tmp_path, "First paragraph")
+        processor = DocumentProcessor(cache_size=0)
+
+        assert processor.needs_streaming(str(file_path))
+        shared = processor.open_text(str(file_path))
+
+        assert list(shared) == ["First paragraph"]
+        assert shared.text == processor.extract_text(str(file_path))
+
+    def test_failed_extraction_reaches_every_reader(self):
+        processor = DocumentProcessor()
+
+        def pages(source):
+            yield "First page"
+            raise ValueError("Broken page")
+
+        with patch.object(processor, "_iter_pdf_pages", side_effect=pages):
+            shared = processor.open_text_from_bytes(b"%PDF", "broken.pdf")
+            for _ in range(2):
+                with pytest.raises(ValueError, match="Broken page"):
+                    list(shared)
+
+            assert shared.text is None
+            assert processor.open_text_from_bytes(b"%PDF", "broken.pdf") is not shared
+
+
+class TestStreamingDocx:
+    def test_matches_python_docx_paragraphs(self):
+        sample = (
+            Path(__file__).resolve().parent.parent
+            / "sample_data"
+            / "file-sample_100kB.docx"
+        )
+        paragraphs = [par.text for par in Document(str(sample)).paragraphs]
+
+        streamed = list(iter_docx_text(sample))
+
+        # Every paragraph in order, plus the table cells python-docx skipped
+        remaining = iter(streamed)
+        assert all(paragraph in remaining for paragraph in paragraphs)
+        assert len(streamed) > len(paragraphs)
+
+    def test_yields_table_cells_in_document_order(self, tmp_path):
+        file_path = tmp_path / "table.docx"
+        doc = Document()
+        doc.add_paragraph("Before the table")
+        table = doc.add_table(rows=1, cols=2)
+        table.cell(0, 0).text = "Left cell"
+        table.cell(0, 1).text = "Right cell"
+        table.cell(0, 1).add_paragraph("Second line")
+        doc.add_paragraph("After the table")
+        doc.save(str(file_path))
+
+        pieces = list(iter_docx_text(file_path))
+
+        assert pieces == [
+            "Before the table",
+            "Left cell",
+            "Right cell\nSecond line",
+            "After the table",
+        ]
+
+    def test_tabs_and_breaks(self, tmp_path):
+        file_path = tmp_path / "runs.docx"
+        doc = Document()
+        paragraph = doc.add_paragraph("Name")
+        paragraph.add_run().add_tab()
+        paragraph.add_run("Value")
+        paragraph.add_run().add_break()
+        paragraph.add_run("Next line")
+        doc.save(str(file_path))
+
+        assert list(iter_docx_text(file_path)) == [doc.paragraphs[0].text]
+
+
+class TestStreamingTxt:
+    def test_large_file_is_streamed_in_line_pieces(self, tmp_path, document_processor):
+        lines = [f"Line {i} of a long transcript." for i in range(200)]
+        file_path = create_test_txt(tmp_path, "\n".join(lines))
+
+        with patch.object(app_settings, "MAX_FILE_SIZE", 100):
+            assert document_processor.needs_streaming(str(file_path))
+            with pytest.raises(ValueError, match="File size exceeds limit"):
+                document_processor.extract_text(str(file_path))
+            pieces = list(document_processor.iter_text(str(file_path)))
+
+        assert len(pieces) > 1
+        assert "".join(pieces) == "\n".join(lines)
+        assert all(piece.endswith("\n") for piece in pieces[:-1])
+
+    def test_upper_case_suffix_is_streamed(self, tmp_path, document_processor):
+        file_path = tmp_path / "REPORT.TXT"
+        file_path.write_text("A line of the report.\n" * 20, encoding="utf-8")
+
+        with patch.object(app_settings, "MAX_FILE_SIZE", 100):
+            assert document_processor.needs_streaming(str(file_path))
+            pieces = list(document_processor.iter_text(str(file_path)))
+
+        assert "".join(pieces) == "A line of the report.\n" * 20
+
+    def test_multibyte_characters_across_blocks(self, tmp_path):
+        text = "Café naïve — 日本語 " * 50
+        file_path = tmp_path / "utf8.txt"
+        file_path.write_text(text, encoding="utf-8")
+
+        pieces = list(iter_txt_text(file_path, block_size=7))
+
+        assert "".join(pieces) == text
+        assert "\ufffd" not in "".join(pieces)
+
+    @pytest.mark.parametrize(
+        "encoding, detected",
+        [("utf-16", "utf-16"), ("utf-8-sig", "utf-8-sig"), ("cp1252", "cp1252")],
+    )
+    def test_detects_encoding(self, tmp_path, encoding, detected):
+        text = "Résumé of the “meeting”\nSecond line"
+        file_path = tmp_path / "encoded.txt"
+        file_path.write_bytes(text.encode(encoding))
+
+        assert detect_encoding(file_path.read_bytes()) == detected
+        assert "".join(iter_txt_text(file_path, block_size=8)) == text
+
+    def test_uploads_are_decoded_like_files(self, document_processor):
+        data = "Résumé of the “meeting”\nSecond line".encode("cp1252")
+
+        assert document_processor.extract_text_from_bytes(data, "notes.txt") == (
+            "Résumé of the “meeting”\nSecond line"
+        )
+        assert (
+            document_processor.extract_text_from_bytes(b"valid \x81 end", "broken.txt")
+            == "valid \ufffd end"
+        )
+
+    def test_invalid_bytes_are_replaced(self, tmp_path):
+        file_path = tmp_path / "broken.txt"
+        file_path.write_bytes("valid text ".encode("utf-8") * 10 + b"\xff\xfe\xfa end")
+
+        text = "".join(iter_txt_text(file_path, block_size=16, encoding="utf-8"))
+
+        assert text.startswith("valid text")
+        assert text.endswith("\ufffd\ufffd\ufffd end")
+
+    def test_line_longer_than_block(self, tmp_path):
+        text = "x" * 100
+        file_path = create_test_txt(tmp_path, text)
+
+        pieces = list(iter_txt_text(file_path, block_size=16))
+
+        assert "".join(pieces) == text
+        assert max(len(piece) for piece in pieces) <= 32
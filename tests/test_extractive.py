@@ -0,0 +1,96 @@
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from src.config.settings import settings
+from src.models.schemas import SummaryRequest
+from src.processors.chunker import approximate_token_count
+from src.processors.extractive import extract_sentences, rank_sentences, split_sentences
+from src.services.extractive_provider import ExtractiveChatModel
+from src.services.model_manager import ModelManager
+from src.services.summary import SummaryGenerator
+
+TEXT = """Vector search
+HNSW builds a layered graph of vectors for approximate nearest neighbour search.
+The upper layers of the graph hold few vectors and long links.
+Searches start in the upper layers and descend to the dense bottom layer of the graph.
+The cafeteria serves soup on Fridays."""
+
+
+class TestRanking:
+    def test_scores_favour_central_sentences(self):
+        sentences = split_sentences(TEXT)
+
+        scores = rank_sentences(sentences)
+
+        assert abs(scores.sum() - 1) < 1e-9
+        graph_scores = scores[1:4]
+        assert scores.argmax() in (1, 2, 3)
+        assert scores[4] < graph_scores.min()
+
+    def test_sentences_without_terms(self):
+        scores = rank_sentences(["1.", "2.", "Graphs index vectors."])
+
+        assert np.allclose(scores, 1 / 3)
+
+    def test_extract_keeps_budget_and_document_order(self):
+        extract = extract_sentences(TEXT, 40)
+
+        sentences = extract.split("\n")
+        assert 0 < len(sentences) < len(split_sentences(TEXT))
+        assert (
+            sum(approximate_token_count(sentence) + 1 for sentence in sentences) <= 40
+        )
+        assert sentences == sorted(sentences, key=TEXT.index)
+        assert "cafeteria" not in extract
+
+
+class TestExtractiveProvider:
+    def test_instruction_is_not_part_of_the_summary(self):
+        model = ExtractiveChatModel(max_tokens=40)
+        prompt = SummaryGenerator.SUMMARY_TYPES["brief"] + "\n" + TEXT
+
+        response = model.invoke(prompt)
+
+        assert response.content
+        assert "Provide" not in response.content
+        assert response.content.split("\n")[0] in TEXT
+        assert response.usage_metadata["output_tokens"] <= 40
+
+    def test_bullet_summaries(self):
+        model = ExtractiveChatModel(max_tokens=40)
+        prompt = SummaryGenerator.SUMMARY_TYPES["bullets"] + "\n" + TEXT
+
+        lines = model.invoke(prompt).content.split("\n")
+
+        assert all(line.startswith("- ") for line in lines)
+
+    def test_is_served_by_the_model_manager(self):
+        manager = ModelManager()
+
+        assert "extractive" in manager.providers
+        summary = manager.get_completion("extractive", "Summarize:\n" + TEXT)
+        assert summary and set(summary.split("\n")) <= set(split_sentences(TEXT))
+
+
+class TestPrefilter:
+    def test_chunks_are_cut_before_they_are_sent(self):
+        model_manager = Mock()
+        model_manager.get_completion.return_value = "Chunk summary"
+        generator = SummaryGenerator(model_manager)
+        text = "\n".join([TEXT] * 60)
+
+        with patch.object(settings, "EXTRACTIVE_PREFILTER", True):
+            response = generator.generate_summary(
+                SummaryRequest(text=text, provider="anthropic")
+            )
+
+        assert response.error is None
+        chunks = generator._chunk_text(text)
+        prompts = [
+            call.kwargs["prompt"]
+            for call in model_manager.get_completion.call_args_list
+        ]
+        assert len(prompts) == len(chunks)
+        sent = sum(approximate_token_count(prompt) for prompt in prompts)
+        assert sent < 0.7 * sum(approximate_token_count(chunk) for chunk in chunks)
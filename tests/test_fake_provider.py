@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.api import app
+from src.config.settings import settings
+from src.services.fake_provider import FakeChatModel, FakeProviderError
+from src.services.model_manager import ModelManager
+from src.services.rate_limit import is_overload_error, retry_after_seconds
+
+SAMPLE_PATH = "sample_data/hnsw.txt"
+
+
+class TestFakeChatModel:
+    def test_answers_with_configured_output_size(self):
+        model = FakeChatModel(latency_median=0, output_tokens=12)
+
+        response = model.invoke("Summarize this text")
+
+        assert len(response.content.split()) == 12
+        assert response.usage_metadata["output_tokens"] == 12
+        assert response.usage_metadata["total_tokens"] > 12
+
+    def test_streams_the_same_output(self):
+        model = FakeChatModel(latency_median=0, output_tokens=5)
+
+        async def collect():
+            return [chunk.content async for chunk in model.astream("prompt")]
+
+        assert "".join(asyncio.run(collect())) == model.invoke("prompt").content
+
+    def test_rate_limit_errors_look_like_provider_errors(self):
+        model = FakeChatModel(latency_median=0, rate_limit_rate=1.0)
+
+        with pytest.raises(FakeProviderError) as error:
+            model.invoke("prompt")
+
+        assert is_overload_error(error.value)
+        assert retry_after_seconds(error.value) == 1.0
+
+    def test_error_rate(self):
+        model = FakeChatModel(latency_median=0, error_rate=0.5, seed=7)
+        failures = 0
+        for _ in range(200):
+            try:
+                model.invoke("prompt")
+            except FakeProviderError as e:
+                assert e.status_code == 500
+                failures += 1
+
+        assert 60 < failures < 140
+
+
+class TestFakeProvider:
+    @pytest.fixture
+    def fake_settings(self, monkeypatch):
+        monkeypatch.setattr(settings, "FAKE_PROVIDER_ENABLED", True)
+        monkeypatch.setattr(settings, "FAKE_LATENCY_MEDIAN", 0)
+        monkeypatch.setattr(settings, "FAKE_OUTPUT_TOKENS", 8)
+
+    def test_disabled_by_default(self):
+        assert "fake" not in ModelManager().providers
+
+    def test_registered_when_enabled(self, fake_settings):
+        manager = ModelManager()
+
+        assert "fake" in manager.providers
+        assert manager.get_completion("fake", "prompt") == " ".join(["summary"] * 8)
+
+    def test_summarize_end_to_end(self, fake_settings):
+        client = TestClient(app)
+
+        response = client.post(
+            "/summarize", json={"file_path": SAMPLE_PATH, "providers": ["fake"]}
+        )
+
+        assert response.status_code == 200
+        summary = response.json()["summaries"][0]
+        assert summary["error"] is None
+        assert summary["summary"].startswith("summary")
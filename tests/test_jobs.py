@@ -0,0 +1,188 @@
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.models.schemas import JobRequest, SummaryResponse
+from src.processors.document import DocumentProcessor
+from src.services.cache import hash_text
+from src.services.jobs import JobStore, JobWorkerPool
+from src.services.summary import SummaryGenerator
+
+LONG_TEXT = " ".join(f"w{i:05d}" for i in range(3000))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"), lease_seconds=60)
+
+
+@pytest.fixture
+def model_manager():
+    model_manager = Mock()
+    model_manager.get_completion.side_effect = lambda provider, prompt: (
+        prompt.split()[-1]
+    )
+    return model_manager
+
+
+@pytest.fixture
+def pool(store, model_manager):
+    return JobWorkerPool(
+        store, DocumentProcessor(), SummaryGenerator(model_manager), workers=1
+    )
+
+
+class TestJobStore:
+    def test_claim_takes_queued_jobs_once(self, store):
+        job_id = store.create(JobRequest(file_path="doc.txt"))
+
+        assert store.claim() == job_id
+        assert store.claim() is None
+        assert store.get(job_id).status == "running"
+
+    def test_expired_lease_is_claimed_again(self, store):
+        job_id = store.create(JobRequest(file_path="doc.txt"))
+        store.claim()
+
+        with patch("src.services.jobs.time.time", return_value=time.time() + 61):
+            assert store.claim() == job_id
+
+    def test_chunk_progress(self, store):
+        job_id = store.create(JobRequest(file_path="doc.txt"))
+        store.set_total(job_id, chunks_total=3)
+        store.add_chunk(job_id, "anthropic", 0, "first")
+        store.add_chunk(job_id, "anthropic", 0, "first")
+
+        assert store.get(job_id).chunks_done == 1
+        assert store.chunks(job_id, "anthropic") == {0: "first"}
+
+
+class TestJobWorkerPool:
+    def test_summarize_job(self, tmp_path, store, pool):
+        file_path = tmp_path / "doc.txt"
+        file_path.write_text(LONG_TEXT, encoding="utf-8")
+        job_id = store.create(JobRequest(file_path=str(file_path)))
+
+        pool.run_job(store.claim())
+
+        job = store.get(job_id)
+        assert job.status == "completed"
+        assert job.chunks_total > 1
+        assert job.chunks_done == job.chunks_total
+        assert job.result["summaries"][0]["error"] is None
+
+    def test_resumes_from_completed_chunks(self, tmp_path, store, pool, model_manager):
+        file_path = tmp_path / "doc.txt"
+        file_path.write_text(LONG_TEXT, encoding="utf-8")
+        job_id = store.create(JobRequest(file_path=str(file_path)))
+
+        # A previous worker finished two chunks before it died
+        text = pool.doc_processor.extract_text(str(file_path))
+        chunks = pool.summary_generator._chunk_text(text, "anthropic")
+        store.claim()
+        store.start_text(job_id, hash_text(text))
+        store.add_chunk(job_id, "anthropic", 0, "stored 0")
+        store.add_chunk(job_id, "anthropic", 1, "stored 1")
+
+        pool.run_job(job_id)
+
+        assert model_manager.get_completion.call_count == len(chunks) - 2
+        summary = store.get(job_id).result["summaries"][0]["summary"]
+        assert summary.startswith("stored 0\n\nstored 1\n\n")
+
+    def test_failed_job(self, store, pool):
+        job_id = store.create(JobRequest(file_path="missing.txt"))
+
+        pool.run_job(store.claim())
+
+        job = store.get(job_id)
+        assert job.status == "failed"
+        assert "File not found" in job.error
+
+    def test_job_where_every_provider_failed(
+        self, tmp_path, store, pool, model_manager
+    ):
+        file_path = tmp_path / "doc.txt"
+        file_path.write_text("Short document.", encoding="utf-8")
+        model_manager.get_completion.side_effect = RuntimeError("Provider down")
+        job_id = store.create(
+            JobRequest(file_path=str(file_path), providers=["anthropic", "openai"])
+        )
+
+        pool.run_job(store.claim())
+
+        job = store.get(job_id)
+        assert job.status == "failed"
+        assert "anthropic: Provider down" in job.error
+        assert "openai: Provider down" in job.error
+
+    def test_lease_is_renewed_while_the_job_runs(self, tmp_path, model_manager):
+        store = JobStore(str(tmp_path / "jobs.db"), lease_seconds=0.3)
+        pool = JobWorkerPool(
+            store, DocumentProcessor(), SummaryGenerator(model_manager), workers=1
+        )
+        file_path = tmp_path / "doc.txt"
+        file_path.write_text("Short document.", encoding="utf-8")
+        job_id = store.create(JobRequest(file_path=str(file_path)))
+        claims = []
+
+        def complete(provider, prompt):
+            time.sleep(0.5)
+            claims.append(store.claim())
+            return "Summary"
+
+        model_manager.get_completion.side_effect = complete
+        pool.run_job(store.claim())
+
+        assert claims == [None]
+        assert store.get(job_id).status == "completed"
+
+    def test_workers_drain_the_queue(self, tmp_path, store, pool):
+        file_path = tmp_path / "doc.txt"
+        file_path.write_text("Short document.", encoding="utf-8")
+        pool.poll_interval = 0.05
+        pool.start()
+        try:
+            job_ids = [
+                pool.submit(JobRequest(file_path=str(file_path))) for _ in range(3)
+            ]
+            deadline = time.time() + 5
+            while time.time() < deadline and any(
+                store.get(job_id).status != "completed" for job_id in job_ids
+            ):
+                time.sleep(0.05)
+        finally:
+            pool.stop(timeout=5)
+
+        assert all(store.get(job_id).status == "completed" for job_id in job_ids)
+
+
+class TestJobEndpoints:
+    def test_create_and_poll_job(self, tmp_path, monkeypatch):
+        from src.app import api
+
+        monkeypatch.setattr(api.settings, "JOB_DB_PATH", str(tmp_path / "jobs.db"))
+        monkeypatch.setattr(api.settings, "JOB_POLL_INTERVAL", 0.05)
+        with patch("src.app.api.summary_generator") as generator, patch(
+            "src.processors.document.DocumentProcessor.extract_text",
+            return_value="Sample text",
+        ):
+            generator.count_chunks.return_value = 1
+            generator.generate_summary.return_value = SummaryResponse(
+                provider="anthropic", summary="Summary", summary_type="brief"
+            )
+            with TestClient(api.app) as client:
+                response = client.post("/jobs", json={"file_path": "doc.txt"})
+                assert response.status_code == 202
+                job_id = response.json()["id"]
+
+                deadline = time.time() + 5
+                job = client.get(f"/jobs/{job_id}").json()
+                while job["status"] != "completed" and time.time() < deadline:
+                    time.sleep(0.05)
+                    job = client.get(f"/jobs/{job_id}").json()
+
+                assert job["result"]["summaries"][0]["summary"] == "Summary"
+                assert client.get("/jobs/unknown").status_code == 404
@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+
+from src.app.api import app
+from src.services.fake_provider import FakeChatModel
+from src.services.metrics import LLM_CALL_SECONDS, LLM_TOKENS, Counter, Histogram
+from src.services.model_manager import ModelManager
+
+client = TestClient(app)
+
+
+class TestMetrics:
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram(
+            "stage_seconds", "Stage time.", ["stage"], buckets=(0.1, 1)
+        )
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, stage="extract")
+
+        lines = histogram.render()
+
+        assert 'stage_seconds_bucket{stage="extract",le="0.1"} 1' in lines
+        assert 'stage_seconds_bucket{stage="extract",le="1"} 2' in lines
+        assert 'stage_seconds_bucket{stage="extract",le="+Inf"} 3' in lines
+        assert 'stage_seconds_count{stage="extract"} 3' in lines
+        assert 'stage_seconds_sum{stage="extract"} 5.55' in lines
+
+    def test_counter_escapes_label_values(self):
+        counter = Counter("errors_total", "Errors.", ["provider"])
+        counter.inc(provider='say "hi"')
+        counter.inc(2, provider='say "hi"')
+
+        assert 'errors_total{provider="say \\"hi\\""} 3' in counter.render()
+
+    def test_completion_records_time_and_tokens(self):
+        manager = ModelManager()
+        manager.models["fake-metrics"] = FakeChatModel(
+            latency_median=0, output_tokens=7
+        )
+
+        manager.get_completion("fake-metrics", "prompt")
+
+        labels = {"provider": "fake-metrics", "model": "fake-metrics"}
+        assert LLM_CALL_SECONDS.count(**labels) == 1
+        assert LLM_TOKENS.value(type="completion", **labels) == 7
+        assert LLM_TOKENS.value(type="prompt", **labels) > 0
+
+    def test_metrics_endpoint(self):
+        client.get("/health")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE llm_call_seconds histogram" in response.text
+        assert (
+            'http_request_seconds_count{method="GET",route="/health",status="200"}'
+            in response.text
+        )
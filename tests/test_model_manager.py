@@ -1,4 +1,8 @@
 import logging
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -12,6 +16,8 @@ from src.models.schemas import (
     SummaryRequest,
     SummaryResponse,
 )
+from src.services import model_manager as model_manager_module
+from src.services.model_manager import ModelManager
 
 logger = logging.getLogger(__name__)
 
@@ -66,4 +72,68 @@ class TestChatModelHandler:
     #     with pytest.raises(RetryError):
     #         chat_handler.get_completion(self.PROVIDER, self.PROMPT)
 
-    #     assert chat_handler.models[self.PROVIDER].invoke.call_count == 3 
+    #     assert chat_handler.models[self.PROVIDER].invoke.call_count == 3
+
+
+class TestLazyProviders:
+    @pytest.fixture
+    def factory(self, monkeypatch):
+        factory = MagicMock()
+        factory.return_value.invoke.return_value = MagicMock(content="Lazy response")
+        monkeypatch.setitem(
+            model_manager_module.PROVIDER_FACTORIES,
+            "lazy",
+            model_manager_module.ProviderFactory(factory, lambda: True),
+        )
+        return factory
+
+    def test_model_is_built_on_first_completion(self, factory):
+        manager = ModelManager()
+        factory.assert_not_called()
+
+        assert manager.get_completion("lazy", "Hello") == "Lazy response"
+        assert manager.get_completion("lazy", "Hello") == "Lazy response"
+
+        factory.assert_called_once()
+        assert "lazy" in manager.providers
+
+    def test_building_a_model_does_not_stall_other_providers(self, factory):
+        building, built = threading.Event(), threading.Event()
+
+        def create():
+            building.set()
+            assert built.wait(timeout=5)
+            return MagicMock(invoke=MagicMock(return_value=MagicMock(content="Lazy")))
+
+        factory.side_effect = create
+        manager = ModelManager()
+        manager.models["ready"] = MagicMock()
+        manager.models["ready"].invoke.return_value = MagicMock(content="Ready")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            lazy = executor.submit(manager.get_completion, "lazy", "Hello")
+            assert building.wait(timeout=5)
+            ready = executor.submit(manager.get_completion, "ready", "Hello")
+            try:
+                assert ready.result(timeout=2) == "Ready"
+            finally:
+                built.set()
+            assert lazy.result() == "Lazy"
+
+    def test_disabled_provider_is_not_supported(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        manager = ModelManager()
+
+        with pytest.raises(ValueError, match="not supported"):
+            manager.get_model("openai")
+        assert "openai" not in manager.providers
+
+    def test_provider_modules_are_imported_lazily(self):
+        code = (
+            "import sys, src.app.api; "
+            "print(any(m.startswith('langchain_') for m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        assert output.strip().splitlines()[-1] == "False"
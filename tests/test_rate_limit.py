@@ -0,0 +1,218 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.model_manager import ModelManager
+from src.services.rate_limit import (
+    AdmissionController,
+    AIMDLimiter,
+    RetryPolicy,
+    TokenBucket,
+)
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = MagicMock(
+            headers={"retry-after": retry_after} if retry_after else {}
+        )
+
+
+class FakeProvider:
+    """
+    Local provider that answers with rate limit errors for its first calls.
+    """
+
+    def __init__(self, rate_limited_calls: int, retry_after=None):
+        self.rate_limited_calls = rate_limited_calls
+        self.retry_after = retry_after
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.rate_limited_calls:
+                raise RateLimitError(self.retry_after)
+        return MagicMock(
+            content=f"Answer to {prompt}", usage_metadata={"total_tokens": 10}
+        )
+
+
+class TestTokenBucket:
+    def test_waits_for_refill(self, clock):
+        bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=clock)
+
+        assert bucket.reserve(1) == 0
+        assert bucket.reserve(1) == 0
+        assert bucket.reserve(1) == pytest.approx(1.0)
+
+        clock.now += 1.0
+        assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+class TestAIMDLimiter:
+    def test_halves_on_overload_and_grows_back(self, clock):
+        limiter = AIMDLimiter(max_limit=8, clock=clock)
+
+        limiter.acquire()
+        limiter.release(overloaded=True)
+        assert limiter.limit == 4
+
+        # A second overload within the cooldown does not decrease again
+        limiter.acquire()
+        limiter.release(overloaded=True)
+        assert limiter.limit == 4
+
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release()
+        assert 4 < limiter.limit <= 8
+
+
+class TestRetryPolicy:
+    def test_honors_retry_after(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=30)
+
+        assert policy.next_delay(1, RateLimitError(retry_after="7")) == 7
+        assert policy.next_delay(3, RateLimitError(retry_after="7")) is None
+
+    def test_does_not_retry_client_errors(self):
+        policy = RetryPolicy(max_attempts=3)
+
+        assert policy.next_delay(1, ValueError("bad request")) is None
+
+
+class TestAdmissionController:
+    def test_retries_rate_limited_calls(self, clock):
+        provider = FakeProvider(rate_limited_calls=2, retry_after="5")
+        admission = AdmissionController(
+            "fake",
+            retry_policy=RetryPolicy(max_attempts=3),
+            clock=clock,
+            sleep=clock.sleep,
+        )
+
+        result = admission.call(lambda: provider.invoke("prompt"))
+
+        assert result.content == "Answer to prompt"
+        assert provider.calls == 3
+        assert clock.sleeps == [5.0, 5.0]
+        stats = admission.stats()
+        assert stats["retries"] == 2
+        assert stats["overloads"] == 2
+        assert stats["concurrency_limit"] < admission.concurrency.max_limit
+
+    def test_gives_up_after_max_attempts(self, clock):
+        provider = FakeProvider(rate_limited_calls=10)
+        admission = AdmissionController(
+            "fake",
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.1),
+            clock=clock,
+            sleep=clock.sleep,
+        )
+
+        with pytest.raises(RateLimitError):
+            admission.call(lambda: provider.invoke("prompt"))
+        assert provider.calls == 3
+
+    def test_retry_after_pauses_other_callers(self, clock):
+        admission = AdmissionController("fake", clock=clock, sleep=clock.sleep)
+
+        admission.acquire()
+        admission.release(error=RateLimitError(retry_after="10"))
+        admission.acquire()
+
+        assert clock.sleeps == [10.0]
+
+    def test_requests_per_minute(self, clock):
+        admission = AdmissionController(
+            "fake", requests_per_minute=60, clock=clock, sleep=clock.sleep
+        )
+        admission.requests = TokenBucket(60, capacity=1, clock=clock)
+
+        for _ in range(3):
+            admission.call(lambda: "ok")
+
+        assert clock.sleeps == pytest.approx([1.0, 1.0])
+
+    def test_batch_items_are_admitted_and_released_one_by_one(self, clock):
+        admission = AdmissionController(
+            "fake", max_concurrency=4, clock=clock, sleep=clock.sleep
+        )
+        in_flight = []
+
+        def batch():
+            in_flight.append(admission.concurrency.in_flight)
+            return ["ok", RateLimitError(retry_after="10"), "ok"]
+
+        results = admission.call_batch(batch, tokens=[1, 1, 1])
+
+        assert results[0] == results[2] == "ok"
+        assert in_flight == [3]
+        assert admission.concurrency.in_flight == 0
+        assert admission.concurrency.limit < 4
+        assert admission.stats()["overloads"] == 1
+        admission.acquire()
+        assert clock.sleeps == [10.0]
+
+    def test_batches_above_the_limit_wait_for_every_slot(self):
+        admission = AdmissionController("fake", max_concurrency=2)
+        admission.acquire()
+        admitted = threading.Event()
+
+        thread = threading.Thread(
+            target=lambda: admission.call_batch(
+                lambda: admitted.set() or ["ok"] * 3, tokens=[1, 1, 1]
+            )
+        )
+        thread.start()
+        assert not admitted.wait(0.05)
+        admission.release()
+        thread.join(timeout=5)
+
+        assert admitted.is_set()
+        assert admission.concurrency.in_flight == 0
+
+
+class TestModelManagerAdmission:
+    def test_completion_is_retried_once_per_policy(self, clock):
+        provider = FakeProvider(rate_limited_calls=1, retry_after="0")
+        manager = ModelManager()
+        manager.models["fake"] = provider
+        manager.admission["fake"] = AdmissionController(
+            "fake", clock=clock, sleep=clock.sleep
+        )
+
+        assert manager.get_completion("fake", "prompt") == "Answer to prompt"
+        assert provider.calls == 2
+        assert manager.admission_stats()["fake"]["retries"] == 1
+
+    def test_stream_cancelled_while_waiting_releases_its_slot(self):
+        manager = ModelManager()
+        admission = manager.admission["anthropic"] = AdmissionController(
+            "anthropic", max_concurrency=1
+        )
+        admission.acquire()
+
+        async def cancel_waiting_stream():
+            stream = manager.astream_completion("anthropic", "prompt")
+            task = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            admission.release()
+            # Let the waiting thread take the slot and hand it back
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if admission.concurrency.in_flight == 0:
+                    break
+
+        asyncio.run(cancel_waiting_stream())
+
+        assert admission.concurrency.in_flight == 0
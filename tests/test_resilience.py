@@ -0,0 +1,177 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.config.settings import settings
+from src.models.schemas import SummaryRequest
+from src.services.cache import SummaryCache
+from src.services.model_manager import ModelManager, served_providers
+from src.services.rate_limit import AdmissionController, RetryPolicy
+from src.services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker
+from src.services.summary import SummaryGenerator
+
+
+class FakeModel:
+    """
+    Local chat model with a fixed latency that optionally fails.
+    """
+
+    def __init__(self, name: str, latency: float = 0.0, fail: bool = False):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise ValueError(f"{self.name} failed")
+        return MagicMock(content=f"{self.name}: {prompt}", usage_metadata={})
+
+
+def make_manager(**models) -> ModelManager:
+    manager = ModelManager()
+    for provider, model in models.items():
+        manager.models[provider] = model
+        manager.admission[provider] = AdmissionController(
+            provider, retry_policy=RetryPolicy(max_attempts=1)
+        )
+    return manager
+
+
+class TestLatencyTracker:
+    def test_percentiles_need_enough_samples(self):
+        tracker = LatencyTracker(window=100, min_samples=10)
+        for seconds in range(9):
+            tracker.record(seconds)
+        assert tracker.percentile(95) is None
+
+        for seconds in range(9, 100):
+            tracker.record(seconds)
+        assert tracker.percentile(50) == pytest.approx(50, abs=1)
+        assert tracker.percentile(95) == pytest.approx(94, abs=1)
+        assert tracker.stats()["samples"] == 100
+
+
+class TestCircuitBreaker:
+    def test_opens_on_error_rate_and_probes_after_timeout(self, clock):
+        breaker = CircuitBreaker(
+            failure_rate=0.5, window=10, min_calls=4, open_seconds=30, clock=clock
+        )
+
+        for success in (True, False, True, False):
+            assert breaker.allow()
+            breaker.record(success)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+        clock.now += 30
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # Only one probe is let through
+        assert not breaker.allow()
+
+        breaker.record(False)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now += 30
+        assert breaker.allow()
+        breaker.record(True)
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+
+
+class TestFailover:
+    def test_fails_over_while_circuit_is_open(self, monkeypatch):
+        monkeypatch.setattr(settings, "FAILOVER_PROVIDERS", {"primary": ["backup"]})
+        manager = make_manager(primary=FakeModel("primary"), backup=FakeModel("backup"))
+        manager.breakers["primary"] = CircuitBreaker(min_calls=1)
+        manager.breakers["primary"].record(False)
+
+        with served_providers() as served:
+            assert manager.get_completion("primary", "prompt") == "backup: prompt"
+        assert manager.models["primary"].calls == 0
+        assert served == {"backup"}
+
+    def test_summaries_are_labelled_and_cached_by_the_serving_provider(
+        self, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "FAILOVER_PROVIDERS", {"anthropic": ["fake"]})
+        monkeypatch.setattr(settings, "FAKE_PROVIDER_ENABLED", True)
+        manager = make_manager(anthropic=FakeModel("anthropic"), fake=FakeModel("fake"))
+        manager.breakers["anthropic"] = CircuitBreaker(min_calls=1)
+        manager.breakers["anthropic"].record(False)
+        cache = SummaryCache(max_entries=10)
+        generator = SummaryGenerator(manager, cache=cache)
+
+        response = generator.generate_summary(
+            SummaryRequest(text="Short text.", provider="anthropic", map_reduce=False)
+        )
+
+        assert response.provider == "fake"
+        assert response.summary.startswith("fake: ")
+        assert cache.get_summary("Short text.", "brief", "anthropic") is None
+        assert cache.get_summary("Short text.", "brief", "fake") == response.summary
+
+        chunked = generator.generate_summary(
+            SummaryRequest(text="word " * 5000, provider="anthropic", map_reduce=False)
+        )
+        assert chunked.error is None
+        assert chunked.provider == "fake"
+
+    def test_raises_without_fallback(self):
+        manager = make_manager(primary=FakeModel("primary", fail=True))
+        manager.breakers["primary"] = CircuitBreaker(min_calls=2)
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                manager.get_completion("primary", "prompt")
+        with pytest.raises(CircuitOpenError):
+            manager.get_completion("primary", "prompt")
+        assert manager.provider_stats()["primary"]["circuit"] == "open"
+
+
+class TestHedging:
+    def test_slow_call_is_hedged(self, monkeypatch):
+        monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+        monkeypatch.setattr(settings, "HEDGE_DELAY", 0.05)
+        monkeypatch.setattr(settings, "HEDGE_PROVIDERS", {"slow": "fast"})
+        manager = make_manager(
+            slow=FakeModel("slow", latency=1.0), fast=FakeModel("fast")
+        )
+
+        start = time.perf_counter()
+        with served_providers() as served:
+            assert manager.get_completion("slow", "prompt") == "fast: prompt"
+        assert time.perf_counter() - start < 0.5
+        assert served == {"fast"}
+
+        stats = manager.provider_stats()["slow"]
+        assert stats["hedges"] == 1
+        assert stats["hedges_won"] == 1
+
+    def test_fast_call_is_not_hedged(self, monkeypatch):
+        monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+        monkeypatch.setattr(settings, "HEDGE_DELAY", 1.0)
+        manager = make_manager(fast=FakeModel("fast"))
+
+        assert manager.get_completion("fast", "prompt") == "fast: prompt"
+        assert manager.models["fast"].calls == 1
+        assert manager.provider_stats()["fast"]["hedges"] == 0
+
+    def test_hedge_waits_for_observed_p95(self, monkeypatch):
+        monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+        manager = make_manager(fast=FakeModel("fast"))
+
+        # Too few samples for a p95, so calls are not hedged yet
+        assert manager._hedge_delay("fast") is None
+        for _ in range(20):
+            manager.get_completion("fast", "prompt")
+        assert manager._hedge_delay("fast") == manager.get_latency("fast").percentile(
+            95
+        )
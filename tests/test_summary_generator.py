@@ -1,14 +1,22 @@
-from unittest.mock import Mock
+import asyncio
+import math
+import threading
+from unittest.mock import Mock, patch
 
 import pytest
 
+from src.config.settings import settings
 from src.models.schemas import (
     SummaryCompareReq,
     SummaryCompareResp,
     SummaryRequest,
     SummaryResponse,
 )
-from src.services.summary import SummaryGenerator
+from src.processors.chunker import approximate_token_count
+from src.processors.shared import SharedText
+from src.services.cache import SummaryCache
+from src.services.metrics import CACHE_LOOKUPS
+from src.services.summary import SummaryGenerator, key_excerpts
 
 
 @pytest.fixture
@@ -105,6 +113,130 @@ class TestSummaryGenerator:
             model_manager.get_completion.call_count > 1
         )  # Should be called multiple times for chunks
 
+    def test_long_text_chunks_keep_document_order(
+        self, summary_generator, model_manager
+    ):
+        # Arrange
+        long_text = " ".join(f"w{i:05d}" for i in range(3000))
+        model_manager.get_completion.side_effect = lambda provider, prompt: (
+            prompt.split()[-1]
+        )
+        request = SummaryRequest(
+            text=long_text, summary_type="brief", provider="anthropic"
+        )
+
+        # Act
+        response = summary_generator.generate_summary(request)
+
+        # Assert
+        chunks = summary_generator._chunk_text(long_text)
+        assert response.summary == "\n\n".join(chunk.split()[-1] for chunk in chunks)
+
+    def test_long_text_partial_summary_on_chunk_failure(
+        self, summary_generator, model_manager
+    ):
+        # Arrange
+        long_text = " ".join(f"w{i:05d}" for i in range(3000))
+        chunks = summary_generator._chunk_text(long_text)
+        failing_word = chunks[1].split()[-1]
+
+        def complete(provider, prompt):
+            if prompt.endswith(failing_word):
+                raise Exception("Chunk failed")
+            return prompt.split()[-1]
+
+        model_manager.get_completion.side_effect = complete
+        request = SummaryRequest(
+            text=long_text, summary_type="brief", provider="anthropic"
+        )
+
+        # Act
+        response = summary_generator.generate_summary(request)
+
+        # Assert
+        assert response.summary is None
+        assert response.error == "Chunk failed"
+        expected = [chunk.split()[-1] for i, chunk in enumerate(chunks) if i != 1]
+        assert response.partial_summary == "\n\n".join(expected)
+
+    def test_pieces_are_summarized_while_streaming(
+        self, summary_generator, model_manager
+    ):
+        # Arrange
+        first_chunk_sent = threading.Event()
+
+        def complete(provider, prompt):
+            first_chunk_sent.set()
+            return prompt.split()[-1]
+
+        def pages():
+            yield "word " * 5000
+            # The first chunk must reach the provider before the last page is read
+            assert first_chunk_sent.wait(timeout=5)
+            yield "b " * 10
+
+        model_manager.get_completion.side_effect = complete
+
+        # Act
+        response = summary_generator.generate_summary_from_pieces(
+            pages(), summary_type="brief", provider="anthropic"
+        )
+
+        # Assert
+        assert response.error is None
+        assert response.summary.split("\n\n")[-1] == "b"
+
+    def test_shared_pieces_are_cached_under_their_text(self, model_manager):
+        model_manager.get_completion.side_effect = (
+            lambda provider, prompt: prompt.split()[-1]
+        )
+        generator = SummaryGenerator(model_manager, cache=SummaryCache(max_entries=100))
+        shared = SharedText(
+            "report",
+            iter(["word " * 5000, "last page"]),
+            lambda pieces, seconds: "\n".join(pieces or []),
+        )
+
+        streamed = generator.generate_summary_from_pieces(
+            shared, "brief", "anthropic", map_reduce=False
+        )
+        calls = model_manager.get_completion.call_count
+        cached = generator.generate_summary(
+            SummaryRequest(text=shared.text, provider="anthropic", map_reduce=False)
+        )
+
+        assert streamed.error is None
+        assert cached.summary == streamed.summary
+        assert model_manager.get_completion.call_count == calls
+
+    def test_incremental_chunks_match_chunk_text(self, summary_generator):
+        pages = [f"page{i} " + "word " * 700 for i in range(5)]
+
+        chunks = list(summary_generator._iter_chunks(pages))
+
+        assert chunks == summary_generator._chunk_text("\n".join(pages))
+
+    def test_chunk_callback_receives_every_chunk(
+        self, summary_generator, model_manager
+    ):
+        # Arrange
+        long_text = " ".join(f"w{i:05d}" for i in range(3000))
+        model_manager.get_completion.side_effect = lambda provider, prompt: (
+            prompt.split()[-1]
+        )
+        received = {}
+        request = SummaryRequest(
+            text=long_text, summary_type="brief", provider="anthropic"
+        )
+
+        # Act
+        response = summary_generator.generate_summary(
+            request, on_chunk=lambda index, summary: received.update({index: summary})
+        )
+
+        # Assert
+        assert "\n\n".join(received[i] for i in sorted(received)) == response.summary
+
     def test_short_text_handling(self, summary_generator, model_manager):
         # Arrange
         model_manager.get_completion.return_value = "Very short summary"
@@ -162,3 +294,289 @@ class TestSummaryGenerator:
         assert isinstance(response, SummaryCompareResp)
         assert response.evaluation_of_summaries == "Comparison of summaries"
         assert response.provider == "anthropic"
+
+    def test_summary_comparison_renders_summaries_compactly(
+        self, summary_generator, model_manager
+    ):
+        model_manager.get_completion.return_value = "Comparison of summaries"
+        summaries = [
+            SummaryResponse(
+                provider="anthropic", summary="Summary 1", summary_type="brief"
+            ),
+            SummaryResponse(
+                provider="openai",
+                summary_type="brief",
+                error="Timeout",
+                partial_summary="Partial summary",
+            ),
+            SummaryResponse(provider="gemma", summary_type="brief", error="Timeout"),
+        ]
+        compare_req = SummaryCompareReq(
+            text="Original text", summaries=summaries, provider="anthropic"
+        )
+
+        response = summary_generator.compare_summaries(compare_req)
+
+        prompt = model_manager.get_completion.call_args[0][1]
+        assert "Original text" in prompt
+        assert "[anthropic, brief]\nSummary 1" in prompt
+        assert "[openai, brief, partial]\nPartial summary" in prompt
+        assert "gemma" not in prompt
+        assert "partial_summary=" not in prompt and "None" not in prompt
+        assert response.source == "raw"
+        assert response.prompt_tokens == approximate_token_count(prompt)
+
+
+class TestCompareTokenBudget:
+    LONG_TEXT = " ".join(
+        f"Sentence {index} talks about topic{index % 7} and filler words."
+        for index in range(2000)
+    )
+    SUMMARIES = [
+        SummaryResponse(
+            provider="anthropic", summary="Summary 1", summary_type="brief"
+        ),
+        SummaryResponse(provider="openai", summary="Summary 2", summary_type="brief"),
+    ]
+
+    def test_long_text_is_replaced_by_key_excerpts(
+        self, summary_generator, model_manager
+    ):
+        model_manager.get_completion.return_value = "Comparison"
+        compare_req = SummaryCompareReq(
+            text=self.LONG_TEXT, summaries=self.SUMMARIES, token_budget=500
+        )
+
+        response = summary_generator.compare_summaries(compare_req)
+
+        assert response.source == "excerpts"
+        assert 400 < response.prompt_tokens <= 500
+        prompt = model_manager.get_completion.call_args[0][1]
+        assert "key excerpts" in prompt
+        assert "Summary 1" in prompt and "Summary 2" in prompt
+
+    def test_cached_condensed_text_is_preferred(self, model_manager):
+        cache = SummaryCache(max_entries=10)
+        cache.set_summary(self.LONG_TEXT, "detailed", "openai", "Condensed document")
+        summary_generator = SummaryGenerator(model_manager, cache=cache)
+        model_manager.get_completion.return_value = "Comparison"
+        compare_req = SummaryCompareReq(
+            text=self.LONG_TEXT, summaries=self.SUMMARIES, token_budget=500
+        )
+
+        response = summary_generator.compare_summaries(compare_req)
+
+        assert response.source == "condensed"
+        assert "Condensed document" in model_manager.get_completion.call_args[0][1]
+
+    def test_condensed_lookups_are_not_counted(self, model_manager):
+        cache = SummaryCache(max_entries=10)
+        summary_generator = SummaryGenerator(model_manager, cache=cache)
+        model_manager.get_completion.return_value = "Comparison"
+        compare_req = SummaryCompareReq(
+            text=self.LONG_TEXT, summaries=self.SUMMARIES, token_budget=500
+        )
+        lookups = CACHE_LOOKUPS.value(cache="summary", result="miss")
+
+        summary_generator.compare_summaries(compare_req)
+
+        assert cache.stats()["misses"] == 0
+        assert CACHE_LOOKUPS.value(cache="summary", result="miss") == lookups
+
+    def test_oversized_summaries_are_truncated(self, summary_generator, model_manager):
+        model_manager.get_completion.return_value = "Comparison"
+        summaries = [
+            SummaryResponse(
+                provider="anthropic", summary=self.LONG_TEXT, summary_type="detailed"
+            )
+        ]
+        compare_req = SummaryCompareReq(
+            text=self.LONG_TEXT, summaries=summaries, token_budget=500
+        )
+
+        response = summary_generator.compare_summaries(compare_req)
+
+        assert response.prompt_tokens <= 500
+
+    def test_key_excerpts_keep_document_order(self):
+        text = (
+            "Cats purr. Dogs bark loudly at cats. Birds sing. Dogs chase cats and dogs."
+        )
+
+        excerpts = key_excerpts(text, 12, approximate_token_count)
+
+        sentences = excerpts.split("\n")
+        assert 0 < len(sentences) < 4
+        assert sentences == sorted(sentences, key=text.index)
+
+
+class TestIncrementalSummaries:
+    PARAGRAPHS = [
+        f"Paragraph {index} of the specification explains requirement {index} in detail. "
+        * 4
+        for index in range(120)
+    ]
+
+    def test_manifests_do_not_need_the_cache(self, model_manager):
+        generator = SummaryGenerator(model_manager)
+        model_manager.get_completion.side_effect = lambda provider, prompt: "Summary"
+        request = SummaryRequest(
+            text="\n".join(self.PARAGRAPHS), provider="anthropic", document_id="spec"
+        )
+
+        first = generator.generate_summary(request)
+        second = generator.generate_summary(request)
+
+        assert first.chunks_regenerated > 1
+        assert second.chunks_reused == first.chunks_regenerated
+        assert second.chunks_regenerated == 0
+
+    def test_only_changed_chunks_are_regenerated(self, model_manager):
+        generator = SummaryGenerator(model_manager, cache=SummaryCache(max_entries=100))
+        model_manager.get_completion.side_effect = lambda provider, prompt: "Summary"
+
+        first = generator.generate_summary(
+            SummaryRequest(
+                text="\n\n".join(self.PARAGRAPHS),
+                provider="anthropic",
+                document_id="spec",
+            )
+        )
+        calls = model_manager.get_completion.call_count
+        assert first.chunks_reused == 0
+        assert first.chunks_regenerated == calls > 1
+
+        edited = list(self.PARAGRAPHS)
+        edited[60] = "This paragraph was rewritten in the new version."
+        second = generator.generate_summary(
+            SummaryRequest(
+                text="\n\n".join(edited), provider="anthropic", document_id="spec"
+            )
+        )
+
+        assert second.error is None
+        assert 1 <= second.chunks_regenerated <= 2
+        assert second.chunks_reused >= calls - 2
+        assert (
+            model_manager.get_completion.call_count == calls + second.chunks_regenerated
+        )
+
+    def test_streamed_versions_reuse_chunks(self, model_manager):
+        generator = SummaryGenerator(model_manager)
+        model_manager.get_completion.side_effect = lambda provider, prompt: "Summary"
+        pieces = [
+            "\n".join(self.PARAGRAPHS[:60]) + "\n",
+            "\n".join(self.PARAGRAPHS[60:]),
+        ]
+
+        first = generator.generate_summary_from_pieces(
+            iter(pieces), "brief", "anthropic", document_id="spec"
+        )
+        second = generator.generate_summary_from_pieces(
+            iter(pieces), "brief", "anthropic", document_id="spec"
+        )
+
+        assert first.error is None
+        assert first.chunks_regenerated > 1
+        assert second.chunks_reused == first.chunks_regenerated
+        assert second.summary == first.summary
+
+
+class TestMapReduce:
+    LONG_TEXT = " ".join(f"w{i:05d}" for i in range(6000))
+
+    @staticmethod
+    def complete(provider, prompt):
+        if prompt.startswith(SummaryGenerator.REDUCE_PREAMBLE):
+            # Merging keeps the first partial summary of the group
+            return prompt.split("\n")[2].split()[0]
+        return prompt.split()[-1]
+
+    def test_chunk_summaries_are_reduced_to_one(self, summary_generator, model_manager):
+        model_manager.get_completion.side_effect = self.complete
+        chunks = summary_generator._chunk_text(self.LONG_TEXT)
+
+        with patch.object(settings, "REDUCE_FAN_IN", 3):
+            response = summary_generator.generate_summary(
+                SummaryRequest(
+                    text=self.LONG_TEXT, provider="anthropic", map_reduce=True
+                )
+            )
+
+        assert response.error is None
+        assert response.summary == chunks[0].split()[-1]
+        assert response.reduce_depth == math.ceil(math.log(len(chunks), 3))
+        assert response.total_tokens > sum(approximate_token_count(c) for c in chunks)
+        reduce_prompts = [
+            call.kwargs["prompt"]
+            for call in model_manager.get_completion.call_args_list
+            if call.kwargs["prompt"].startswith(SummaryGenerator.REDUCE_PREAMBLE)
+        ]
+        assert len(reduce_prompts) >= len(chunks) // 3
+
+    def test_groups_fit_the_provider_budget(self, summary_generator):
+        summaries = [f"Summary {index} " + "detail " * 30 for index in range(20)]
+
+        with patch.object(settings, "PROVIDER_REDUCE_TOKENS", {"anthropic": 100}):
+            groups = summary_generator._reduce_groups(summaries, "anthropic")
+
+        assert groups[0][0].startswith("Summary 0 ")
+        assert groups[-1][-1].startswith("Summary 19 ")
+        for group in groups:
+            assert sum(approximate_token_count(summary) for summary in group) <= 100
+        assert all(len(group) >= 2 for group in groups[:-1])
+        assert len(groups) < len(summaries)
+
+    def test_short_text_has_depth_zero(self, summary_generator, model_manager):
+        model_manager.get_completion.return_value = "Short summary"
+
+        response = summary_generator.generate_summary(
+            SummaryRequest(text="A short text.", provider="anthropic", map_reduce=True)
+        )
+
+        assert response.summary == "Short summary"
+        assert response.reduce_depth == 0
+        assert model_manager.get_completion.call_count == 1
+
+    def test_cached_summaries_keep_their_reduce_stats(self, model_manager):
+        model_manager.get_completion.side_effect = self.complete
+        generator = SummaryGenerator(model_manager, cache=SummaryCache(max_entries=100))
+        request = SummaryRequest(
+            text=self.LONG_TEXT, provider="anthropic", map_reduce=True
+        )
+
+        first = generator.generate_summary(request)
+        calls = model_manager.get_completion.call_count
+        second = generator.generate_summary(request)
+
+        assert model_manager.get_completion.call_count == calls
+        assert second.summary == first.summary
+        assert second.reduce_depth == first.reduce_depth >= 1
+        assert second.total_tokens == first.total_tokens
+
+    def test_streamed_summaries_share_the_map_reduce_entry(self, model_manager):
+        generator = SummaryGenerator(model_manager, cache=SummaryCache(max_entries=100))
+        model_manager.get_completion.return_value = "Short summary"
+        request = SummaryRequest(
+            text="A short text.", provider="anthropic", map_reduce=True
+        )
+        generator.generate_summary(request)
+
+        async def stream():
+            return [delta async for delta in generator.astream_summary(request)]
+
+        assert asyncio.run(stream()) == ["Short summary"]
+        model_manager.astream_completion.assert_not_called()
+
+    def test_streamed_pieces_are_reduced(self, summary_generator, model_manager):
+        model_manager.get_completion.side_effect = self.complete
+        words = self.LONG_TEXT.split()
+        pages = [" ".join(words[i : i + 500]) for i in range(0, len(words), 500)]
+
+        response = summary_generator.generate_summary_from_pieces(
+            pages, provider="anthropic", map_reduce=True
+        )
+
+        assert response.error is None
+        assert "\n" not in response.summary
+        assert response.reduce_depth >= 1
@@ -0,0 +1,107 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.api import app
+from src.config.settings import settings
+from src.services.tracing import StackSampler, in_context, span, start_trace
+
+SAMPLE_PATH = "sample_data/hnsw.txt"
+
+client = TestClient(app)
+
+
+def find(tree: dict, name: str) -> list:
+    found = [tree] if tree["name"] == name else []
+    for child in tree["children"]:
+        found.extend(find(child, name))
+    return found
+
+
+class TestSpans:
+    def test_spans_outside_a_trace_are_noops(self):
+        with span("extract") as current:
+            assert current is None
+
+    def test_spans_follow_work_into_threads(self):
+        with start_trace("request") as root:
+            with span("summary"):
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    for index in range(3):
+                        executor.submit(in_context(lambda index=index: _chunk(index)))
+
+        tree = root.to_dict()
+        summary = tree["children"][0]
+        assert summary["name"] == "summary"
+        assert sorted(
+            child["attributes"]["index"] for child in summary["children"]
+        ) == [0, 1, 2]
+
+    def test_stack_sampler_records_other_threads(self, tmp_path):
+        stop = threading.Event()
+        worker = threading.Thread(target=stop.wait, name="busy-worker")
+        worker.start()
+        sampler = StackSampler(interval=0.001)
+        first = sampler.open()
+        stop.wait(0.05)
+        second = sampler.open()
+        stop.wait(0.05)
+        sampler.close(first)
+        sampler.close(second)
+        stop.set()
+        worker.join()
+
+        path = tmp_path / "profile.folded"
+        first.dump(path)
+        assert "busy-worker;" in path.read_text()
+        assert sum(second.samples.values()) < sum(first.samples.values())
+
+
+def _chunk(index: int):
+    with span("chunk", index=index):
+        pass
+
+
+class TestTraceEndpoint:
+    @pytest.fixture
+    def fake_provider(self, monkeypatch):
+        monkeypatch.setattr(settings, "FAKE_PROVIDER_ENABLED", True)
+        monkeypatch.setattr(settings, "FAKE_LATENCY_MEDIAN", 0)
+
+    def test_no_trace_by_default(self, fake_provider):
+        response = client.post(
+            "/summarize", json={"file_path": SAMPLE_PATH, "providers": ["fake"]}
+        )
+
+        assert "trace" not in response.json()
+
+    def test_trace_header_returns_timing_tree(self, fake_provider):
+        response = client.post(
+            "/summarize",
+            json={
+                "file_path": SAMPLE_PATH,
+                "providers": ["fake"],
+                "document_id": "trace",
+            },
+            headers={"X-Debug-Trace": "1"},
+        )
+
+        assert response.status_code == 200
+        trace = response.json()["trace"]
+        assert trace["name"] == "POST /summarize"
+        assert find(trace, "extract")
+        assert find(trace, "summary")
+        calls = find(trace, "llm_call")
+        assert calls
+        assert all(call["attributes"]["attempts"] == 1 for call in calls)
+        assert all("admission_wait_ms" in call["attributes"] for call in calls)
+
+    def test_slow_requests_are_profiled(self, fake_provider, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "PROFILE_SLOW_REQUESTS", 0.0)
+        monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+
+        client.get("/health?trace=1")
+
+        assert list(tmp_path.glob("*-health-*.folded"))